@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Account Cache Module
+Read-through cache of what the dashboard routes ask about the logged-in
+account on every call: the account itself, its robots (with the same fields
+as UserRobot.to_dict) and their sensors. Lookups are memoized on flask.g for
+the rest of the request and shared between requests for ACCOUNT_CACHE_TTL
+seconds. Device and profile changes call invalidate(); changes made by other
+processes (e.g. poller.py) show up once the TTL runs out.
+
+Values are plain dicts shared between threads - treat them as read-only.
+"""
+
+from flask import current_app, g, has_request_context
+from extensions import db
+from models import Account, Sensor, UserRobot
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries = {}      # account_id -> (expires_at, view)
+_generations = {}  # account_id -> bumped on invalidate, so in-flight loads don't store stale data
+
+
+def _load(account_id):
+    account = db.session.get(Account, account_id)
+    if account is None:
+        return None
+
+    user_robots = (UserRobot.query.filter_by(account_id=account_id)
+                   .options(db.joinedload(UserRobot.robot)).all())
+    robot_ids = [ur.robot_id for ur in user_robots]
+    sensors = Sensor.query.filter(Sensor.robot_id.in_(robot_ids)).all() if robot_ids else []
+
+    return {
+        'account': {
+            'id': account.id,
+            'username': account.username,
+            'email': account.email,
+            'created_at': account.created_at
+        },
+        'robots': [ur.to_dict() for ur in user_robots],
+        'robot_ids': robot_ids,
+        'sensors': [s.to_dict() for s in sensors]
+    }
+
+
+def get(account_id):
+    """Cached view of an account ({'account', 'robots', 'robot_ids', 'sensors'}), or None if it's gone."""
+    memo = g.setdefault('_account_cache', {}) if has_request_context() else {}
+    if account_id in memo:
+        return memo[account_id]
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(account_id)
+        generation = _generations.get(account_id, 0)
+    if entry and entry[0] > now:
+        view = entry[1]
+    else:
+        view = _load(account_id)
+        ttl = current_app.config.get('ACCOUNT_CACHE_TTL', 10)
+        with _lock:
+            if view is not None and ttl > 0 and _generations.get(account_id, 0) == generation:
+                _entries[account_id] = (now + ttl, view)
+
+    memo[account_id] = view
+    return view
+
+
+def robots(account_id):
+    view = get(account_id)
+    return view['robots'] if view else []
+
+
+def robot_ids(account_id):
+    view = get(account_id)
+    return view['robot_ids'] if view else []
+
+
+def get_robot(account_id, robot_id):
+    """The account's entry for a robot (UserRobot.to_dict fields), or None without access."""
+    view = get(account_id)
+    for robot in view['robots'] if view else []:
+        if robot['robot_id'] == robot_id:
+            return robot
+    return None
+
+
+def sensors(account_id, robot_id=None):
+    view = get(account_id)
+    if not view:
+        return []
+    if robot_id is None:
+        return view['sensors']
+    return [s for s in view['sensors'] if s['robot_id'] == robot_id]
+
+
+def invalidate(account_id):
+    """Forget an account after its profile, robots or sensors changed."""
+    with _lock:
+        _entries.pop(account_id, None)
+        _generations[account_id] = _generations.get(account_id, 0) + 1
+    if has_request_context():
+        g.get('_account_cache', {}).pop(account_id, None)
+
+
+def invalidate_robot(robot_id):
+    """Forget every cached account that has a robot (e.g. after new sensors appeared)."""
+    with _lock:
+        account_ids = [account_id for account_id, (_, view) in _entries.items() if robot_id in view['robot_ids']]
+    for account_id in account_ids:
+        invalidate(account_id)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Account Stats Module
+Keeps the per-account numbers shown on /profile in the account_stats table so
+the page reads one row instead of counting readings. Ingest paths add to the
+counters with single UPDATE statements inside the caller's transaction;
+device and sensor changes recount the (small) robot and sensor totals, and
+connecting or disconnecting a robot adds or takes off that robot's readings.
+rebuild() (a full scan of the account's readings) is only for repairs and
+migrations.
+
+Rows are created on first read by counting from scratch, so accounts that
+existed before the table (or rows removed by hand) heal themselves.
+"""
+
+from datetime import datetime
+from sqlalchemy import case, func, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import AccountStats, Sensor, UserRobot
+import partitions
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _robot_ids(account_id):
+    return db.session.query(UserRobot.robot_id).filter(UserRobot.account_id == account_id)
+
+
+def _counts(account_id):
+    robot_ids = _robot_ids(account_id)
+    robot_count = db.session.query(func.count(UserRobot.id)).filter(UserRobot.account_id == account_id).scalar()
+    sensor_count = db.session.query(func.count(Sensor.id)).filter(Sensor.robot_id.in_(robot_ids)).scalar()
+    return robot_count, sensor_count
+
+
+def _robot_readings(robot_id):
+    """(count, newest created_at) of one robot's readings."""
+    readings = partitions.readings()
+    return (
+        db.session.query(func.count(readings.id), func.max(readings.created_at))
+        .join(Sensor, Sensor.id == readings.sensor_id)
+        .filter(Sensor.robot_id == robot_id)
+        .one()
+    )
+
+
+def rebuild(account_id):
+    """Recount everything for one account (full scan of its readings). Does not commit."""
+    stats = db.session.get(AccountStats, account_id)
+    if stats is None:
+        stats = AccountStats(account_id=account_id, interactions=0)
+        db.session.add(stats)
+
+    stats.robot_count, stats.sensor_count = _counts(account_id)
+    readings = partitions.readings()
+    data_points, last_ingest_at = (
+        db.session.query(func.count(readings.id), func.max(readings.created_at))
+        .join(Sensor, Sensor.id == readings.sensor_id)
+        .filter(Sensor.robot_id.in_(_robot_ids(account_id)))
+        .one()
+    )
+    stats.data_points = data_points or 0
+    stats.last_ingest_at = last_ingest_at
+    return stats
+
+
+def get(account_id):
+    """Stats row for an account, created (and committed) on first use."""
+    stats = db.session.get(AccountStats, account_id)
+    if stats is None:
+        try:
+            stats = rebuild(account_id)
+            db.session.commit()
+            logger.info(f"✓ Built account stats for account {account_id}")
+        except IntegrityError:
+            # Another request built it at the same time - use theirs
+            db.session.rollback()
+            stats = db.session.get(AccountStats, account_id)
+    return stats
+
+
+def record_ingest(robot_id, count, at=None):
+    """Add `count` new readings from a robot to every account that has it. Does not commit."""
+    if not count:
+        return
+    at = at or datetime.utcnow()
+    db.session.execute(
+        update(AccountStats)
+        .where(AccountStats.account_id.in_(
+            db.session.query(UserRobot.account_id).filter(UserRobot.robot_id == robot_id)
+        ))
+        .values(
+            data_points=AccountStats.data_points + count,
+            last_ingest_at=case(
+                (AccountStats.last_ingest_at.is_(None), at),
+                (AccountStats.last_ingest_at < at, at),
+                else_=AccountStats.last_ingest_at
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_removal(robot_id, count):
+    """Take `count` deleted readings of a robot off every account that has it. Does not commit."""
+    if not count:
+        return
+    db.session.execute(
+        update(AccountStats)
+        .where(AccountStats.account_id.in_(
+            db.session.query(UserRobot.account_id).filter(UserRobot.robot_id == robot_id)
+        ))
+        .values(data_points=AccountStats.data_points - count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_interaction(account_id):
+    """Count one user action on a robot (connect, test, manual fetch, ...). Does not commit."""
+    db.session.execute(
+        update(AccountStats)
+        .where(AccountStats.account_id == account_id)
+        .values(interactions=AccountStats.interactions + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_counts(account_id):
+    """Recount robots and sensors after a device change. Does not commit."""
+    stats = db.session.get(AccountStats, account_id)
+    if stats is not None:
+        stats.robot_count, stats.sensor_count = _counts(account_id)
+
+
+def add_robot(account_id, robot_id):
+    """Count a robot just connected to an account (a shared robot brings its readings along). Does not commit."""
+    stats = db.session.get(AccountStats, account_id)
+    if stats is None:
+        return  # built from scratch on first read
+    count, newest = _robot_readings(robot_id)
+    stats.data_points += count or 0
+    if newest and (stats.last_ingest_at is None or newest > stats.last_ingest_at):
+        stats.last_ingest_at = newest
+    stats.robot_count, stats.sensor_count = _counts(account_id)
+
+
+def remove_robot(account_id, robot_id):
+    """
+    Take a robot just disconnected from an account off its stats. last_ingest_at
+    keeps its value (it may have come from this robot). Does not commit.
+    """
+    stats = db.session.get(AccountStats, account_id)
+    if stats is None:
+        return
+    count, _ = _robot_readings(robot_id)
+    stats.data_points = max(0, stats.data_points - (count or 0))
+    stats.robot_count, stats.sensor_count = _counts(account_id)
+
+
+def refresh_robot(robot_id):
+    """Recount robots and sensors for every account that has a robot. Does not commit."""
+    for (account_id,) in db.session.query(UserRobot.account_id).filter(UserRobot.robot_id == robot_id).all():
+        refresh_counts(account_id)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Alerts Module
+Streaming rule engine for live readings. Every reading fetch_live_sensor_data
+gets is checked against the AlertRules of its robot and sensor, with constant
+work and state per rule:
+- above / below: the value is past the threshold
+- rate_above / rate_below: change per minute since the previous reading is
+  past the threshold (rate_below thresholds are negative for drops)
+- for_seconds: the condition has to hold that long before the alert fires
+
+An alert fires once when its condition starts holding and clears when it
+stops. Both are sent to the owning account over Socket.IO ('sensor_alert',
+'sensor_alert_cleared') and written to the alert table by a background
+writer thread with its own session, so the poller never waits on (or
+commits) an alert write.
+
+Rules are kept in memory and reloaded every ALERT_RULES_TTL seconds, so
+evaluating a reading runs no queries. rules_changed() reloads them at once in
+this process and, with VIAM_POLLER=external, queues an 'alert_rules' job that
+makes poller.py reload within VIAM_JOB_POLL_INTERVAL seconds.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from extensions import db
+from models import Alert, AlertRule
+import db_engine
+import realtime
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONDITIONS = ('above', 'below', 'rate_above', 'rate_below')
+
+
+class _RuleState:
+    """A rule plus when its condition started holding and whether it has fired."""
+    __slots__ = ('rule', 'since', 'active')
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.since = None
+        self.active = False
+
+
+_lock = threading.Lock()
+_states = {}    # (robot_id, sensor_name) -> [_RuleState]
+_previous = {}  # (robot_id, sensor_name) -> (timestamp, value) for rates
+_loaded_at = None
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def invalidate():
+    """Reload the rules before the next evaluation in this process."""
+    global _loaded_at
+    _loaded_at = None
+
+
+def rules_changed(account_id, robot_id):
+    """Call after an AlertRule was added or removed (and committed)."""
+    invalidate()
+    if current_app.config['VIAM_POLLER'] == 'external':
+        # The rules are evaluated in poller.py, which only hears about it through the jobs table
+        import jobs
+        jobs.submit_alert_rules_reload(account_id, robot_id)
+
+
+def _reload():
+    global _loaded_at
+    rules = [rule.to_dict() for rule in AlertRule.query.filter_by(enabled=True).all()]
+    old = {state.rule['id']: state for states in _states.values() for state in states}
+
+    _states.clear()
+    for rule in rules:
+        state = old.pop(rule['id'], None)
+        if state is None or state.rule != rule:
+            if state is not None and state.active:
+                _persist(_clear_alert, rule['id'], datetime.utcnow())
+            state = _RuleState(rule)
+        _states.setdefault((rule['robot_id'], rule['sensor_name']), []).append(state)
+
+    # Rules that were deleted or disabled while firing
+    for state in old.values():
+        if state.active:
+            _persist(_clear_alert, state.rule['id'], datetime.utcnow())
+    _loaded_at = time.monotonic()
+
+
+def _holds(rule, value, rate):
+    condition = rule['condition']
+    if condition == 'above':
+        return value > rule['threshold']
+    if condition == 'below':
+        return value < rule['threshold']
+    if rate is None:
+        return None
+    if condition == 'rate_above':
+        return rate > rule['threshold']
+    return rate < rule['threshold']
+
+
+def _describe(rule, value, rate):
+    if rule['condition'] in ('above', 'below'):
+        return f"{rule['sensor_name']} is {value:g}, {rule['condition']} {rule['threshold']:g}"
+    direction = 'rising' if rule['condition'] == 'rate_above' else 'falling'
+    return f"{rule['sensor_name']} {direction} {rate:+.2f}/min (limit {rule['threshold']:+g}/min)"
+
+
+# ==================== PERSISTENCE ====================
+
+def _insert_alert(rule, value, message, timestamp):
+    db.session.add(Alert(rule_id=rule['id'], account_id=rule['account_id'], robot_id=rule['robot_id'],
+                         sensor_name=rule['sensor_name'], value=value, message=message, triggered_at=timestamp))
+
+
+def _clear_alert(rule_id, timestamp):
+    Alert.query.filter(Alert.rule_id == rule_id, Alert.cleared_at.is_(None))\
+        .update({'cleared_at': timestamp}, synchronize_session=False)
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            # One thread, so a rule's insert and clear are written in order
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-writer')
+    return _writer
+
+
+def _write(app, work, args):
+    with app.app_context():
+        try:
+            db_engine.write(work, *args)
+        except Exception as e:
+            logger.error(f"Failed to save alert: {e!r}")
+        finally:
+            db.session.remove()
+
+
+def _persist(work, *args):
+    # Queued for the writer thread: its own app context and session, so the
+    # poller's session is never committed here and the poller doesn't wait
+    _get_writer().submit(_write, current_app._get_current_object(), work, args)
+
+
+# ==================== EVALUATION ====================
+
+def _step(state, value, rate, timestamp):
+    rule = state.rule
+    holds = _holds(rule, value, rate)
+    if holds is None:
+        return
+
+    if not holds:
+        state.since = None
+        if state.active:
+            state.active = False
+            _persist(_clear_alert, rule['id'], timestamp)
+            realtime.emit('sensor_alert_cleared', {
+                'rule_id': rule['id'], 'robot_id': rule['robot_id'], 'sensor_name': rule['sensor_name'],
+                'value': value, 'cleared_at': timestamp.isoformat()
+            }, room=realtime.account_room(rule['account_id']))
+        return
+
+    if state.since is None:
+        state.since = timestamp
+    if not state.active and (timestamp - state.since).total_seconds() >= rule['for_seconds']:
+        state.active = True
+        message = _describe(rule, value, rate)
+        _persist(_insert_alert, rule, value, message, timestamp)
+        realtime.emit('sensor_alert', {
+            'rule_id': rule['id'], 'robot_id': rule['robot_id'], 'sensor_name': rule['sensor_name'],
+            'condition': rule['condition'], 'value': value, 'message': message,
+            'triggered_at': timestamp.isoformat()
+        }, room=realtime.account_room(rule['account_id']))
+        logger.info(f"⚠ Alert for account {rule['account_id']}: {message}")
+
+
+def evaluate(robot_id, values, timestamp):
+    """Check one robot's live readings ({sensor_name: value}) taken at `timestamp` against its rules."""
+    with _lock:
+        if _loaded_at is None or time.monotonic() - _loaded_at > current_app.config.get('ALERT_RULES_TTL', 30):
+            _reload()
+
+        for sensor_name, value in values.items():
+            if not isinstance(value, (int, float)):
+                continue
+            key = (robot_id, sensor_name)
+            previous = _previous.get(key)
+            _previous[key] = (timestamp, value)
+
+            states = _states.get(key)
+            if not states:
+                continue
+            rate = None
+            if previous is not None and timestamp > previous[0]:
+                rate = (value - previous[1]) / ((timestamp - previous[0]).total_seconds() / 60)
+            for state in states:
+                _step(state, value, rate, timestamp)
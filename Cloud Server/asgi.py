@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI entry point (uvicorn and a2wsgi, from requirements.txt), e.g.
+    uvicorn asgi:app --host 127.0.0.1 --port 8000
+Routes that dial robots (viam_views.py) wait for Viam on the event loop
+instead of holding a worker thread, Socket.IO runs on the same loop, and the
+Viam connection pool shares it. Every other route is the usual Flask view in
+a pool of WEB_THREADS threads. Viam polling starts as with wsgi.py (see
+VIAM_POLLER) - run one process, or VIAM_POLLER=external and poller.py.
+"""
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from werkzeug.exceptions import HTTPException
+from main import app as flask_app, create_app
+import concurrent.futures
+import asyncio
+import io
+import logging
+import os
+import socketio
+
+import metrics
+import realtime
+import viam_views
+from viam_integration import get_pool
+
+logger = logging.getLogger(__name__)
+
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '100'))
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+wsgi_app = WSGIMiddleware(flask_app, workers=WEB_THREADS)
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=WEB_THREADS, thread_name_prefix='viam-view')
+url_adapter = flask_app.url_map.bind('localhost')
+loop = None
+
+
+# ==================== SOCKET.IO ====================
+
+@sio.event
+async def connect(sid, environ):
+    """Put each logged-in connection in its account's room, like main.on_socket_connect"""
+    metrics.SOCKETIO_CLIENTS.inc()
+    cookie = environ.get('HTTP_COOKIE', '')
+    with flask_app.test_request_context(headers={'Cookie': cookie}) as context:
+        session = flask_app.session_interface.open_session(flask_app, context.request)
+    if session and 'user_id' in session:
+        await sio.enter_room(sid, realtime.account_room(session['user_id']))
+
+
+@sio.event
+async def disconnect(sid, *args):
+    metrics.SOCKETIO_CLIENTS.dec()
+
+
+def emit(event, data, room=None):
+    # realtime.emit() is called from request threads, the scheduler and the loop itself
+    coro = sio.emit(event, data, to=room)
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(coro)
+    else:
+        asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+# ==================== HTTP ====================
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+def _is_viam_view(scope):
+    try:
+        endpoint, _ = url_adapter.match(scope['path'], scope['method'])
+    except HTTPException:
+        return False
+    return endpoint in viam_views.ENDPOINTS
+
+
+async def dispatcher(scope, receive, send):
+    if scope['type'] != 'http' or not _is_viam_view(scope):
+        return await wsgi_app(scope, receive, send)
+
+    environ = build_environ(scope, io.BytesIO(await _read_body(receive)))
+
+    def run_sync(fn, *args):
+        return asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    response = await viam_views.dispatch(flask_app, environ, run_sync)
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in response.headers.to_wsgi_list()]
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+# ==================== LIFESPAN ====================
+
+async def startup():
+    global loop
+    loop = asyncio.get_running_loop()
+    get_pool().use_loop(loop)
+    realtime.set_emitter(emit)
+    await loop.run_in_executor(None, create_app, 'web')
+    logger.info("✓ ASGI server ready (Viam pool and Socket.IO on the event loop)")
+
+
+async def shutdown():
+    stop_polling = flask_app.extensions.get('viam_polling_shutdown')
+    if stop_polling:
+        # Waits for running jobs, which need the loop - so not on it
+        await loop.run_in_executor(None, stop_polling)
+    await get_pool().aclose()
+    executor.shutdown(wait=False)
+
+
+app = socketio.ASGIApp(sio, other_asgi_app=dispatcher, on_startup=startup, on_shutdown=shutdown)
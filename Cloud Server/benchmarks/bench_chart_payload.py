@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Compare chart payload formats for one sensor's history.
+
+Builds the same readings as the classic per-reading JSON objects
+(SensorData.to_dict), the columnar JSON and the binary buffer from
+chart_data.py, and reports size (raw and gzip'ed) and decode time.
+
+Usage (from the Cloud Server folder):
+    python benchmarks/bench_chart_payload.py --points 500 5000 50000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build(points):
+    from chart_data import epoch_ms
+
+    start = datetime.utcnow() - timedelta(minutes=5 * points)
+    rows = []
+    for i in range(points):
+        timestamp = start + timedelta(minutes=5 * i)
+        rows.append({
+            'id': i + 1,
+            'sensor_id': 1,
+            'timestamp': timestamp.isoformat(),
+            'value': round(random.uniform(18, 28), 1),
+            'unit': '°C',
+            'extra_data': None,
+            'created_at': timestamp.isoformat()
+        })
+    t = [epoch_ms(start + timedelta(minutes=5 * i)) for i in range(points)]
+    v = [row['value'] for row in rows]
+    return rows, t, v
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, nargs='+', default=[500, 5000, 50000])
+    args = parser.parse_args()
+
+    from chart_data import to_binary, to_columnar
+
+    header = f"{'points':>7} {'format':<9} {'bytes':>10} {'gzip':>9} {'decode ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for points in args.points:
+        rows, t, v = build(points)
+        payloads = {
+            'objects': json.dumps({'data': rows}).encode(),
+            'columnar': json.dumps(to_columnar(t, v, '°C')).encode(),
+            'binary': to_binary(t, v)
+        }
+        decoders = {
+            'objects': lambda b: [datetime.fromisoformat(r['timestamp']) for r in json.loads(b)['data']],
+            'columnar': lambda b: json.loads(b)['t'],
+            'binary': lambda b: (array('q', b[:points * 8]), array('f', b[points * 8:]))
+        }
+        for name, body in payloads.items():
+            decode_ms = timed(lambda: decoders[name](body)) * 1000
+            print(f"{points:>7} {name:<9} {len(body):>10,} {len(gzip.compress(body)):>9,} {decode_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark password hash cost on this machine.
+
+For each method it measures single-hash latency and, through passwords.py's
+worker pool, throughput and latency under a login burst. Pick the strongest
+method whose single-hash time stays within your login budget (~250 ms is a
+common target) and set it as PASSWORD_HASH_METHOD.
+
+Usage (from the Cloud Server folder):
+    python benchmarks/bench_password_hash.py
+    python benchmarks/bench_password_hash.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --burst 32 --workers 1 2 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_METHODS = [
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def single_hash(method, samples):
+    from werkzeug.security import generate_password_hash
+
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        generate_password_hash('correct horse battery staple', method)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def burst(method, workers, size):
+    """Fire `size` concurrent hashes through a fresh pool of `workers` threads."""
+    from config import Config
+    import passwords
+
+    passwords.shutdown()
+    Config.PASSWORD_HASH_METHOD = method
+    Config.PASSWORD_HASH_WORKERS = workers
+    Config.PASSWORD_HASH_MAX_PENDING = size
+    Config.PASSWORD_HASH_WAIT = 600
+
+    latencies = []
+    lock = threading.Lock()
+
+    def login():
+        started = time.perf_counter()
+        passwords.hash_password('correct horse battery staple')
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=login) for _ in range(size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    passwords.shutdown()
+    return size / elapsed, percentile(latencies, 50), percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--samples', type=int, default=5, help='single-hash samples per method')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument('--burst', type=int, default=16, help='concurrent logins per burst')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    header = f"{'method':<24} {'1 hash':>9} {'workers':>8} {'hashes/s':>9} {'burst p50':>10} {'burst p95':>10}"
+    print(header)
+    print('-' * len(header))
+    for method in args.methods:
+        single = single_hash(method, args.samples)
+        for workers in sorted(set(args.workers)):
+            rate, p50, p95 = burst(method, workers, args.burst)
+            print(f"{method:<24} {single * 1000:>7.0f}ms {workers:>8} {rate:>9.1f} {p50 * 1000:>8.0f}ms {p95 * 1000:>8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
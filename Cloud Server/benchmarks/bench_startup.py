@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Measure cold start of the Cloud Server entry points.
+
+Each scenario runs in a fresh interpreter, several times, and the median wall
+time is reported:
+- import main            (what tests, shells and tools pay)
+- create_app('cli')      (migration scripts)
+- create_app('web')      (web process, starts Viam polling)
+- create_poller_app()    (poller.py / seed_db.py)
+With --importtime the slowest imports of `import main` are listed as well.
+
+Usage (from the Cloud Server folder):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --importtime
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = [
+    ('import main', 'import main'),
+    ("create_app('cli')", "import main; main.create_app('cli')"),
+    ("create_app('web')", "import main; main.create_app('web')"),
+    ('create_poller_app()', 'import poller; poller.create_poller_app()'),
+]
+
+
+def run_once(code, env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=SERVER_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def slowest_imports(env, count):
+    """Modules with the highest self import time when importing main."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=SERVER_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        if self_us.strip().isdigit():
+            rows.append((int(self_us), int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', action='store_true', help='list the slowest imports of main')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    print(f"{'scenario':<22} {'median':>9} {'min':>9}")
+    print('-' * 42)
+    for name, code in SCENARIOS:
+        run_once(code, env)  # warm the bytecode and OS file caches
+        timings = [run_once(code, env) for _ in range(args.runs)]
+        print(f"{name:<22} {statistics.median(timings) * 1000:>7.0f}ms {min(timings) * 1000:>7.0f}ms")
+
+    if args.importtime:
+        print("\nSlowest imports of main (self time):")
+        for self_us, cumulative_us, module in slowest_imports(env, args.top):
+            print(f"  {self_us / 1000:>7.1f}ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark viam_integration against simulated robots (fake_viam.py).
+
+For each fleet size it measures:
+- live tick duration (fetch_live_sensor_data)
+- store tick duration (fetch_and_store_robots, which queues the readings)
+- DB write throughput of draining the ingest queue (ingest_queue.py)
+- emit latency of the live payload through the local relay (live_relay.py)
+
+Usage (from the Cloud Server folder):
+    python benchmarks/bench_viam.py
+    python benchmarks/bench_viam.py --robots 1 10 100 --ticks 5 --latency-ms 40 --failure-rate 0.02
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_fleet(db, robot_count):
+    from models import Account, Robot, UserRobot
+
+    db.drop_all()
+    db.create_all()
+    account = Account(username='bench', email='bench@example.com', password_hash='-')
+    db.session.add(account)
+    db.session.flush()
+    for i in range(robot_count):
+        robot = Robot(robot_name=f'fake-{i}', viam_robot_address=f'fake-robot-{i}.local', status='disconnected')
+        db.session.add(robot)
+        db.session.flush()
+        db.session.add(UserRobot.create_encrypted(account.id, robot.id, f'key-{i}', f'key-id-{i}'))
+    db.session.commit()
+
+
+def measure_emit_latency(payload, samples, address):
+    """Send the live payload through the relay and time its arrival on the web side."""
+    from live_relay import RelayPublisher, start_relay
+
+    latencies = []
+    arrived = threading.Event()
+
+    def handler(event, data, room):
+        latencies.append(time.perf_counter() - data['sent_at'])
+        arrived.set()
+
+    authkey = b'bench'
+    try:
+        start_relay(address, authkey, handler)
+    except RuntimeError as e:
+        print(f"  skipping relay latency: {e}")
+        return []
+    publisher = RelayPublisher(address, authkey)
+
+    # The first message pays for the connection handshake - don't count it
+    for _ in range(samples + 1):
+        arrived.clear()
+        publisher.publish('live_sensor_data', {'success': True, 'readings': payload, 'sent_at': time.perf_counter()})
+        if not arrived.wait(timeout=5):
+            break
+    publisher.close()
+    return latencies[1:]
+
+
+def run(robot_counts, ticks, fleet_options, relay_port):
+    workdir = tempfile.mkdtemp()
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['INGEST_QUEUE_PATH'] = os.path.join(workdir, 'ingest_queue.db')
+    import logging
+    logging.basicConfig(level=logging.ERROR)
+
+    from extensions import db
+    from fake_viam import FakeViamFleet
+    from poller import create_poller_app
+    import ingest_queue
+    import realtime
+    import viam_integration
+
+    app = create_poller_app()
+    app.config['VIAM_POLL_TIMEOUT'] = 60
+    realtime.set_publisher(lambda event, data, room: None)
+
+    rows = []
+    for index, count in enumerate(robot_counts):
+        fleet = FakeViamFleet(**fleet_options)
+        viam_integration.set_pool(viam_integration.ViamConnectionPool(
+            dial=fleet.dial, sensor_from_robot=fleet.sensor_from_robot))
+
+        with app.app_context():
+            seed_fleet(db, count)
+
+            # First tick dials every robot; report it separately
+            started = time.perf_counter()
+            live = viam_integration.fetch_live_sensor_data()
+            first_tick = time.perf_counter() - started
+
+            live_ticks = []
+            for _ in range(ticks):
+                started = time.perf_counter()
+                live = viam_integration.fetch_live_sensor_data()
+                live_ticks.append(time.perf_counter() - started)
+
+            store_ticks = []
+            queued = 0
+            for _ in range(ticks):
+                started = time.perf_counter()
+                results = viam_integration.fetch_and_store_robots()
+                store_ticks.append(time.perf_counter() - started)
+                queued += sum(r['readings_queued'] for r in results.values())
+
+            # Write what the ticks queued (the background writer may already have started)
+            started = time.perf_counter()
+            ingest_queue.flush()
+            drain = time.perf_counter() - started
+
+        emit = measure_emit_latency(live, samples=50, address=f'127.0.0.1:{relay_port + index}')
+        rows.append({
+            'robots': count,
+            'dials': fleet.dials,
+            'first_tick_s': first_tick,
+            'live_p50_s': percentile(live_ticks, 50),
+            'live_p95_s': percentile(live_ticks, 95),
+            'store_mean_s': statistics.mean(store_ticks),
+            'drain_s': drain,
+            'rows_per_s': queued / (sum(store_ticks) + drain) if store_ticks else 0.0,
+            'emit_p50_ms': percentile(emit, 50) * 1000,
+            'emit_p95_ms': percentile(emit, 95) * 1000
+        })
+
+    viam_integration.get_pool().close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--robots', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--ticks', type=int, default=3, help='measured ticks per fleet size')
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--dial-latency-ms', type=float, default=150.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--relay-port', type=int, default=16543)
+    args = parser.parse_args()
+
+    rows = run(args.robots, args.ticks, {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'dial_latency_ms': args.dial_latency_ms,
+        'failure_rate': args.failure_rate,
+        'seed': 1
+    }, args.relay_port)
+
+    header = f"{'robots':>7} {'dials':>6} {'1st tick':>9} {'live p50':>9} {'live p95':>9} {'store':>8} {'drain':>8} {'rows/s':>9} {'emit p50':>9} {'emit p95':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['robots']:>7} {row['dials']:>6} {row['first_tick_s']:>8.3f}s {row['live_p50_s']:>8.3f}s "
+              f"{row['live_p95_s']:>8.3f}s {row['store_mean_s']:>7.3f}s {row['drain_s']:>7.3f}s {row['rows_per_s']:>9.0f} "
+              f"{row['emit_p50_ms']:>7.2f}ms {row['emit_p95_ms']:>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP load test for the Cloud Server routes.
+
+Concurrent clients log in as the accounts created by seed_db.py and hit:
+- GET  /data
+- GET  /api/latest-readings
+- GET  /api/sensor-data/<id>?hours=24
+- POST /api/sensor-data/upload
+
+and p50/p95/p99 latency and throughput are reported per route. Save a run with
+--save and compare a later run against it with --baseline. With --pool the
+server's /metrics is sampled during the run and the peak number of database
+connections in use is printed next to the pool capacity (Postgres profile).
+
+Usage (server already running, database seeded with seed_db.py):
+    python benchmarks/load_test.py --base-url http://127.0.0.1:5000 --clients 16 --duration 60
+    python benchmarks/load_test.py --save baseline.json
+    python benchmarks/load_test.py --baseline baseline.json
+    python benchmarks/load_test.py --clients 64 --pool --metrics-token $METRICS_TOKEN
+"""
+
+import argparse
+import http.client
+import json
+import random
+import ssl
+import sys
+import threading
+import time
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+ROUTES = ('data', 'latest', 'history', 'upload')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Client:
+    """One keep-alive HTTP connection with its own session cookie."""
+
+    def __init__(self, base_url, insecure=False):
+        parts = urlsplit(base_url)
+        if parts.scheme == 'https':
+            context = ssl._create_unverified_context() if insecure else None
+            self.conn = http.client.HTTPSConnection(parts.hostname, parts.port or 443, context=context, timeout=60)
+        else:
+            self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection - reconnect once
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+        data = response.read()
+        # Session cookies are Secure; keep them even over plain HTTP
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        return response.status, data
+
+    def get_json(self, path):
+        status, data = self.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f'GET {path} returned {status}')
+        return json.loads(data)
+
+
+def login(client, account):
+    body = urlencode({'email': f'loadtest{account}@example.com', 'password': 'loadtest'})
+    status, _ = client.request('POST', '/login', body=body,
+                               headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    if status != 302 or 'session' not in client.cookies:
+        raise RuntimeError(f'Login failed for loadtest{account} (HTTP {status}) - seeded with seed_db.py?')
+
+
+def discover_sensors(client):
+    sensor_ids = []
+    for device in client.get_json('/api/devices')['devices']:
+        sensors = client.get_json(f"/api/robot/{device['robot_id']}/sensors")['sensors']
+        sensor_ids.extend(s['id'] for s in sensors)
+    return sensor_ids
+
+
+def worker(index, args, deadline, results, lock):
+    client = Client(args.base_url, args.insecure)
+    login(client, index % args.accounts)
+    sensor_ids = discover_sensors(client)
+    rng = random.Random(index)
+    local = {route: ([], 0) for route in args.routes}
+
+    while time.perf_counter() < deadline:
+        route = rng.choice(args.routes)
+        if route == 'data':
+            method, path, body, headers = 'GET', '/data', None, {}
+        elif route == 'latest':
+            method, path, body, headers = 'GET', '/api/latest-readings', None, {}
+        elif route == 'history':
+            method, path, body, headers = 'GET', f'/api/sensor-data/{rng.choice(sensor_ids)}?hours=24', None, {}
+        else:
+            now = datetime.utcnow().isoformat()
+            body = json.dumps({
+                'sensor_id': rng.choice(sensor_ids),
+                'data': [{'timestamp': now, 'value': rng.uniform(18, 28), 'unit': '°C'}
+                         for _ in range(args.upload_batch)]
+            })
+            method, path, headers = 'POST', '/api/sensor-data/upload', {'Content-Type': 'application/json'}
+
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, body=body, headers=headers)
+            ok = status < 400
+        except Exception:
+            ok = False
+        latencies, errors = local[route]
+        if ok:
+            latencies.append(time.perf_counter() - started)
+            local[route] = (latencies, errors)
+        else:
+            local[route] = (latencies, errors + 1)
+
+    with lock:
+        for route, (latencies, errors) in local.items():
+            results[route]['latencies'].extend(latencies)
+            results[route]['errors'] += errors
+
+
+def read_gauge(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    return None
+
+
+def sample_pool(args, deadline, pool):
+    """Poll /metrics for the database pool gauges until the run ends."""
+    client = Client(args.base_url, args.insecure)
+    headers = {'Authorization': f'Bearer {args.metrics_token}'} if args.metrics_token else {}
+    while time.perf_counter() < deadline:
+        try:
+            status, data = client.request('GET', '/metrics', headers=headers)
+        except Exception:
+            status = None
+        if status == 200:
+            text = data.decode()
+            checked_out = read_gauge(text, 'mybuddy_db_pool_checked_out')
+            if checked_out is not None:
+                pool['peak'] = max(pool.get('peak', 0), checked_out)
+            pool['capacity'] = read_gauge(text, 'mybuddy_db_pool_capacity')
+        time.sleep(0.25)
+
+
+def run(args):
+    results = {route: {'latencies': [], 'errors': 0} for route in args.routes}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=worker, args=(i, args, deadline, results, lock)) for i in range(args.clients)]
+    pool = {}
+    if args.pool:
+        threads.append(threading.Thread(target=sample_pool, args=(args, deadline, pool)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for route, result in results.items():
+        latencies = result['latencies']
+        report[route] = {
+            'requests': len(latencies),
+            'errors': result['errors'],
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000
+        }
+    if args.pool:
+        report['_pool'] = pool
+    return report
+
+
+def print_report(report, baseline=None):
+    header = f"{'route':<9} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    print('-' * len(header))
+    for route, row in report.items():
+        if route == '_pool':
+            continue
+        line = (f"{route:<9} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        if baseline and route in baseline and baseline[route]['p95_ms']:
+            change = (row['p95_ms'] / baseline[route]['p95_ms'] - 1) * 100
+            line += f" {change:>+11.1f}%"
+        print(line)
+
+    pool = report.get('_pool')
+    if pool is not None:
+        if 'peak' not in pool:
+            print("\nDB pool: no samples (is /metrics reachable, --metrics-token set?)")
+        else:
+            capacity = f"{pool['capacity']:.0f}" if pool.get('capacity') else 'unbounded (SQLite)'
+            print(f"\nDB pool: peak {pool['peak']:.0f} connections checked out, capacity {capacity}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--accounts', type=int, default=20, help='seeded accounts to spread clients over')
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, default=list(ROUTES))
+    parser.add_argument('--upload-batch', type=int, default=10, help='readings per upload request')
+    parser.add_argument('--pool', action='store_true', help='sample database pool usage from /metrics')
+    parser.add_argument('--metrics-token', help='METRICS_TOKEN of the server, for --pool')
+    parser.add_argument('--insecure', action='store_true', help='skip TLS certificate verification')
+    parser.add_argument('--save', help='write the report to this JSON file')
+    parser.add_argument('--baseline', help='compare against a report saved with --save')
+    args = parser.parse_args()
+
+    print(f"Load testing {args.base_url} with {args.clients} clients for {args.duration:.0f}s...")
+    report = run(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved report to {args.save}")
+
+    if any(row.get('errors') for row in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
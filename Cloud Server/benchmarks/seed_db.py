@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Seed the database with synthetic accounts, robots, sensors and readings for
+load tests. Readings come from the Local Server's workload generator (daily
+curves, weather drift, motion bursts; needs numpy), one per sensor every few
+minutes, and are bulk-inserted, so millions of rows take seconds rather than hours.
+
+Every account logs in as loadtest<N>@example.com with password "loadtest".
+
+Usage (from the Cloud Server folder; uses SQLALCHEMY_DATABASE_URI like the app):
+    python benchmarks/seed_db.py --accounts 20 --robots 2 --days 90
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+CLOUD_SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CLOUD_SERVER)
+# workload.py lives with the dev server
+sys.path.insert(0, os.path.join(os.path.dirname(CLOUD_SERVER), 'Local Server'))
+
+PASSWORD = 'loadtest'
+
+# Same sensors as viam_integration.VIAM_SENSORS, with the workload.py sensor that feeds them
+SENSORS = [
+    ('DHT22 Temperature', '°C', 'temperature'),
+    ('DHT22 Humidity', '%', 'humidity'),
+    ('VEML7700 Light', 'lux', 'light'),
+    ('MH-SR602 Motion', 'bool', 'motion'),
+]
+
+BATCH_SIZE = 50000
+
+
+def seed(accounts, robots_per_account, days, interval_minutes, reset, seed=None):
+    from sqlalchemy import insert
+    from workload import WorkloadGenerator
+    from extensions import db
+    from models import Account, Robot, UserRobot, Sensor, SensorData
+
+    if reset:
+        db.drop_all()
+    db.create_all()
+
+    # One hash reused for every account - hashing is deliberately slow
+    template = Account(username='-', email=None)
+    template.set_password(PASSWORD)
+
+    robot_sensors = []  # per robot: [(sensor id, unit, workload field)]
+    for a in range(accounts):
+        account = Account(username=f'loadtest{a}', email=f'loadtest{a}@example.com',
+                          password_hash=template.password_hash)
+        db.session.add(account)
+        db.session.flush()
+        for r in range(robots_per_account):
+            robot = Robot(robot_name=f'loadtest-{a}-{r}', viam_robot_address=f'loadtest-{a}-{r}.local',
+                          status='offline')
+            db.session.add(robot)
+            db.session.flush()
+            db.session.add(UserRobot.create_encrypted(account.id, robot.id, 'key', 'key-id'))
+            sensors = []
+            for name, unit, field in SENSORS:
+                sensor = Sensor(name=name, sensor_type='viam', robot_id=robot.id)
+                db.session.add(sensor)
+                db.session.flush()
+                sensors.append((sensor.id, unit, field))
+            robot_sensors.append(sensors)
+    db.session.commit()
+
+    generator = WorkloadGenerator(rate=1 / (interval_minutes * 60), duration=days * 86400,
+                                  robots=len(robot_sensors), sensors=[field for _, _, field in SENSORS],
+                                  seed=seed, chunk_size=BATCH_SIZE // len(SENSORS))
+    total = len(generator)
+    print(f"Inserting {total:,} readings ({len(robot_sensors) * len(SENSORS)} sensors x {generator.samples:,} points)...")
+
+    started = time.perf_counter()
+    batch = []
+    inserted = 0
+    for robot, columns in generator.chunks():
+        timestamps = [datetime.utcfromtimestamp(t) for t in columns['timestamp'].tolist()]
+        for sensor_id, unit, field in robot_sensors[robot]:
+            batch.extend({'sensor_id': sensor_id, 'timestamp': timestamp, 'value': value,
+                          'unit': unit, 'created_at': timestamp}
+                         for timestamp, value in zip(timestamps, columns[field].tolist()))
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(SensorData), batch)
+            db.session.commit()
+            inserted += len(batch)
+            batch = []
+            print(f"  {inserted:,}/{total:,} ({inserted / (time.perf_counter() - started):,.0f} rows/s)", end='\r')
+    if batch:
+        db.session.execute(insert(SensorData), batch)
+        db.session.commit()
+        inserted += len(batch)
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✓ Seeded {accounts} accounts, {accounts * robots_per_account} robots, "
+          f"{inserted:,} readings in {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--robots', type=int, default=2, help='robots per account')
+    parser.add_argument('--days', type=int, default=90, help='days of history per sensor')
+    parser.add_argument('--interval-minutes', type=int, default=5)
+    parser.add_argument('--reset', action='store_true', help='drop all tables first (destroys existing data!)')
+    parser.add_argument('--seed', type=int, help='random seed, for the same readings on every run')
+    args = parser.parse_args()
+
+    from poller import create_poller_app
+    app = create_poller_app()
+    with app.app_context():
+        seed(args.accounts, args.robots, args.days, args.interval_minutes, args.reset, args.seed)
+
+
+if __name__ == '__main__':
+    main()
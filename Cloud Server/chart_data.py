@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Chart Data Module
+Sensor history as parallel columns instead of one JSON object per reading:
+epoch-millisecond timestamps and values. Only the two columns are loaded (no
+ORM objects, no ISO strings), and the result is sent either as compact JSON
+({"t": [...], "v": [...]}) or as a binary buffer the browser reads straight
+into typed arrays.
+
+Binary layout (little-endian): count x int64 epoch ms, then count x float32.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from extensions import db
+import db_engine
+import partitions
+import sys
+
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+FORMATS = ('columnar', 'binary')
+BINARY_MIMETYPE = 'application/octet-stream'
+
+
+def epoch_ms(timestamp):
+    """Naive UTC datetime -> integer epoch milliseconds."""
+    return (timestamp - EPOCH) // MILLISECOND
+
+
+def load_series(sensor_id, since=None, limit=None, newest=False):
+    """
+    Chronological (timestamps_ms, values, unit) for one sensor.
+    newest=True keeps the most recent `limit` readings instead of the oldest.
+    """
+    since, until = partitions.window(sensor_id, limit, since=since, newest=newest)
+    readings = partitions.readings(sensor_id, since, until)
+    query = db.session.query(readings.timestamp, readings.value, readings.unit)\
+        .filter(readings.sensor_id == sensor_id)
+    if since is not None:
+        query = query.filter(readings.timestamp >= since)
+    if until is not None:
+        query = query.filter(readings.timestamp < until)
+    query = query.order_by(readings.timestamp.desc() if newest else readings.timestamp.asc())
+    if limit:
+        query = query.limit(limit)
+
+    rows = list(db_engine.stream(query))
+    if newest:
+        rows.reverse()
+    t = [epoch_ms(row.timestamp) for row in rows]
+    v = [row.value for row in rows]
+    unit = rows[-1].unit if rows else None
+    return t, v, unit
+
+
+def to_columnar(t, v, unit):
+    return {'unit': unit, 'count': len(t), 't': t, 'v': v}
+
+
+def to_binary(t, v):
+    times = array('q', t)
+    values = array('f', v)
+    if sys.byteorder == 'big':
+        times.byteswap()
+        values.byteswap()
+    return times.tobytes() + values.tobytes()
@@ -1,13 +1,103 @@
 import os
 
+# Fallback session key for local development only (the poller relay refuses it)
+DEV_SECRET_KEY = 'dev-key-only-for-local-testing'
+
+
+def _database_uri():
+    uri = os.environ.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///mybuddy.db'
+    # Hosting providers hand out postgres://, which SQLAlchemy no longer accepts
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def _engine_options(uri):
+    """
+    Connection pool for the production Postgres profile. Every process gets an
+    equal share of DB_MAX_CONNECTIONS: one per gunicorn worker plus one for
+    poller.py / migrations, so pool_size + max_overflow across all of them
+    never exceeds what the server allows.
+    """
+    if not uri.startswith('postgresql'):
+        return {}
+
+    workers = int(os.environ.get('WEB_WORKERS', '1'))
+    threads = int(os.environ.get('WEB_THREADS', '100'))
+    budget = max(2, int(os.environ.get('DB_MAX_CONNECTIONS', '90')) // (workers + 1))
+    pool_size = int(os.environ.get('DB_POOL_SIZE') or max(1, min(threads, budget) // 2))
+    max_overflow = int(os.environ.get('DB_MAX_OVERFLOW') or max(0, min(threads, budget) - pool_size))
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        # Fail a request after this many seconds without a free connection instead of piling up
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        # Test connections on checkout and replace them before proxies/firewalls drop them
+        'pool_pre_ping': True,
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'connect_args': {
+            'application_name': os.environ.get('DB_APPLICATION_NAME', 'mybuddy'),
+            'options': f'-c statement_timeout={statement_timeout}'
+        }
+    }
+
+
 class Config:
     # For local development use a SQLite DB file in the project root if no env var is set.
     # To connect to remote DB, set SQLAlchemy_DATABASE_URI in env variables.
-    SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///mybuddy.db'
+    SQLALCHEMY_DATABASE_URI = _database_uri()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Postgres (production): pool sized from WEB_WORKERS, WEB_THREADS and
+    # DB_MAX_CONNECTIONS, pre-ping, recycle and a statement timeout - see _engine_options
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    # Rows fetched per round trip when streaming history and CSV exports
+    # (server-side cursors on Postgres)
+    DB_STREAM_BATCH = int(os.environ.get('DB_STREAM_BATCH', '2000'))
+
+    # SQLite connection pragmas (db_engine.py). WAL lets the dashboard read
+    # while the poller writes; NORMAL sync is durable enough with WAL
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536'))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    # Milliseconds a writer waits for the lock before "database is locked"
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    # Coalesce ingest writes into group commits on one writer thread:
+    # 'auto' (SQLite in WAL mode only), '1' or '0'
+    DB_GROUP_COMMIT = os.environ.get('DB_GROUP_COMMIT', 'auto')
+    DB_GROUP_COMMIT_MAX_BATCH = int(os.environ.get('DB_GROUP_COMMIT_MAX_BATCH', '200'))
+    DB_GROUP_COMMIT_DELAY_MS = float(os.environ.get('DB_GROUP_COMMIT_DELAY_MS', '5'))
+
+    # Durable queue between Viam fetches and the database (ingest_queue.py): a
+    # local SQLite file, instance/ingest_queue.db by default. FULL syncs every append
+    INGEST_QUEUE_PATH = os.environ.get('INGEST_QUEUE_PATH', '')
+    INGEST_QUEUE_SYNCHRONOUS = os.environ.get('INGEST_QUEUE_SYNCHRONOUS', 'FULL')
+    # Queued robot fetches stored per database transaction
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', '500'))
+    # Milliseconds the writer waits after new entries so a whole fetch round lands in one batch
+    INGEST_FLUSH_DELAY_MS = float(os.environ.get('INGEST_FLUSH_DELAY_MS', '250'))
+    # Seconds a writer owns the entries it claimed before another process may take them over
+    INGEST_CLAIM_TIMEOUT = float(os.environ.get('INGEST_CLAIM_TIMEOUT', '120'))
+    # Longest pause between retries while the database is unavailable
+    INGEST_MAX_BACKOFF = float(os.environ.get('INGEST_MAX_BACKOFF', '60'))
+    # Failed stores of one queued fetch (rejected by the database on its own) before
+    # it is moved to the queue file's dead_readings table
+    INGEST_MAX_ATTEMPTS = int(os.environ.get('INGEST_MAX_ATTEMPTS', '5'))
+
+    # Time partitioning of sensor_data (partitions.py): one partition per 'day',
+    # 'week' or 'month'. SQLite moves finished periods into their own tables;
+    # Postgres uses native partitions after migrate_partition_sensor_data.py
+    SENSOR_DATA_PARTITIONING = os.environ.get('SENSOR_DATA_PARTITIONING', '0').lower() in ('1', 'true', 'yes')
+    SENSOR_DATA_PARTITION_PERIOD = os.environ.get('SENSOR_DATA_PARTITION_PERIOD', 'month')
+    # Postgres: periods created ahead of time by the daily maintenance job
+    SENSOR_DATA_PARTITIONS_AHEAD = int(os.environ.get('SENSOR_DATA_PARTITIONS_AHEAD', '2'))
+    # Days of readings to keep (0 = forever); whole partitions past it are dropped
+    SENSOR_DATA_RETENTION_DAYS = int(os.environ.get('SENSOR_DATA_RETENTION_DAYS', '0'))
     
     # Secret key for sessions - loaded from environment variable
-    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-only-for-local-testing')
+    SECRET_KEY = os.environ.get('SECRET_KEY', DEV_SECRET_KEY)
     
     # Security settings - CRITICAL for protecting user credentials
     SESSION_COOKIE_SECURE = True  # Only send cookies over HTTPS
@@ -15,3 +105,70 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'  # Prevent CSRF attacks
     REMEMBER_COOKIE_SECURE = True
     REMEMBER_COOKIE_HTTPONLY = True
+
+    # Viam polling: 'embedded' runs the scheduler inside the web process,
+    # 'external' leaves it to poller.py running as its own process.
+    VIAM_POLLER = os.environ.get('VIAM_POLLER', 'embedded')
+    # Local address the web process listens on for events relayed by poller.py
+    VIAM_POLLER_IPC_ADDRESS = os.environ.get('VIAM_POLLER_IPC_ADDRESS', '127.0.0.1:6543')
+    # Seconds to wait for one polling round of a robot before giving up
+    VIAM_POLL_TIMEOUT = float(os.environ.get('VIAM_POLL_TIMEOUT', '15'))
+    # Worker threads for user-triggered Viam jobs (manual fetch)
+    VIAM_JOB_WORKERS = int(os.environ.get('VIAM_JOB_WORKERS', '2'))
+    # Seconds between checks for queued Viam jobs (how poller.py picks up manual fetches)
+    VIAM_JOB_POLL_INTERVAL = float(os.environ.get('VIAM_JOB_POLL_INTERVAL', '2'))
+    # Seconds a robot's connection test result is reused
+    VIAM_DIAGNOSTICS_TTL = float(os.environ.get('VIAM_DIAGNOSTICS_TTL', '30'))
+    # Seconds a robot's Viam configuration is reused for GET /api/robot/<id>/config (saves always reload it)
+    ROBOT_CONFIG_TTL = float(os.environ.get('ROBOT_CONFIG_TTL', '60'))
+
+    # /metrics requires "Authorization: Bearer <METRICS_TOKEN>" when set, and is
+    # only served to loopback clients that don't come through a proxy when not
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # host:port where a standalone poller.py exposes its own /metrics (off when empty)
+    POLLER_METRICS_ADDRESS = os.environ.get('POLLER_METRICS_ADDRESS', '')
+
+    # Simulate robots instead of dialing Viam (benchmarks/load tests only), e.g.
+    # "latency_ms=40,jitter_ms=20,failure_rate=0.05" - see fake_viam.py
+    VIAM_FAKE = os.environ.get('VIAM_FAKE', '')
+
+    # Development SQL profiler (query_profiler.py): per-request query counts,
+    # DB time and repeated statement shapes, logged when a threshold is crossed
+    SQL_PROFILER = os.environ.get('SQL_PROFILER', '').lower() in ('1', 'true', 'yes')
+    SQL_PROFILER_MAX_QUERIES = int(os.environ.get('SQL_PROFILER_MAX_QUERIES', '20'))
+    SQL_PROFILER_MAX_DB_MS = float(os.environ.get('SQL_PROFILER_MAX_DB_MS', '100'))
+    SQL_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('SQL_PROFILER_REPEAT_THRESHOLD', '5'))
+    SQL_PROFILER_SERVER_TIMING = os.environ.get('SQL_PROFILER_SERVER_TIMING', '1').lower() in ('1', 'true', 'yes')
+
+    # Rolling 1h/24h/7d sensor statistics (rolling_stats.py): time buckets per
+    # window, and seconds between top-ups with readings other processes stored
+    STATISTICS_BUCKETS = int(os.environ.get('STATISTICS_BUCKETS', '360'))
+    STATISTICS_SYNC_INTERVAL = float(os.environ.get('STATISTICS_SYNC_INTERVAL', '5'))
+    # Seconds of readings every top-up reads again, for rows committed after a higher id
+    STATISTICS_SYNC_OVERLAP = float(os.environ.get('STATISTICS_SYNC_OVERLAP', '120'))
+    # Seconds after which a sensor's statistics are reloaded from the database
+    STATISTICS_RECONCILE_INTERVAL = float(os.environ.get('STATISTICS_RECONCILE_INTERVAL', '600'))
+
+    # Seconds alert rules are cached by the live-reading rule engine (alerts.py);
+    # changes apply at once in the same process, and within VIAM_JOB_POLL_INTERVAL
+    # in poller.py (VIAM_POLLER=external)
+    ALERT_RULES_TTL = float(os.environ.get('ALERT_RULES_TTL', '30'))
+
+    # Seconds the logged-in account's robots and sensors are reused between
+    # requests (account_cache.py); device changes in this process clear it at once
+    ACCOUNT_CACHE_TTL = float(os.environ.get('ACCOUNT_CACHE_TTL', '10'))
+
+    # gzip/brotli for text responses of at least COMPRESS_MIN_SIZE bytes (http_cache.py);
+    # turn off when a proxy in front already compresses
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))
+
+    # Password hashing (passwords.py): werkzeug method string with algorithm and
+    # cost; existing hashes are upgraded on the next login when this changes
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Threads hashing passwords at once - caps the CPU/memory a login burst can take
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    # Hashes allowed to queue behind the workers, and seconds to wait for a slot
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '32'))
+    PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', '10'))
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Database Engine Module
+SQLite tuning, group commits for the ingest paths and streamed reads.
+
+- Every SQLite connection gets WAL journaling (readers no longer block the
+  writer and vice versa), synchronous=NORMAL (safe with WAL, one fsync per
+  checkpoint instead of per commit), a larger page cache, memory-mapped reads
+  and a busy timeout so a second writer waits instead of failing with
+  "database is locked". See the SQLITE_* settings in config.py.
+- write(work, *args) runs `work` on a single writer thread that batches
+  whatever arrives within DB_GROUP_COMMIT_DELAY into one transaction and
+  commits once. If a batch fails, its items are retried one by one so one bad
+  item can't sink the others. With group commit off (the default for other
+  databases), work runs inline and commits in the caller's session.
+- stream(query) reads large results DB_STREAM_BATCH rows at a time through a
+  server-side cursor on Postgres (the pool itself is configured in config.py).
+
+Work functions use db.session as usual; on the writer thread that is the
+writer's own session, so they must not rely on objects loaded by the caller.
+"""
+
+from concurrent.futures import Future
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from extensions import db
+import metrics
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_pragmas = {}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not _pragmas:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def _configure_sqlite(app):
+    _pragmas.clear()
+    _pragmas.update({
+        'journal_mode': app.config['SQLITE_JOURNAL_MODE'],
+        'synchronous': app.config['SQLITE_SYNCHRONOUS'],
+        # Negative cache_size is in KiB
+        'cache_size': -abs(app.config['SQLITE_CACHE_SIZE_KB']),
+        'mmap_size': app.config['SQLITE_MMAP_SIZE'],
+        'busy_timeout': app.config['SQLITE_BUSY_TIMEOUT_MS']
+    })
+    if not event.contains(Engine, 'connect', _apply_sqlite_pragmas):
+        event.listen(Engine, 'connect', _apply_sqlite_pragmas)
+
+
+class GroupCommitWriter:
+    """Single writer thread that coalesces concurrent writes into group commits."""
+
+    def __init__(self, app, max_batch=200, max_delay=0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, work, *args):
+        future = Future()
+        self._queue.put((work, args, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-group-commit', daemon=True)
+                self._thread.start()
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            metrics.DB_GROUP_COMMIT_SIZE.observe(len(batch))
+            with self.app.app_context():
+                self._commit(batch)
+                db.session.remove()
+
+    def _commit(self, batch):
+        results = []
+        try:
+            for work, args, _ in batch:
+                results.append(work(*args))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            logger.warning(f"Group commit of {len(batch)} writes failed ({type(e).__name__}), retrying one by one")
+            for item in batch:
+                self._commit([item])
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def _group_commit_enabled(app):
+    setting = str(app.config['DB_GROUP_COMMIT']).lower()
+    if setting in ('1', 'true', 'yes'):
+        return True
+    if setting != 'auto':
+        return False
+    # Only worth it - and only safe while callers hold read transactions - with SQLite in WAL mode
+    return (app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite')
+            and str(app.config['SQLITE_JOURNAL_MODE']).upper() == 'WAL')
+
+
+def init_app(app):
+    """Install SQLite pragmas and, where enabled, the group-commit writer."""
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        _configure_sqlite(app)
+        logger.info(f"✓ SQLite journal_mode={app.config['SQLITE_JOURNAL_MODE']}, "
+                    f"synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if 'pool_size' in options:
+        metrics.DB_POOL_CAPACITY.set(options['pool_size'] + options.get('max_overflow', 0))
+        logger.info(f"✓ Database pool: {options['pool_size']} connections + {options.get('max_overflow', 0)} overflow")
+
+    if _group_commit_enabled(app):
+        app.extensions['db_writer'] = GroupCommitWriter(
+            app, max_batch=app.config['DB_GROUP_COMMIT_MAX_BATCH'],
+            max_delay=app.config['DB_GROUP_COMMIT_DELAY_MS'] / 1000)
+
+
+def submit(work, *args):
+    """Queue work(*args) for the next group commit. Returns a Future with its result."""
+    writer = current_app.extensions.get('db_writer')
+    if writer is None:
+        future = Future()
+        try:
+            result = work(*args)
+            db.session.commit()
+            future.set_result(result)
+        except Exception as e:
+            db.session.rollback()
+            future.set_exception(e)
+        return future
+    return writer.submit(work, *args)
+
+
+def write(work, *args, timeout=None):
+    """Run work(*args) in a committed transaction and return its result."""
+    return submit(work, *args).result(timeout)
+
+
+def stream(query):
+    """Iterate a Query in DB_STREAM_BATCH-row chunks instead of buffering the whole result."""
+    return query.yield_per(current_app.config.get('DB_STREAM_BATCH', 2000))
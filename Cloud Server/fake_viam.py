@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Fake Viam Robots
+Simulated robots exposing the DHT22, VEML7700 and MH-SR602 components from
+viam_integration.VIAM_SENSORS, with configurable latency, jitter and failure
+rates. Used by the benchmarks and for load tests (set VIAM_FAKE) - never in
+production.
+
+Clients mirror the parts of the SDK's RobotClient that viam_integration uses
+(Options.with_api_key, at_address, resource_names, close), and sensors mirror
+Sensor.get_readings. Robot configurations live in memory, one per address.
+"""
+
+import asyncio
+import copy
+import math
+import random
+import time
+import zlib
+
+
+class FakeViamError(Exception):
+    """Simulated network/robot failure."""
+
+
+class FakeSensor:
+    """Stand-in for viam.components.sensor.Sensor."""
+
+    def __init__(self, fleet, robot, name):
+        self.fleet = fleet
+        self.robot = robot
+        self.name = name
+
+    async def get_readings(self):
+        await self.fleet.delay(self.fleet.latency_ms)
+        if self.robot.closed:
+            raise FakeViamError('connection closed')
+        if self.fleet.roll_failure():
+            raise FakeViamError(f'simulated get_readings failure on {self.name}')
+        return self.fleet.readings_for(self.robot.address, self.name)
+
+
+class FakeRobotClient:
+    """Stand-in for viam.robot.client.RobotClient."""
+
+    class Options:
+        def __init__(self, api_key=None, api_key_id=None):
+            self.api_key = api_key
+            self.api_key_id = api_key_id
+
+        @classmethod
+        def with_api_key(cls, api_key, api_key_id):
+            return cls(api_key=api_key, api_key_id=api_key_id)
+
+    def __init__(self, fleet, address):
+        self.fleet = fleet
+        self.address = address
+        self.closed = False
+        self.resource_names = list(fleet.components)
+
+    @classmethod
+    async def at_address(cls, address, options, fleet=None):
+        await fleet.delay(fleet.dial_latency_ms)
+        if fleet.roll_failure():
+            raise FakeViamError(f'simulated dial failure to {address}')
+        fleet.dials += 1
+        return cls(fleet, address)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeViamFleet:
+    """
+    Any robot address dials successfully (subject to failure_rate), so a fleet
+    of N robots is simply N Robot rows with distinct addresses.
+    """
+
+    components = ('DHT22', 'VEML7700', 'MH-SR602')
+
+    # Configuration every robot starts with (models from the DHT22 module and the RDK)
+    default_config = {
+        'components': [
+            {'name': 'DHT22', 'api': 'rdk:component:sensor', 'model': 'wootter:sensor:dht22',
+             'attributes': {'gpio_pin': '4'}},
+            {'name': 'VEML7700', 'api': 'rdk:component:sensor', 'model': 'viam:sensor:veml7700',
+             'attributes': {'i2c_bus': '1', 'i2c_address': '0x10'}},
+            {'name': 'MH-SR602', 'api': 'rdk:component:sensor', 'model': 'viam:sensor:pir',
+             'attributes': {'gpio_pin': '17'}}
+        ]
+    }
+
+    def __init__(self, latency_ms=20.0, jitter_ms=10.0, failure_rate=0.0, dial_latency_ms=150.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.dial_latency_ms = dial_latency_ms
+        self.dials = 0
+        self.config_saves = 0
+        self._configs = {}
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build a fleet from 'latency_ms=40,jitter_ms=20,failure_rate=0.05' (VIAM_FAKE=1 keeps the defaults)."""
+        options = {}
+        for part in spec.split(','):
+            key, sep, value = part.strip().partition('=')
+            if sep:
+                options[key] = int(value) if key == 'seed' else float(value)
+        return cls(**options)
+
+    async def delay(self, base_ms):
+        jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, base_ms + jitter) / 1000)
+
+    def roll_failure(self):
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+    def readings_for(self, address, component):
+        # Smooth daily curves, offset per robot so robots don't report identical values
+        phase = (zlib.crc32(address.encode()) % 1000) / 1000 * 2 * math.pi
+        day = 2 * math.pi * (time.time() % 86400) / 86400
+        if component == 'DHT22':
+            return {
+                'temperature_celsius': round(21 + 3 * math.sin(day + phase) + self._random.gauss(0, 0.2), 2),
+                'humidity_percent': round(50 + 10 * math.cos(day + phase) + self._random.gauss(0, 1), 2)
+            }
+        if component == 'VEML7700':
+            return {'lux': round(max(0.0, 400 * math.sin(day - math.pi / 2 + phase)) + self._random.uniform(0, 20), 1)}
+        return {'motion_detected': self._random.random() < 0.1}
+
+    # --- ViamConnectionPool hooks ---
+
+    async def dial(self, robot_address, api_key, api_key_id):
+        options = FakeRobotClient.Options.with_api_key(api_key=api_key, api_key_id=api_key_id)
+        return await FakeRobotClient.at_address(robot_address, options, fleet=self)
+
+    def sensor_from_robot(self, robot_client, viam_name):
+        if viam_name not in self.components:
+            raise FakeViamError(f'Resource {viam_name} not found')
+        return FakeSensor(self, robot_client, viam_name)
+
+    async def load_config(self, robot_address, api_key, api_key_id):
+        await self.delay(self.latency_ms)
+        if self.roll_failure():
+            raise FakeViamError(f'simulated config load failure for {robot_address}')
+        return copy.deepcopy(self._configs.get(robot_address, self.default_config))
+
+    async def save_config(self, robot_address, api_key, api_key_id, config):
+        await self.delay(self.latency_ms)
+        if self.roll_failure():
+            raise FakeViamError(f'simulated config save failure for {robot_address}')
+        self.config_saves += 1
+        self._configs[robot_address] = copy.deepcopy(config)
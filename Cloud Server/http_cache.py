@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP Cache Module
+Conditional GET and response compression for the polled JSON APIs.
+
+- conditional(validator): the validator answers "has anything changed?" with a
+  cheap query (e.g. the newest reading timestamp of a sensor). When the
+  client's If-None-Match / If-Modified-Since still matches, a 304 is returned
+  before the view runs, so the data query and JSON serialization are skipped.
+- init_app(app): gzip (or brotli, when the brotli package is installed)
+  compresses text responses larger than COMPRESS_MIN_SIZE bytes.
+"""
+
+from datetime import timezone
+from functools import wraps
+from flask import current_app, make_response, request
+import gzip
+import hashlib
+import logging
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+
+def _etag(parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # ETags win over dates (RFC 9110 13.1.3)
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have one-second resolution; clients that need more send ETags
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _add_validators(response, etag, last_modified):
+    # Weak: the same data may be sent gzip'ed, brotli'ed or plain
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def conditional(validator):
+    """
+    Serve 304 Not Modified for a GET view without running it.
+    validator(**view_args) returns (parts, last_modified): anything whose repr
+    changes when the response would change, and the newest data timestamp
+    (naive UTC, or None). Returning None disables caching for that request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            validated = validator(*args, **kwargs)
+            if validated is None:
+                return view(*args, **kwargs)
+
+            parts, last_modified = validated
+            etag = _etag(parts)
+            if _not_modified(etag, last_modified):
+                return _add_validators(current_app.response_class(status=304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return _add_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def body_etag(view):
+    """ETag from the response body, for views without a cheap validator (saves bandwidth only)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.add_etag(weak=True)
+            response.make_conditional(request)
+        return response
+    return wrapper
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_app(app):
+    """Compress large text responses according to Accept-Encoding."""
+    if not app.config.get('COMPRESS_RESPONSES', True):
+        return
+    min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESS_LEVEL', 6)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.status_code != 200
+                or response.direct_passthrough
+                or response.mimetype not in COMPRESSIBLE_TYPES
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if encoding == 'br':
+            # Quality 5 is roughly gzip-6 speed with smaller output
+            response.set_data(brotli.compress(data, quality=5))
+        else:
+            response.set_data(gzip.compress(data, compresslevel=level))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    logger.info(f"✓ Response compression enabled (gzip{', br' if brotli else ''}, >= {min_size} bytes)")
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Ingest Queue Module
+Durable write-ahead queue between Viam fetches and the database.
+
+fetch_and_store_robots() appends each robot's readings to a local SQLite file
+(INGEST_QUEUE_PATH) and returns without touching the main database. A writer
+thread drains the file in batches of up to INGEST_BATCH_SIZE fetches per
+transaction and deletes them only after the database has committed, so:
+- a slow or locked database no longer stretches fetch ticks
+- readings survive the database being unavailable (the writer backs off and
+  retries, up to INGEST_MAX_BACKOFF seconds apart) and process restarts
+
+The web process and poller.py may share one file. A writer claims the entries
+it is about to store for INGEST_CLAIM_TIMEOUT seconds; entries of a writer
+that died mid-batch are taken over after that and stored without the readings
+that already made it into the database.
+
+A batch the database rejects (not one it was unavailable for) is stored again
+one fetch per transaction, like db_engine's group commits, so one bad fetch
+can't hold up the rest. A fetch that fails on its own is retried after
+INGEST_CLAIM_TIMEOUT, and after INGEST_MAX_ATTEMPTS failures it is moved to
+the dead_readings table of the same file.
+"""
+
+from datetime import datetime
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+from sqlalchemy import exc
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pending_readings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    robot_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    readings TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_until REAL
+)
+'''
+
+_DEAD_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS dead_readings (
+    id INTEGER PRIMARY KEY,
+    robot_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    readings TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    failures INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+)
+'''
+
+# The database is down or locked: keep the whole batch and retry it, don't blame its entries
+_DATABASE_UNAVAILABLE = (exc.OperationalError, exc.InterfaceError)
+
+
+class IngestQueue:
+    """Readings waiting for the database, kept in a SQLite file until they are committed."""
+
+    def __init__(self, app, path, batch_size=500, flush_delay=0.25, claim_timeout=120.0, max_backoff=60.0,
+                 max_attempts=5, synchronous='FULL'):
+        self.app = app
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.claim_timeout = claim_timeout
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(f'PRAGMA synchronous={self.synchronous}')
+            connection.execute(_SCHEMA)
+            connection.execute(_DEAD_SCHEMA)
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(pending_readings)')}
+            if 'failures' not in columns:
+                # A queue file from before failures were counted
+                try:
+                    connection.execute('ALTER TABLE pending_readings ADD COLUMN failures INTEGER NOT NULL DEFAULT 0')
+                except sqlite3.OperationalError:
+                    pass  # the other process sharing the file added it first
+            self._local.connection = connection
+        return connection
+
+    # ---- fetcher side ----
+
+    def append(self, robot_id, values, timestamp):
+        """Queue one robot's {sensor_name: value} readings; durable once this returns."""
+        self._connect().execute(
+            'INSERT INTO pending_readings (robot_id, timestamp, readings, enqueued_at) VALUES (?, ?, ?, ?)',
+            (robot_id, timestamp.isoformat(), json.dumps(values), time.time()))
+        self.start()
+
+    def depth(self):
+        return self._connect().execute('SELECT COUNT(*) FROM pending_readings').fetchone()[0]
+
+    def dead_letters(self):
+        return self._connect().execute('SELECT COUNT(*) FROM dead_readings').fetchone()[0]
+
+    # ---- writer side ----
+
+    def start(self):
+        """Start the writer if needed and have it look at the queue."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        """Stop the writer after its current batch; what is left stays queued for the next start."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stopping:
+            self._wake.wait(self.claim_timeout)
+            if self._stopping:
+                break
+            # Let the rest of a fetch round arrive so it lands in one batch
+            time.sleep(self.flush_delay)
+            self._wake.clear()
+            try:
+                self.drain()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning(f"⚠ Ingest queue: database write failed ({type(e).__name__}: {e}), "
+                               f"{self.depth()} fetches kept, retrying in {backoff:.0f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                self._wake.set()
+
+    def drain(self):
+        """Store queued readings until the queue is empty. Returns readings stored."""
+        stored = 0
+        while not self._stopping:
+            added = self._drain_batch()
+            if added is None:
+                break
+            stored += added
+        metrics.INGEST_QUEUE_DEPTH.set(self.depth())
+        metrics.INGEST_DEAD_LETTERS.set(self.dead_letters())
+        return stored
+
+    def _claim(self):
+        token = uuid.uuid4().hex
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            'UPDATE pending_readings SET claimed_by = ?, claimed_until = ?, attempts = attempts + 1 '
+            'WHERE id IN (SELECT id FROM pending_readings WHERE claimed_until IS NULL OR claimed_until < ? '
+            'ORDER BY id LIMIT ?)',
+            (token, now + self.claim_timeout, now, self.batch_size))
+        rows = connection.execute(
+            'SELECT id, robot_id, timestamp, readings, attempts, enqueued_at FROM pending_readings '
+            'WHERE claimed_by = ? ORDER BY id', (token,)).fetchall()
+        return token, rows
+
+    def _drain_batch(self):
+        import realtime
+
+        token, rows = self._claim()
+        if not rows:
+            return None
+
+        entries, failed = {}, {}
+        for row_id, robot_id, timestamp, readings, attempts, _ in rows:
+            try:
+                entries[row_id] = (robot_id, json.loads(readings), datetime.fromisoformat(timestamp), attempts > 1)
+            except (TypeError, ValueError) as e:
+                failed[row_id] = e
+        with self.app.app_context():
+            try:
+                added = self._store(entries, failed)
+            except Exception:
+                # Hand the entries back right away instead of waiting for the claim to expire
+                self._connect().execute(
+                    'UPDATE pending_readings SET claimed_by = NULL, claimed_until = NULL WHERE claimed_by = ?',
+                    (token,))
+                raise
+
+            if failed:
+                self._count_failures(failed)
+            self._connect().execute('DELETE FROM pending_readings WHERE claimed_by = ?', (token,))
+            metrics.INGEST_BATCH_SIZE.observe(len(rows))
+            metrics.INGEST_LAG.observe(time.time() - rows[0][5])
+            logger.info(f"✓ Stored {added} queued readings from {len(rows) - len(failed)} fetches")
+            if added:
+                realtime.emit('update_sensor_data', {'message': 'New sensor data available'})
+        return added
+
+    def _store(self, entries, failed):
+        """
+        Store {queue id: entry} in one transaction, or one per entry if the
+        database rejects the batch; the entries it rejects on their own are added
+        to `failed`. Returns readings added.
+        """
+        from viam_integration import store_queued_readings
+        import db_engine
+
+        if not entries:
+            return 0
+        try:
+            return db_engine.write(store_queued_readings, list(entries.values()))
+        except _DATABASE_UNAVAILABLE:
+            raise
+        except Exception as e:
+            if len(entries) == 1:
+                failed.update(dict.fromkeys(entries, e))
+                return 0
+            logger.warning(f"⚠ Ingest queue: batch of {len(entries)} fetches failed ({type(e).__name__}), "
+                           f"storing them one by one")
+
+        added = 0
+        for row_id, entry in entries.items():
+            try:
+                added += db_engine.write(store_queued_readings, [entry])
+            except _DATABASE_UNAVAILABLE:
+                raise
+            except Exception as e:
+                failed[row_id] = e
+                continue
+            # Committed - not handed back if the database goes away before the rest are stored
+            self._connect().execute('DELETE FROM pending_readings WHERE id = ?', (row_id,))
+        return added
+
+    def _count_failures(self, failed):
+        """
+        Release failed entries to be retried once their claim expires, and move
+        those that failed max_attempts times to dead_readings.
+        """
+        connection = self._connect()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for row_id, error in failed.items():
+                connection.execute(
+                    'UPDATE pending_readings SET failures = failures + 1, claimed_by = NULL WHERE id = ?', (row_id,))
+                dead = connection.execute(
+                    'INSERT INTO dead_readings (id, robot_id, timestamp, readings, enqueued_at, failures, error, failed_at) '
+                    'SELECT id, robot_id, timestamp, readings, enqueued_at, failures, ?, ? FROM pending_readings '
+                    'WHERE id = ? AND failures >= ?', (repr(error), now, row_id, self.max_attempts)).rowcount
+                if dead:
+                    connection.execute('DELETE FROM pending_readings WHERE id = ?', (row_id,))
+                    logger.error(f"⚠ Ingest queue: fetch {row_id} failed {self.max_attempts} times ({error!r}), "
+                                 f"moved to dead_readings")
+                else:
+                    logger.warning(f"⚠ Ingest queue: fetch {row_id} could not be stored ({error!r}), "
+                                   f"retrying in {self.claim_timeout:.0f}s")
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+
+def init_app(app):
+    """Set up the queue (the file is opened on first use, the writer on the first append or start())."""
+    path = app.config.get('INGEST_QUEUE_PATH') or os.path.join(app.instance_path, 'ingest_queue.db')
+    app.extensions['ingest_queue'] = IngestQueue(
+        app, path,
+        batch_size=app.config['INGEST_BATCH_SIZE'],
+        flush_delay=app.config['INGEST_FLUSH_DELAY_MS'] / 1000,
+        claim_timeout=app.config['INGEST_CLAIM_TIMEOUT'],
+        max_backoff=app.config['INGEST_MAX_BACKOFF'],
+        max_attempts=app.config['INGEST_MAX_ATTEMPTS'],
+        synchronous=app.config['INGEST_QUEUE_SYNCHRONOUS'])
+
+
+def get_queue(app=None):
+    from flask import current_app
+    return (app or current_app).extensions['ingest_queue']
+
+
+def start(app):
+    """Start the writer, storing whatever an earlier run left queued."""
+    queue = get_queue(app)
+    pending = queue.depth()
+    if pending:
+        logger.info(f"✓ Ingest queue: {pending} fetches left from an earlier run, storing them")
+    queue.start()
+
+
+def append(robot_id, values, timestamp):
+    get_queue().append(robot_id, values, timestamp)
+
+
+def flush():
+    """Store everything queued now, in the calling thread. Returns readings stored."""
+    return get_queue().drain()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Background Jobs Module
+Runs slow user-triggered work (manual Viam fetches) off the request thread, so
+clients can poll for the result or wait for a Socket.IO event. Also carries
+alert rule changes to poller.py ('alert_rules' jobs, see alerts.rules_changed).
+
+Jobs are rows of the viam_job table (migrate_add_viam_jobs.py), so any web
+worker can answer a status poll. A queued job is claimed by exactly one
+process: the web process that queued it, or poller.py when
+VIAM_POLLER=external (it picks up queued jobs every VIAM_JOB_POLL_INTERVAL
+seconds, which also restarts jobs a stopped process never got to).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from extensions import db
+from models import ViamJob
+import realtime
+import threading
+import logging
+import json
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept this long so clients can still read their result
+JOB_RETENTION = timedelta(minutes=30)
+# Jobs still queued or running after this belong to a process that went away
+JOB_TIMEOUT = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('VIAM_JOB_WORKERS', 2),
+                thread_name_prefix='viam-job'
+            )
+    return _executor
+
+
+def _prune():
+    """Delete finished jobs older than JOB_RETENTION and fail jobs stuck past JOB_TIMEOUT."""
+    now = datetime.utcnow()
+    ViamJob.query.filter(ViamJob.finished_at < now - JOB_RETENTION).delete(synchronize_session=False)
+    ViamJob.query.filter(
+        ViamJob.status.in_(('queued', 'running')),
+        ViamJob.created_at < now - JOB_TIMEOUT
+    ).update({'status': 'failed', 'finished_at': now, 'error': 'Job did not finish in time'},
+             synchronize_session=False)
+
+
+def get_job(job_id, account_id):
+    """Return a job owned by account_id, or None."""
+    return ViamJob.query.filter_by(id=job_id, account_id=account_id).first()
+
+
+def submit_viam_fetch(app, account_id, robot_ids):
+    """
+    Queue a fetch-and-store of the given robots for an account (committed
+    before it is handed on). If the account already has a fetch queued or
+    running, that job is returned instead.
+    """
+    _prune()
+    job = ViamJob.query.filter(
+        ViamJob.account_id == account_id,
+        ViamJob.job_type == 'viam_fetch',
+        ViamJob.status.in_(('queued', 'running'))
+    ).first()
+    if job is None:
+        job = ViamJob(
+            id=uuid.uuid4().hex,
+            job_type='viam_fetch',
+            status='queued',
+            account_id=account_id,
+            robot_ids=json.dumps(sorted(robot_ids))
+        )
+        db.session.add(job)
+    db.session.commit()
+
+    if job.status == 'queued' and app.config['VIAM_POLLER'] != 'external':
+        _get_executor(app).submit(_run_viam_fetch, app, job.id)
+    return job
+
+
+def submit_alert_rules_reload(account_id, robot_id):
+    """Queue a rule reload for poller.py (one pending reload covers every change before it)."""
+    pending = ViamJob.query.filter_by(job_type='alert_rules', status='queued').first()
+    if pending is None:
+        db.session.add(ViamJob(
+            id=uuid.uuid4().hex,
+            job_type='alert_rules',
+            status='queued',
+            account_id=account_id,
+            robot_ids=json.dumps([robot_id])
+        ))
+        db.session.commit()
+
+
+def run_queued(app):
+    """Start queued jobs that no process has claimed yet (scheduled by poller.register_viam_jobs)."""
+    with app.app_context():
+        _prune()
+        db.session.commit()
+        queued = db.session.query(ViamJob.id, ViamJob.job_type)\
+            .filter_by(status='queued').order_by(ViamJob.created_at).all()
+    for job_id, job_type in queued:
+        if job_type == 'alert_rules':
+            _run_alert_rules(app, job_id)
+        else:
+            _get_executor(app).submit(_run_viam_fetch, app, job_id)
+
+
+def _claim(job_id):
+    """Mark a queued job running; False when another process or thread got it first."""
+    claimed = ViamJob.query.filter_by(id=job_id, status='queued').update(
+        {'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def _run_alert_rules(app, job_id):
+    import alerts
+
+    with app.app_context():
+        if not _claim(job_id):
+            return
+        alerts.invalidate()
+        job = db.session.get(ViamJob, job_id)
+        job.status = 'finished'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def _run_viam_fetch(app, job_id):
+    from viam_integration import fetch_and_store_robots
+
+    with app.app_context():
+        if not _claim(job_id):
+            return
+        job = db.session.get(ViamJob, job_id)
+        try:
+            results = fetch_and_store_robots(json.loads(job.robot_ids))
+            job.status = 'finished'
+            job.result = json.dumps({
+                'readings_queued': sum(r['readings_queued'] for r in results.values()),
+                'robots': {str(robot_id): r for robot_id, r in results.items()}
+            })
+        except Exception as e:
+            logger.error(f"Viam fetch job {job_id} failed: {e}")
+            db.session.rollback()
+            job = db.session.get(ViamJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        realtime.emit('viam_fetch_complete', job.to_dict(), room=realtime.account_room(job.account_id))
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Live Relay Module
+Local IPC channel between the standalone Viam poller (poller.py) and the web
+process. The poller publishes events, the web process relays them to Socket.IO.
+
+Events travel as JSON (never pickle) over a connection authenticated with
+SECRET_KEY, so both sides refuse to start while it is the development default.
+"""
+
+from multiprocessing.connection import Listener, Client
+from config import DEV_SECRET_KEY
+import threading
+import logging
+import json
+
+logger = logging.getLogger(__name__)
+
+
+def check_authkey(authkey):
+    """Raise RuntimeError for a missing or development SECRET_KEY (anyone could talk to the relay)."""
+    if not authkey or authkey == DEV_SECRET_KEY.encode():
+        raise RuntimeError("VIAM_POLLER=external needs SECRET_KEY set to a private value "
+                           "shared by the web process and poller.py")
+
+
+def parse_address(address):
+    """Turn 'host:port' into a (host, port) tuple."""
+    host, _, port = address.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+class RelayPublisher:
+    """
+    Poller side of the channel. Connects lazily and drops events while the web
+    process is not listening - live readings are only useful while fresh.
+    """
+
+    def __init__(self, address, authkey):
+        check_authkey(authkey)
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def publish(self, event, data, room=None):
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = Client(self.address, authkey=self.authkey)
+                self._conn.send_bytes(json.dumps([event, data, room], default=str).encode())
+            except (OSError, EOFError) as e:
+                logger.debug(f"[RELAY] Web process not reachable, dropping '{event}': {e}")
+                self.close()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+
+def _serve_connection(conn, handler):
+    try:
+        while True:
+            event, data, room = json.loads(conn.recv_bytes())
+            try:
+                handler(event, data, room)
+            except Exception as e:
+                logger.error(f"[RELAY] Failed to relay '{event}': {e}")
+    except (ValueError, TypeError) as e:
+        logger.warning(f"[RELAY] Dropping connection that sent a malformed event: {e}")
+    except (EOFError, OSError):
+        logger.info("[RELAY] Poller disconnected")
+    finally:
+        conn.close()
+
+
+def start_relay(address, authkey, handler):
+    """
+    Listen for poller events in a daemon thread and pass each one to
+    handler(event, data, room). Raises RuntimeError when SECRET_KEY is the
+    development default or the address is already taken (e.g. by another
+    gunicorn worker, which would never receive live events).
+    """
+    check_authkey(authkey)
+    try:
+        listener = Listener(parse_address(address), authkey=authkey)
+    except OSError as e:
+        raise RuntimeError(f"Live relay could not listen on {address} ({e}). With VIAM_POLLER=external "
+                           f"run exactly one web worker") from e
+
+    def _accept_loop():
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Failed handshakes (wrong authkey) must not stop the relay
+                logger.warning(f"[RELAY] Rejected connection: {e}")
+                continue
+            logger.info("[RELAY] Poller connected")
+            threading.Thread(target=_serve_connection, args=(conn, handler), daemon=True).start()
+
+    threading.Thread(target=_accept_loop, name='live-relay', daemon=True).start()
+    logger.info(f"✓ Live relay listening on {address}")
@@ -8,15 +8,32 @@ Version: 1.1
 Description: Flask app with SQLAlchemy models and example API endpoints.
 '''
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, flash, stream_with_context
 from functools import wraps
 from config import Config
 from extensions import db, socketio
-from flask_migrate import Migrate
+from flask_socketio import join_room
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import Account, Alert, AlertRule, Robot, Sensor, SensorData, UserRobot
+from passwords import PasswordHashBusy
+import account_cache
+import account_stats
+import alerts
+import chart_data
+import db_engine
+import http_cache
+import ingest_queue
+import metrics
+import partitions
+import query_profiler
+import realtime
+import robot_config
+import robot_status
+import rolling_stats
+import viam_integration
+from viam_views import viam_view
 import atexit
 import logging
 
@@ -49,74 +66,109 @@ def enforce_https():
         url = request.url.replace('http://', 'https://', 1)
         return redirect(url, code=301)
 
-# Initialize DB and migrations
+# Request latency and SQL statement metrics (served at /metrics)
+metrics.instrument_app(app)
+metrics.instrument_sqlalchemy()
+
+# Per-request SQL profiling / N+1 warnings (development, SQL_PROFILER=1)
+query_profiler.init_app(app)
+http_cache.init_app(app)
+
+# Initialize DB and Socket.IO (Flask-Migrate is set up in create_app)
 db.init_app(app)
+db_engine.init_app(app)
+ingest_queue.init_app(app)
+rolling_stats.init_app(app)
 socketio.init_app(app, cors_allowed_origins="*")
-migrate = Migrate()
-migrate.init_app(app, db)
 
-with app.app_context():
-    # Import models to register them with SQLAlchemy
-    import models  # noqa: F401
 
+# ==================== STARTUP ====================
 
-# ==================== VIAM BACKGROUND SCHEDULER ====================
+_background_started = False
 
-def scheduled_viam_live_fetch():
-    """Fetch LIVE Viam sensor data (runs every 5 seconds) - does NOT save to database"""
-    with app.app_context():
-        from viam_integration import fetch_live_sensor_data
-        live_data = fetch_live_sensor_data()
-        
-        if live_data:
-            logger.debug(f"✓ Live sensor data fetched: {len(live_data)} sensors")
-            # Emit live data to all connected clients via Socket.IO
-            socketio.server.emit('live_sensor_data', {
-                'success': True,
-                'readings': live_data
-            }, namespace='/')
-
-
-def scheduled_viam_fetch():
-    """Fetch Viam sensor data and save to database (runs every hour at xx:00)"""
-    with app.app_context():
-        from viam_integration import fetch_and_store_sensor_data
-        logger.info("🤖 Scheduled Viam sensor data fetch started (SAVING TO DATABASE)")
-        fetch_and_store_sensor_data()
-
-
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-scheduler.start()
-
-# Schedule LIVE data fetch every 5 seconds (does NOT save to database)
-scheduler.add_job(
-    func=scheduled_viam_live_fetch,
-    trigger=IntervalTrigger(seconds=5),
-    id='viam_live_fetch',
-    name='Fetch LIVE Viam sensor data (broadcast via Socket.IO)',
-    replace_existing=True
-)
-
-# Schedule database-saving fetch every hour at xx:00 (0 minutes past the hour)
-scheduler.add_job(
-    func=scheduled_viam_fetch,
-    trigger=CronTrigger(minute=0),
-    id='viam_sensor_fetch_hourly',
-    name='Fetch Viam sensor data (save to database)',
-    replace_existing=True
-)
-
-# Shutdown scheduler when app exits
-atexit.register(lambda: scheduler.shutdown())
-
-logger.info("✓ Viam scheduler initialized")
-logger.info("  - Live data fetched every 5 seconds (broadcast via Socket.IO)")
-logger.info("  - Database data fetched and saved every hour at xx:00")
+
+def start_viam_polling(app):
+    """Start Viam polling in this process, or the relay from an external poller.py"""
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+
+    if app.config['VIAM_POLLER'] == 'external':
+        # Polling runs in poller.py - only relay its events to Socket.IO clients
+        from live_relay import start_relay
+
+        def relay_poller_event(event, data, room):
+            """Handle an event forwarded by poller.py"""
+            if event == 'robot_status':
+                # Internal state for the status cache, not for browsers
+                robot_status.merge(data)
+            else:
+                realtime.emit(event, data, room)
+
+        start_relay(app.config['VIAM_POLLER_IPC_ADDRESS'], app.config['SECRET_KEY'].encode(), relay_poller_event)
+        logger.info("✓ Viam polling delegated to external poller (poller.py)")
+        return
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from poller import register_viam_jobs
+
+    # Initialize scheduler
+    scheduler = BackgroundScheduler()
+    scheduler.start()
+    register_viam_jobs(scheduler, app)
+
+    # Shutdown scheduler and close robot connections when app exits
+    def shutdown_viam_polling():
+        from viam_integration import get_pool
+        if scheduler.running:
+            scheduler.shutdown()
+        get_pool().close()
+
+    atexit.register(shutdown_viam_polling)
+    # asgi.py stops polling before its event loop goes away
+    app.extensions['viam_polling_shutdown'] = shutdown_viam_polling
+
+    logger.info("✓ Viam scheduler initialized")
+    logger.info("  - Live data fetched every 5 seconds (broadcast via Socket.IO)")
+    logger.info("  - Database data fetched and saved every hour at xx:00")
+    logger.info("  - sensor_data partitions and retention maintained daily at 00:30")
+
+
+def create_app(role='web'):
+    """
+    Return the app set up for a process role. Importing main starts nothing;
+    background work begins here and only where it is needed:
+    - 'web': serves requests and starts Viam polling (see VIAM_POLLER)
+    - 'cli': migration scripts, shells and tests - no background threads
+    Flask-Migrate commands: flask --app "main:create_app('cli')" db upgrade
+    """
+    if role not in ('web', 'cli'):
+        raise ValueError(f"Unknown app role {role!r}")
+
+    if 'migrate' not in app.extensions:
+        # Alembic is slow to import and only needed for `flask db ...`
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    if role == 'web':
+        # Store readings an earlier run queued but couldn't write yet
+        ingest_queue.start(app)
+        start_viam_polling(app)
+    return app
 
 
 # ==================== ROUTES ====================
 
+# Tries at inserting a new account before giving up on concurrent username clashes
+USERNAME_ATTEMPTS = 5
+
+# Seconds a cached robot status counts as current (live polling runs every 5 s)
+ROBOT_STATUS_MAX_AGE = 30
+
+# Component attributes the configure page may change
+PIN_ATTRIBUTES = ('gpio_pin', 'i2c_address', 'i2c_bus', 'spi_bus', 'spi_device')
+
 
 # Login required decorator
 def login_required(f):
@@ -144,10 +196,14 @@ def login():
         if not email or not password:
             return render_template('login.html', error='Email and password required')
         
-        from models import Account
         account = Account.query.filter_by(email=email).first()
         
         if account and account.check_password(password):
+            # Upgrade hashes made with an older method or cost while we have the password
+            if account.password_needs_rehash():
+                account.set_password(password)
+                db.session.commit()
+
             # Login successful - create session
             session['user_id'] = account.id
             session['username'] = account.username
@@ -169,34 +225,30 @@ def login():
 @app.route('/profile')
 @login_required
 def profile():
-    from models import Account, Sensor, UserRobot
-    account = Account.query.get(session['user_id'])
+    view = account_cache.get(session['user_id'])
     
-    if not account:
+    if not view:
         session.clear()
         return redirect(url_for('login'))
+    account = view['account']
     
-    # Get user's robots to count sensors
-    user_robots = UserRobot.query.filter_by(account_id=account.id).all()
-    robot_ids = [ur.robot_id for ur in user_robots]
-    
-    # Count sensors for user's robots
-    sensor_count = Sensor.query.filter(Sensor.robot_id.in_(robot_ids)).count() if robot_ids else 0
+    # Maintained incrementally by the ingest paths - one row, no counting here
+    stats = account_stats.get(account['id'])
     
     # Prepare user data for template
     user_data = {
-        'full_name': account.username,
+        'full_name': account['username'],
         'role': 'Member',
-        'join_date': account.created_at.strftime('%B %Y'),
-        'email': account.email,
-        'username': account.username,
+        'join_date': account['created_at'].strftime('%B %Y'),
+        'email': account['email'],
+        'username': account['username'],
         'status': 'Active',
-        'member_since': account.created_at.strftime('%B %d, %Y'),
+        'member_since': account['created_at'].strftime('%B %d, %Y'),
         'stats': {
-            'data_points': sensor_count,
-            'bot_interactions': 0,
-            'active_hours': '0h',
-            'system_uptime': '99.9%'
+            'data_points': f'{stats.data_points:,}',
+            'bot_interactions': stats.interactions,
+            'robots': f'{stats.robot_count} ({stats.sensor_count} sensors)',
+            'last_data': stats.last_ingest_at.strftime('%b %d, %H:%M') if stats.last_ingest_at else 'Never'
         },
         'devices': [],
         'recent_activity': [],
@@ -221,7 +273,6 @@ def profile():
 @login_required
 def edit_profile():
     """Edit user profile (username and password)"""
-    from models import Account
     
     account = Account.query.get(session['user_id'])
     
@@ -250,6 +301,7 @@ def edit_profile():
         
         try:
             db.session.commit()
+            account_cache.invalidate(account.id)
             session['username'] = account.username  # Update session with new username
             return jsonify({'success': True, 'message': 'Profile updated successfully'})
         except Exception as e:
@@ -263,69 +315,74 @@ def edit_profile():
 @login_required
 def data():
     """Display sensor data with graphs"""
-    from models import Sensor, SensorData, UserRobot
-    
     # Get all robots connected by current user
     account_id = session['user_id']
-    user_robots = UserRobot.query.filter_by(account_id=account_id).all()
-    robot_ids = [ur.robot_id for ur in user_robots]
+    robot_ids = account_cache.robot_ids(account_id)
     
     if not robot_ids:
         # User has no robots connected
         return render_template('data.html', sensor_charts=[])
     
     # Get all sensors for user's robots
-    sensors = Sensor.query.filter(Sensor.robot_id.in_(robot_ids)).all()
+    sensors = account_cache.sensors(account_id)
     
     # Find the earliest timestamp from Viam sensors to align all graphs
-    earliest_viam_reading = SensorData.query.join(Sensor)\
-        .filter(Sensor.robot_id.in_(robot_ids))\
-        .filter(Sensor.name.in_(['VEML7700 Light', 'MH-SR602 Motion', 'DHT22 Temperature', 'DHT22 Humidity']))\
-        .order_by(SensorData.timestamp.asc())\
-        .first()
+    # (only the partitions up to the first one holding a reading are read)
+    viam_sensor_ids = [s['id'] for s in sensors
+                       if s['name'] in ('VEML7700 Light', 'MH-SR602 Motion', 'DHT22 Temperature', 'DHT22 Humidity')]
+    earliest_viam_reading = None
+    if viam_sensor_ids:
+        _, until = partitions.window(viam_sensor_ids, 1)
+        readings = partitions.readings(viam_sensor_ids, until=until)
+        earliest_viam_reading = db.session.query(func.min(readings.timestamp))\
+            .filter(readings.sensor_id.in_(viam_sensor_ids)).scalar()
     
     # Use the earliest Viam timestamp, or last 24 hours if no Viam data
-    start_time = earliest_viam_reading.timestamp if earliest_viam_reading else datetime.utcnow() - timedelta(hours=24)
+    start_time = earliest_viam_reading or datetime.utcnow() - timedelta(hours=24)
     
-    # Get sensor data for charts (from start_time onwards)
+    # Get sensor data for charts (from start_time onwards) as t/v columns
+    summaries = rolling_stats.summaries(s['id'] for s in sensors)
     sensor_charts = []
     for sensor in sensors:
-        readings = SensorData.query.filter_by(sensor_id=sensor.id)\
-            .filter(SensorData.timestamp >= start_time)\
-            .order_by(SensorData.timestamp.asc())\
-            .limit(500)\
-            .all()
+        t, v, unit = chart_data.load_series(sensor['id'], since=start_time, limit=500)
         
-        if readings:
+        if t:
             sensor_charts.append({
-                'name': sensor.name,
-                'type': sensor.sensor_type,
-                'data': [r.to_dict() for r in readings],
-                'count': len(readings)
+                'name': sensor['name'],
+                'type': sensor['sensor_type'],
+                'day': (summaries.get(sensor['id']) or {}).get('windows', {}).get('24h'),
+                **chart_data.to_columnar(t, v, unit)
             })
     
     return render_template('data.html', sensors=sensors, charts=sensor_charts)
 
 
+def latest_readings_validator():
+    # Any ingest for the account's robots bumps its stats row
+    stats = account_stats.get(session['user_id'])
+    return (stats.account_id, stats.data_points, stats.robot_count, stats.sensor_count,
+            stats.last_ingest_at), stats.last_ingest_at
+
+
 @app.route('/api/latest-readings')
 @login_required
+@http_cache.conditional(latest_readings_validator)
 def latest_readings():
-    from models import Sensor, SensorData, UserRobot
-    
     account_id = session['user_id']
-    user_robots = UserRobot.query.filter_by(account_id=account_id).all()
-    robot_ids = [ur.robot_id for ur in user_robots]
+    sensors = account_cache.sensors(account_id)
     
-    if not robot_ids:
+    if not sensors:
         return jsonify({'success': True, 'readings': {}})
     
-    sensors = Sensor.query.filter(Sensor.robot_id.in_(robot_ids)).all()
     readings_data = {}
     
     for sensor in sensors:
-        latest = SensorData.query.filter_by(sensor_id=sensor.id).order_by(SensorData.timestamp.desc()).first()
+        since, _ = partitions.window(sensor['id'], 1, newest=True)
+        readings = partitions.readings(sensor['id'], since)
+        latest = db.session.query(readings).filter(readings.sensor_id == sensor['id'])\
+            .order_by(readings.timestamp.desc()).first()
         if latest:
-            readings_data[sensor.name] = {
+            readings_data[sensor['name']] = {
                 'value': latest.value,
                 'unit': latest.unit,
                 'timestamp': latest.timestamp.isoformat()
@@ -334,6 +391,29 @@ def latest_readings():
     return jsonify({'success': True, 'readings': readings_data})
 
 
+@app.route('/api/statistics')
+@login_required
+def api_statistics():
+    """Rolling 1h/24h/7d count, average, min and max per sensor (rolling_stats.py, no reading scans)"""
+    account_id = session['user_id']
+    robot_id = request.args.get('robot_id', type=int)
+    sensors = account_cache.sensors(account_id, robot_id)
+    summaries = rolling_stats.summaries(s['id'] for s in sensors)
+
+    statistics = []
+    for sensor in sensors:
+        summary = summaries.get(sensor['id'])
+        if summary is None:
+            continue
+        statistics.append({
+            'sensor_id': sensor['id'],
+            'name': sensor['name'],
+            'robot_id': sensor['robot_id'],
+            **summary
+        })
+    return jsonify({'success': True, 'windows': list(rolling_stats.WINDOWS), 'statistics': statistics})
+
+
 @app.route('/configure')
 def configure():
     return render_template('configure.html')
@@ -348,27 +428,30 @@ def register():
         if not email or not password:
             return render_template('register.html', error='Email and password required')
         
-        from models import Account
         
         # Check if account already exists
         if Account.query.filter_by(email=email).first():
             return render_template('register.html', error='Email already registered')
         
-        # Create username from email (before @ sign)
-        username = email.split('@')[0]
-        
-        # Check if username exists, if so append a number
-        base_username = username
-        counter = 1
-        while Account.query.filter_by(username=username).first():
-            username = f"{base_username}{counter}"
-            counter += 1
-        
-        # Create new account
-        account = Account(username=username, email=email)
+        # Create username from email (before @ sign), appending the first free number if taken
+        base_username = email.split('@')[0]
+        account = Account(email=email)
         account.set_password(password)
-        db.session.add(account)
-        db.session.commit()
+        
+        # Another signup can take the same name between the lookup and the insert -
+        # the unique constraint catches that, so just pick again
+        for attempt in range(USERNAME_ATTEMPTS):
+            account.username = Account.next_free_username(base_username)
+            db.session.add(account)
+            try:
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if Account.query.filter_by(email=email).first():
+                    return render_template('register.html', error='Email already registered')
+        else:
+            return render_template('register.html', error='Could not create account, please try again')
         
         # Auto-login after registration
         session['user_id'] = account.id
@@ -396,6 +479,33 @@ def page_not_found(e):
     return render_template('404.html'), 404
 
 
+# Form pages that show their own error when password hashing is busy
+PASSWORD_FORM_TEMPLATES = {'login': 'login.html', 'register': 'register.html'}
+
+
+@app.errorhandler(PasswordHashBusy)
+def password_hash_busy(e):
+    # Login burst: shed load instead of queueing hashes behind each other
+    message = 'Server busy, please try again in a moment'
+    template = PASSWORD_FORM_TEMPLATES.get(request.endpoint)
+    if template and not request.is_json:
+        return render_template(template, error=message), 503, {'Retry-After': '2'}
+    return jsonify({'error': message}), 503, {'Retry-After': '2'}
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Unauthorized'}), 401
+    elif not metrics.is_local_request(request):
+        # Without a token only a scraper on this machine may read it (not via a reverse proxy)
+        return jsonify({'error': 'Forbidden'}), 403
+    return metrics.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+
 @app.route('/init-db', methods=['POST'])
 def init_db():
     # Developer convenience: create tables without migrations
@@ -412,7 +522,6 @@ def create_account():
     if not username or not password:
         return jsonify({'error': 'username and password required'}), 400
 
-    from models import Account
     if Account.query.filter_by(username=username).first():
         return jsonify({'error': 'username already exists'}), 409
 
@@ -425,7 +534,6 @@ def create_account():
 
 @app.route('/api/accounts/<int:account_id>', methods=['GET'])
 def get_account(account_id):
-    from models import Account
     acct = Account.query.get_or_404(account_id)
     return jsonify(acct.to_dict(include_sensors=True))
 
@@ -438,22 +546,30 @@ def add_sensor(account_id):
     if not name:
         return jsonify({'error': 'sensor name required'}), 400
 
-    from models import Sensor, Robot
     robot = Robot.query.get_or_404(account_id)
     sensor = Sensor(name=name, sensor_type=sensor_type, robot_id=robot.id)
     db.session.add(sensor)
+    db.session.flush()
+    account_stats.refresh_robot(robot.id)
     db.session.commit()
+    account_cache.invalidate_robot(robot.id)
     return jsonify(sensor.to_dict()), 201
 
 
 @app.route('/api/robots/<int:robot_id>/sensors', methods=['GET'])
 def list_sensors(robot_id):
-    from models import Sensor, Robot
     robot = Robot.query.get_or_404(robot_id)
     sensors = Sensor.query.filter_by(robot_id=robot.id).all()
     return jsonify([s.to_dict() for s in sensors])
 
 
+def _insert_readings(robot_id, rows):
+    # Runs on the group-commit writer (db_engine.py) - rows are plain dicts
+    db.session.add_all([SensorData(**row) for row in rows])
+    account_stats.record_ingest(robot_id, len(rows))
+    return len(rows)
+
+
 @app.route('/api/sensor-data/upload', methods=['POST'])
 def upload_sensor_data():
     """
@@ -467,7 +583,6 @@ def upload_sensor_data():
     }
     OR CSV file upload
     """
-    from models import Sensor, SensorData
     
     # Check if JSON data
     if request.is_json:
@@ -482,19 +597,14 @@ def upload_sensor_data():
         sensor = Sensor.query.get_or_404(sensor_id)
         
         # Insert all readings
-        inserted_count = 0
-        for reading in readings:
-            sensor_data = SensorData(
-                sensor_id=sensor_id,
-                timestamp=datetime.fromisoformat(reading.get('timestamp', datetime.utcnow().isoformat())),
-                value=float(reading.get('value')),
-                unit=reading.get('unit'),
-                extra_data=reading.get('extra_data')
-            )
-            db.session.add(sensor_data)
-            inserted_count += 1
-        
-        db.session.commit()
+        rows = [{
+            'sensor_id': sensor.id,
+            'timestamp': datetime.fromisoformat(reading.get('timestamp', datetime.utcnow().isoformat())),
+            'value': float(reading.get('value')),
+            'unit': reading.get('unit'),
+            'extra_data': reading.get('extra_data')
+        } for reading in readings]
+        inserted_count = db_engine.write(_insert_readings, sensor.robot_id, rows)
         return jsonify({
             'status': 'ok',
             'message': f'Inserted {inserted_count} readings for sensor {sensor_id}'
@@ -517,19 +627,14 @@ def upload_sensor_data():
         stream = StringIO(file.stream.read().decode("UTF8"), newline=None)
         csv_reader = csv.DictReader(stream)
         
-        inserted_count = 0
-        for row in csv_reader:
-            sensor_data = SensorData(
-                sensor_id=sensor_id,
-                timestamp=datetime.fromisoformat(row.get('timestamp', datetime.utcnow().isoformat())),
-                value=float(row.get('value')),
-                unit=row.get('unit', ''),
-                extra_data=row.get('extra_data')
-            )
-            db.session.add(sensor_data)
-            inserted_count += 1
-        
-        db.session.commit()
+        rows = [{
+            'sensor_id': sensor.id,
+            'timestamp': datetime.fromisoformat(row.get('timestamp', datetime.utcnow().isoformat())),
+            'value': float(row.get('value')),
+            'unit': row.get('unit', ''),
+            'extra_data': row.get('extra_data')
+        } for row in csv_reader]
+        inserted_count = db_engine.write(_insert_readings, sensor.robot_id, rows)
         return jsonify({
             'status': 'ok',
             'message': f'Inserted {inserted_count} readings from CSV'
@@ -538,24 +643,63 @@ def upload_sensor_data():
     return jsonify({'error': 'No JSON data or file provided'}), 400
 
 
+def sensor_data_validator(sensor_id):
+    # The sensor's newest reading (one row off the end of the (sensor_id, timestamp)
+    # index) plus the request args; with ?hours the window's start minute too, so
+    # readings falling out of it change the ETag
+    limit = request.args.get('limit', 1000, type=int)
+    hours = request.args.get('hours', type=int)
+    cutoff = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    since, _ = partitions.window(sensor_id, 1, since=cutoff, newest=True)
+    readings = partitions.readings(sensor_id, since)
+    query = db.session.query(readings.timestamp, readings.id).filter(readings.sensor_id == sensor_id)
+    if since:
+        query = query.filter(readings.timestamp >= since)
+    newest = query.order_by(readings.timestamp.desc(), readings.id.desc()).first()
+    newest_at, newest_id = newest or (None, None)
+    window_start = cutoff.replace(second=0, microsecond=0) if cutoff else None
+    return (sensor_id, request.args.get('format'), limit, hours, window_start, newest_at, newest_id), newest_at
+
+
 @app.route('/api/sensor-data/<int:sensor_id>', methods=['GET'])
+@http_cache.conditional(sensor_data_validator)
 def get_sensor_data(sensor_id):
-    """Get sensor data readings with optional filtering"""
-    from models import Sensor, SensorData
+    """
+    Get sensor data readings with optional filtering.
+    ?format=columnar returns {"t": [epoch ms], "v": [values]} and ?format=binary
+    the same columns as int64/float32 arrays (see chart_data.py).
+    """
     
     sensor = Sensor.query.get_or_404(sensor_id)
     
     # Optional query parameters
     limit = request.args.get('limit', 1000, type=int)
     hours = request.args.get('hours', type=int)  # Last N hours
+    data_format = request.args.get('format')
     
-    query = SensorData.query.filter_by(sensor_id=sensor_id).order_by(SensorData.timestamp.desc())
+    if data_format in chart_data.FORMATS:
+        since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+        t, v, unit = chart_data.load_series(sensor_id, since=since, limit=limit, newest=True)
+        if data_format == 'binary':
+            return chart_data.to_binary(t, v), 200, {
+                'Content-Type': chart_data.BINARY_MIMETYPE,
+                'X-Sensor-Count': str(len(t)),
+                'X-Sensor-Unit': unit or ''
+            }
+        return jsonify({'sensor': sensor.to_dict(), **chart_data.to_columnar(t, v, unit)})
+    elif data_format:
+        return jsonify({'error': f'Unknown format {data_format!r}, use one of {", ".join(chart_data.FORMATS)}'}), 400
     
-    if hours:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        query = query.filter(SensorData.timestamp >= cutoff_time)
+    cutoff_time = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    since, _ = partitions.window(sensor_id, limit, since=cutoff_time, newest=True)
+    partition = partitions.readings(sensor_id, since)
+    query = db.session.query(partition).filter(partition.sensor_id == sensor_id)\
+        .order_by(partition.timestamp.desc())
     
-    readings = query.limit(limit).all()
+    if since:
+        query = query.filter(partition.timestamp >= since)
+    
+    readings = list(db_engine.stream(query.limit(limit)))
     
     return jsonify({
         'sensor': sensor.to_dict(),
@@ -564,92 +708,177 @@ def get_sensor_data(sensor_id):
     })
 
 
+@app.route('/api/sensor-data/<int:sensor_id>/export', methods=['GET'])
+@login_required
+def export_sensor_data(sensor_id):
+    """
+    Download a sensor's readings as CSV, in the columns /api/sensor-data/upload
+    accepts. ?hours=N limits it to the last N hours. Rows are streamed from a
+    server-side cursor, so memory use doesn't grow with the history.
+    """
+    import csv
+    from io import StringIO
+    
+    sensor = Sensor.query.get_or_404(sensor_id)
+    if sensor.robot_id not in account_cache.robot_ids(session['user_id']):
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    hours = request.args.get('hours', type=int)
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    readings = partitions.readings(sensor_id, since)
+    query = db.session.query(readings.timestamp, readings.value, readings.unit, readings.extra_data)\
+        .filter(readings.sensor_id == sensor_id)
+    if since:
+        query = query.filter(readings.timestamp >= since)
+    query = query.order_by(readings.timestamp.asc())
+    
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['timestamp', 'value', 'unit', 'extra_data'])
+        for row in db_engine.stream(query):
+            writer.writerow([row.timestamp.isoformat(), row.value, row.unit or '', row.extra_data or ''])
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    filename = f"sensor-{sensor_id}-{datetime.utcnow():%Y%m%d-%H%M}.csv"
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
 @app.route('/api/viam/fetch-now', methods=['POST'])
 @login_required
 def manual_viam_fetch():
-    """Manually trigger Viam data fetch"""
-    from viam_integration import fetch_and_store_sensor_data
+    """Queue a Viam data fetch for the current user's robots"""
+    import jobs
     
-    logger.info("Manual Viam fetch triggered")
-    
-    with app.app_context():
-        result = fetch_and_store_sensor_data()
+    account_id = session['user_id']
+    robot_ids = account_cache.robot_ids(account_id)
     
-    if result:
-        # fetch_and_store_sensor_data returns True on success
-        # Get the count of readings from the last fetch
-        from models import SensorData
-        recent_readings = SensorData.query.filter(
-            SensorData.timestamp >= datetime.utcnow() - timedelta(seconds=30)
-        ).count()
-        
-        return jsonify({
-            'success': True, 
-            'status': 'ok', 
-            'message': 'Sensor data fetched successfully',
-            'readings_saved': recent_readings
-        }), 200
-    else:
+    if not robot_ids:
         return jsonify({
             'success': False,
-            'status': 'error', 
-            'message': 'Failed to fetch sensor data',
-            'readings_saved': 0
-        }), 500
+            'status': 'error',
+            'message': 'No robots connected. Please add a robot first.'
+        }), 400
+    
+    job = jobs.submit_viam_fetch(app, account_id, robot_ids)
+    account_stats.record_interaction(account_id)
+    db.session.commit()
+    logger.info(f"Manual Viam fetch queued (job {job.id}) for {len(robot_ids)} robot(s)")
+    
+    return jsonify({
+        'success': True,
+        'status': job.status,
+        'message': 'Sensor data fetch queued',
+        'job_id': job.id,
+        'status_url': url_for('viam_job_status', job_id=job.id)
+    }), 202
+
+
+@app.route('/api/viam/jobs/<job_id>', methods=['GET'])
+@login_required
+def viam_job_status(job_id):
+    """Status and per-robot result of a queued Viam fetch"""
+    import jobs
+    
+    job = jobs.get_job(job_id, session['user_id'])
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job.to_dict()})
 
 
 @app.route('/api/viam/test', methods=['GET'])
 @login_required
+@viam_view
 def test_viam():
-    """Test Viam connection using user's first robot"""
-    from models import UserRobot
-    from viam_integration import test_viam_connection
+    """Test Viam connection for one of the user's robots (first robot by default)"""
+    from cryptography.fernet import InvalidToken
     
-    # Get user's first robot for testing
     account_id = session['user_id']
-    user_robot = UserRobot.query.filter_by(account_id=account_id).first()
+    query = UserRobot.query.filter_by(account_id=account_id)
+    robot_id = request.args.get('robot_id', type=int)
+    if robot_id:
+        query = query.filter_by(robot_id=robot_id)
+    user_robot = query.first()
     
     if not user_robot:
         return jsonify({
             'status': 'error',
-            'output': 'No robots connected. Please add a robot first.'
-        })
+            'error': 'No robots connected. Please add a robot first.'
+        }), 404
     
-    # Capture output
-    import io
-    import sys
-    old_stdout = sys.stdout
-    sys.stdout = buffer = io.StringIO()
+    robot_id = user_robot.robot_id
+    try:
+        credentials = (user_robot.get_viam_api_key(), user_robot.get_viam_api_key_id())
+    except InvalidToken:
+        return jsonify({
+            'status': 'error',
+            'error': 'Failed to decrypt robot credentials. Please re-enter them.'
+        }), 500
     
-    success = test_viam_connection(
-        user_robot.viam_api_key,
-        user_robot.viam_api_key_id,
-        user_robot.robot.viam_robot_address
+    diagnostics, cached = yield viam_integration.diagnose_robot_async(
+        robot_id,
+        *credentials,
+        user_robot.robot.viam_robot_address,
+        timeout=app.config.get('VIAM_POLL_TIMEOUT', 15),
+        max_age=app.config.get('VIAM_DIAGNOSTICS_TTL', 30)
     )
     
-    output = buffer.getvalue()
-    sys.stdout = old_stdout
+    account_stats.record_interaction(account_id)
+    db.session.commit()
     
     return jsonify({
-        'status': 'ok' if success else 'error',
-        'output': output
+        'status': 'ok' if diagnostics['connected'] else 'error',
+        'robot_id': robot_id,
+        'cached': cached,
+        'diagnostics': diagnostics
     })
 
 
+# ==================== SOCKET.IO ====================
+
+@socketio.on('connect')
+def on_socket_connect():
+    """Put each logged-in connection in its account's room for per-user events"""
+    metrics.SOCKETIO_CLIENTS.inc()
+    if 'user_id' in session:
+        join_room(realtime.account_room(session['user_id']))
+
+
+@socketio.on('disconnect')
+def on_socket_disconnect(*args):
+    metrics.SOCKETIO_CLIENTS.dec()
+
+
 # ==================== VIAM DEVICE MANAGEMENT ====================
 
+def device_to_dict(device):
+    """UserRobot.to_dict() output with live status from the poller's status cache"""
+    device = dict(device)  # may come from the shared account cache
+    cached = robot_status.get(device['robot_id'])
+    if cached:
+        device['status'] = cached['status']
+        device['components'] = cached['components']
+        device['rtt_ms'] = cached['rtt_ms']
+        device['last_seen'] = cached['last_seen']
+    return device
+
+
 @app.route('/api/devices', methods=['GET'])
 @login_required
+@http_cache.body_etag
 def get_devices():
     """Get all robots connected by current user"""
-    from models import UserRobot
-    
     account_id = session['user_id']
-    user_robots = UserRobot.query.filter_by(account_id=account_id).all()
     
     return jsonify({
         'success': True,
-        'devices': [ur.to_dict() for ur in user_robots]
+        'devices': [device_to_dict(device) for device in account_cache.robots(account_id)]
     })
 
 
@@ -657,7 +886,6 @@ def get_devices():
 @login_required
 def add_device():
     """Add a robot connection for current user"""
-    from models import Robot, UserRobot
     
     account_id = session['user_id']
     data = request.get_json()
@@ -701,11 +929,15 @@ def add_device():
     
     try:
         db.session.add(user_robot)
+        db.session.flush()
+        # A shared robot may bring existing readings along
+        account_stats.add_robot(account_id, robot.id)
         db.session.commit()
+        account_cache.invalidate(account_id)
         return jsonify({
             'success': True,
             'message': 'Robot connected successfully',
-            'device': user_robot.to_dict()
+            'device': device_to_dict(user_robot.to_dict())
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -716,7 +948,6 @@ def add_device():
 @login_required
 def delete_device(user_robot_id):
     """Delete a robot connection (doesn't delete robot data)"""
-    from models import UserRobot
     
     account_id = session['user_id']
     user_robot = UserRobot.query.filter_by(id=user_robot_id, account_id=account_id).first()
@@ -725,8 +956,12 @@ def delete_device(user_robot_id):
         return jsonify({'success': False, 'error': 'Device not found'}), 404
     
     try:
+        robot_id = user_robot.robot_id
         db.session.delete(user_robot)
+        db.session.flush()
+        account_stats.remove_robot(account_id, robot_id)
         db.session.commit()
+        account_cache.invalidate(account_id)
         return jsonify({'success': True, 'message': 'Robot disconnected successfully'})
     except Exception as e:
         db.session.rollback()
@@ -735,46 +970,43 @@ def delete_device(user_robot_id):
 
 @app.route('/api/devices/<int:user_robot_id>/connect', methods=['POST'])
 @login_required
+@viam_view
 def connect_device(user_robot_id):
-    """Test connection to a robot and update status"""
-    from models import UserRobot
-    from viam.rpc.dial import Credentials, DialOptions
-    from viam.robot.client import RobotClient
-    
+    """Report a robot's connection status (polls it only if the cached status is stale)"""
     account_id = session['user_id']
     user_robot = UserRobot.query.filter_by(id=user_robot_id, account_id=account_id).first()
     
     if not user_robot:
         return jsonify({'success': False, 'error': 'Device not found'}), 404
     
-    try:
-        # Test connection with stored credentials
-        opts = RobotClient.Options.with_api_key(
-            api_key=user_robot.viam_api_key,
-            api_key_id=user_robot.viam_api_key_id
-        )
-        
-        robot = RobotClient.at_address(user_robot.robot.viam_robot_address, opts)
-        robot.close()
-        
-        # Update robot status
-        user_robot.robot.status = 'online'
-        user_robot.robot.last_connected = datetime.utcnow()
-        db.session.commit()
-        
+    # The poller refreshes every robot every few seconds - reuse that result
+    status = robot_status.get(user_robot.robot_id, max_age=ROBOT_STATUS_MAX_AGE)
+    if status is None:
+        try:
+            status = yield viam_integration.refresh_robot_status_async(
+                user_robot.robot_id,
+                user_robot.get_viam_api_key(),
+                user_robot.get_viam_api_key_id(),
+                user_robot.robot.viam_robot_address,
+                timeout=app.config.get('VIAM_POLL_TIMEOUT', 15)
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing robot status: {str(e)}")
+    
+    account_stats.record_interaction(account_id)
+    db.session.commit()
+    
+    if status and status['status'] == 'online':
         return jsonify({
             'success': True,
             'message': 'Connected successfully',
-            'device': user_robot.to_dict()
+            'device': device_to_dict(user_robot.to_dict())
         })
-    except Exception as e:
-        user_robot.robot.status = 'offline'
-        db.session.commit()
-        return jsonify({
-            'success': False,
-            'error': f'Connection failed: {str(e)}',
-            'device': user_robot.to_dict()
-        }), 500
+    return jsonify({
+        'success': False,
+        'error': 'Connection failed: robot is offline',
+        'device': device_to_dict(user_robot.to_dict())
+    }), 503
 
 
 # ==================== SENSOR CONFIGURATION ROUTES ====================
@@ -783,36 +1015,123 @@ def connect_device(user_robot_id):
 @login_required
 def get_robot_sensors(robot_id):
     """Get all sensors for a robot"""
-    from models import UserRobot, Robot, Sensor
-    
     account_id = session['user_id']
     
     # Check if user has access to this robot
+    robot = account_cache.get_robot(account_id, robot_id)
+    if not robot:
+        return jsonify({'success': False, 'error': 'Robot not found or access denied'}), 403
+    
+    return jsonify({
+        'success': True,
+        'robot_id': robot_id,
+        'robot_name': robot['robot_name'],
+        'sensors': account_cache.sensors(account_id, robot_id)
+    })
+
+
+def pin_edits(attributes):
+    """Pin attributes as Viam config values (strings; None or '' removes one). Raises ValueError on other keys."""
+    unknown = set(attributes) - set(PIN_ATTRIBUTES)
+    if unknown:
+        raise ValueError(f"Unsupported attribute(s): {', '.join(sorted(unknown))}")
+    return {key: None if value in (None, '') else str(value) for key, value in attributes.items()}
+
+
+def robot_config_response(robot_id, config, version, **extra):
+    return {
+        'robot_id': robot_id,
+        'version': version,
+        'components': robot_config.components(config),
+        **extra
+    }
+
+
+@app.route('/api/robot/<int:robot_id>/config', methods=['GET'])
+@login_required
+@viam_view
+def get_robot_config(robot_id):
+    """A robot's components and their attributes from Viam, with the version to send back on save"""
+    user_robot = UserRobot.query.filter_by(account_id=session['user_id'], robot_id=robot_id).first()
+    if not user_robot:
+        return jsonify({'success': False, 'error': 'Robot not found or access denied'}), 403
+    
+    try:
+        config, version = yield robot_config.get_async(
+            robot_id,
+            user_robot.robot.viam_robot_address,
+            user_robot.get_viam_api_key(),
+            user_robot.get_viam_api_key_id(),
+            timeout=app.config.get('VIAM_POLL_TIMEOUT', 15),
+            max_age=0 if request.args.get('refresh') else app.config.get('ROBOT_CONFIG_TTL', 60)
+        )
+    except Exception as e:
+        logger.error(f"Error loading robot configuration: {e!r}")
+        return jsonify({'success': False, 'error': f'Failed to load configuration: {e}'}), 500
+    
+    return jsonify({'success': True, **robot_config_response(robot_id, config, version)})
+
+
+@app.route('/api/robot/<int:robot_id>/config', methods=['POST'])
+@login_required
+@viam_view
+def update_robot_config(robot_id):
+    """
+    Apply pin edits to several components in one Viam reconfigure.
+    Body: {"version": "<from GET>", "components": {"<component>": {"gpio_pin": "4", ...}}}
+    Returns 409 with the current configuration when the version is out of date.
+    """
+    account_id = session['user_id']
     user_robot = UserRobot.query.filter_by(account_id=account_id, robot_id=robot_id).first()
     if not user_robot:
         return jsonify({'success': False, 'error': 'Robot not found or access denied'}), 403
     
-    robot = Robot.query.get(robot_id)
-    sensors = Sensor.query.filter_by(robot_id=robot_id).all()
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not version or not isinstance(data.get('components'), dict):
+        return jsonify({'success': False, 'error': 'version and components are required'}), 400
+    try:
+        edits = {name: pin_edits(attributes) for name, attributes in data['components'].items()}
+    except (AttributeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e) or 'Invalid components'}), 400
     
-    sensor_list = [s.to_dict() for s in sensors]
+    try:
+        config, version, changes = yield robot_config.apply_async(
+            robot_id,
+            user_robot.robot.viam_robot_address,
+            user_robot.get_viam_api_key(),
+            user_robot.get_viam_api_key_id(),
+            edits,
+            version,
+            timeout=app.config.get('VIAM_POLL_TIMEOUT', 15)
+        )
+    except robot_config.ConfigConflict as conflict:
+        return jsonify({
+            'success': False,
+            'error': 'The robot configuration changed since it was loaded. Review and save again.',
+            **robot_config_response(robot_id, conflict.config, conflict.version)
+        }), 409
+    except robot_config.UnknownComponent as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error updating robot configuration: {e!r}")
+        return jsonify({'success': False, 'error': f'Failed to update configuration: {e}'}), 500
+    
+    account_stats.record_interaction(account_id)
+    db.session.commit()
     
     return jsonify({
         'success': True,
-        'robot_id': robot_id,
-        'robot_name': robot.robot_name,
-        'sensors': sensor_list
+        **robot_config_response(robot_id, config, version,
+                                changed={name: sorted(attributes) for name, attributes in changes.items()})
     })
 
 
 @app.route('/api/sensor/<int:sensor_id>/pins', methods=['POST'])
 @login_required
+@viam_view
 def update_sensor_pins(sensor_id):
-    """Update sensor pins directly in Viam's robot configuration"""
-    from models import Sensor, UserRobot
-    from viam.robot.client import RobotClient
-    import json
-    
+    """Update one sensor's pins in Viam (the configure page saves all edits through /api/robot/<id>/config)"""
     account_id = session['user_id']
     sensor = Sensor.query.get_or_404(sensor_id)
     
@@ -821,48 +1140,28 @@ def update_sensor_pins(sensor_id):
     if not user_robot:
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
+    # Sensors named after a reading ("DHT22 Temperature") belong to their Viam component ("DHT22")
+    sensor_name = sensor.name
+    component = next((s['viam_name'] for s in viam_integration.VIAM_SENSORS if s['sensor_name'] == sensor_name),
+                     sensor_name)
     try:
         data = request.get_json() or {}
+        attributes = pin_edits({key: data[key] for key in PIN_ATTRIBUTES if data.get(key) is not None})
         
-        # Connect to Viam robot
-        opts = RobotClient.Options.with_api_key(
-            api_key=user_robot.get_viam_api_key(),
-            api_key_id=user_robot.get_viam_api_key_id()
+        yield robot_config.apply_async(
+            sensor.robot_id,
+            user_robot.robot.viam_robot_address,
+            user_robot.get_viam_api_key(),
+            user_robot.get_viam_api_key_id(),
+            {component: {key: value for key, value in attributes.items() if value is not None}},
+            None,
+            timeout=app.config.get('VIAM_POLL_TIMEOUT', 15)
         )
-        robot = RobotClient.at_address(user_robot.robot.viam_robot_address, opts)
-        
-        # Get current robot config
-        config = robot.get_config()
-        
-        # Find and update the component's attributes with new pins
-        for component in config.components:
-            if component.name == sensor.name:
-                # Update component attributes with new pin information
-                if 'attributes' not in component.attributes:
-                    component.attributes = {}
-                
-                # Update pin fields in attributes
-                if 'gpio_pin' in data and data['gpio_pin'] is not None:
-                    component.attributes['gpio_pin'] = str(data['gpio_pin'])
-                if 'i2c_address' in data and data['i2c_address']:
-                    component.attributes['i2c_address'] = data['i2c_address']
-                if 'i2c_bus' in data and data['i2c_bus'] is not None:
-                    component.attributes['i2c_bus'] = str(data['i2c_bus'])
-                if 'spi_bus' in data and data['spi_bus'] is not None:
-                    component.attributes['spi_bus'] = str(data['spi_bus'])
-                if 'spi_device' in data and data['spi_device'] is not None:
-                    component.attributes['spi_device'] = str(data['spi_device'])
-                
-                break
-        
-        # Update the robot configuration in Viam
-        robot.reconfigure_config(config)
-        robot.close()
         
         return jsonify({
             'success': True,
             'message': 'Sensor pins updated in Viam',
-            'sensor_name': sensor.name
+            'sensor_name': sensor_name
         }), 200
         
     except Exception as e:
@@ -873,6 +1172,77 @@ def update_sensor_pins(sensor_id):
         }), 500
 
 
+# ==================== ALERT ROUTES ====================
+
+@app.route('/api/alert-rules', methods=['GET'])
+@login_required
+def list_alert_rules():
+    """Alert rules of the current user"""
+    rules = AlertRule.query.filter_by(account_id=session['user_id']).order_by(AlertRule.id).all()
+    return jsonify({'success': True, 'rules': [rule.to_dict() for rule in rules]})
+
+
+@app.route('/api/alert-rules', methods=['POST'])
+@login_required
+def create_alert_rule():
+    """
+    Add an alert rule on one of your robots' sensors. Expects JSON:
+    {"robot_id": 1, "sensor_name": "DHT22 Temperature", "condition": "above",
+     "threshold": 30, "for_seconds": 60}
+    """
+    account_id = session['user_id']
+    data = request.get_json() or {}
+    
+    required = ['robot_id', 'sensor_name', 'condition', 'threshold']
+    if not all(field in data for field in required):
+        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+    if data['condition'] not in alerts.CONDITIONS:
+        return jsonify({'success': False, 'error': f'condition must be one of {", ".join(alerts.CONDITIONS)}'}), 400
+    try:
+        robot_id = int(data['robot_id'])
+        threshold = float(data['threshold'])
+        for_seconds = int(data.get('for_seconds', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'robot_id, threshold and for_seconds must be numbers'}), 400
+    if not account_cache.get_robot(account_id, robot_id):
+        return jsonify({'success': False, 'error': 'Robot not found or access denied'}), 403
+    
+    rule = AlertRule(account_id=account_id, robot_id=robot_id, sensor_name=data['sensor_name'],
+                     condition=data['condition'], threshold=threshold, for_seconds=max(0, for_seconds))
+    db.session.add(rule)
+    db.session.commit()
+    alerts.rules_changed(account_id, robot_id)
+    return jsonify({'success': True, 'rule': rule.to_dict()}), 201
+
+
+@app.route('/api/alert-rules/<int:rule_id>', methods=['DELETE'])
+@login_required
+def delete_alert_rule(rule_id):
+    """Delete an alert rule and its alert history"""
+    rule = AlertRule.query.filter_by(id=rule_id, account_id=session['user_id']).first()
+    if not rule:
+        return jsonify({'success': False, 'error': 'Rule not found'}), 404
+    
+    robot_id = rule.robot_id
+    Alert.query.filter_by(rule_id=rule.id).delete()
+    db.session.delete(rule)
+    db.session.commit()
+    alerts.rules_changed(session['user_id'], robot_id)
+    return jsonify({'success': True, 'message': 'Rule deleted'})
+
+
+@app.route('/api/alerts', methods=['GET'])
+@login_required
+def list_alerts():
+    """Recent alerts of the current user (?active=1 for uncleared ones only)"""
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    query = Alert.query.filter_by(account_id=session['user_id'])
+    if request.args.get('active'):
+        query = query.filter(Alert.cleared_at.is_(None))
+    recent = query.order_by(Alert.triggered_at.desc()).limit(limit).all()
+    return jsonify({'success': True, 'alerts': [alert.to_dict() for alert in recent]})
+
+
 if __name__ == '__main__':
-    socketio.run(app, debug=True, port=5000, host='0.0.0.0')
+    socketio.run(create_app('web'), debug=True, port=5000, host='0.0.0.0')
 
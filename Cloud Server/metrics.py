@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics Module
+Minimal Prometheus-style counters, gauges and histograms, rendered in the
+Prometheus text format by the /metrics route (and by poller.py when it runs
+as its own process).
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ipaddress
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [count per bucket..., +Inf count, sum]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the duration of a block in seconds."""
+        return _Timer(self, labels)
+
+    def _render_value(self, key, state):
+        lines = []
+        for bound, count in zip(self.buckets, state):
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", bound))} {count}')
+        lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", "+Inf"))} {state[-2]}')
+        lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}')
+        lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {state[-2]}')
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def render():
+    """All registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def is_local_request(request):
+    """Whether a Flask request comes straight from this machine (loopback, not forwarded by a proxy)."""
+    if request.headers.get('X-Forwarded-For') or request.headers.get('Forwarded'):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+# ==================== METRICS ====================
+
+HTTP_REQUEST_DURATION = Histogram(
+    'mybuddy_http_request_duration_seconds', 'HTTP request latency by route',
+    ('endpoint', 'method', 'status'))
+DB_QUERIES = Counter(
+    'mybuddy_db_queries_total', 'SQL statements executed', ('operation',))
+DB_QUERY_DURATION = Histogram(
+    'mybuddy_db_query_duration_seconds', 'SQL statement duration', ('operation',))
+VIAM_DIAL_DURATION = Histogram(
+    'mybuddy_viam_dial_duration_seconds', 'Time to connect to a Viam robot (robot = robot id)', ('robot', 'outcome'))
+VIAM_READINGS_DURATION = Histogram(
+    'mybuddy_viam_get_readings_duration_seconds', 'Viam get_readings latency per component (robot = robot id)',
+    ('robot', 'component', 'outcome'))
+SCHEDULER_JOB_DURATION = Histogram(
+    'mybuddy_scheduler_job_duration_seconds', 'Scheduled job run time', ('job',))
+SCHEDULER_JOB_OVERRUNS = Counter(
+    'mybuddy_scheduler_job_overruns_total',
+    'Scheduled runs skipped because the previous run was still going or the run was missed', ('job', 'reason'))
+SOCKETIO_EMIT_BYTES = Histogram(
+    'mybuddy_socketio_emit_bytes', 'Serialized size of emitted Socket.IO payloads', ('event',),
+    buckets=SIZE_BUCKETS)
+SOCKETIO_CLIENTS = Gauge(
+    'mybuddy_socketio_connected_clients', 'Connected Socket.IO clients')
+DB_POOL_CHECKED_OUT = Gauge(
+    'mybuddy_db_pool_checked_out', 'Database connections currently checked out of the pool')
+DB_POOL_CAPACITY = Gauge(
+    'mybuddy_db_pool_capacity', 'Connections the pool may open (pool_size + max_overflow)')
+DB_GROUP_COMMIT_SIZE = Histogram(
+    'mybuddy_db_group_commit_writes', 'Writes coalesced into one database commit',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500))
+INGEST_QUEUE_DEPTH = Gauge(
+    'mybuddy_ingest_queue_depth', 'Robot fetches waiting in the ingest queue for the database')
+INGEST_BATCH_SIZE = Histogram(
+    'mybuddy_ingest_batch_fetches', 'Queued robot fetches stored per database transaction',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 500, 1000))
+INGEST_LAG = Histogram(
+    'mybuddy_ingest_lag_seconds', 'Age of the oldest fetch in a batch when it reaches the database',
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 3600.0))
+INGEST_DEAD_LETTERS = Gauge(
+    'mybuddy_ingest_dead_letters', 'Robot fetches moved to the dead_readings table after INGEST_MAX_ATTEMPTS failed stores')
+
+
+# ==================== INSTRUMENTATION ====================
+
+def instrument_app(app):
+    """Record per-route request latency for a Flask app."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                endpoint=request.endpoint or 'unmatched',
+                method=request.method,
+                status=response.status_code
+            )
+        return response
+
+
+def instrument_sqlalchemy():
+    """Count and time every SQL statement through SQLAlchemy engine events."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+
+    if getattr(instrument_sqlalchemy, '_installed', False):
+        return
+    instrument_sqlalchemy._installed = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_metrics_started'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        DB_QUERIES.inc(operation=operation)
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, operation=operation)
+
+    @event.listens_for(Pool, 'checkout')
+    def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(Pool, 'checkin')
+    def _pool_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_scheduler(scheduler):
+    """Time scheduler jobs and count skipped/missed runs."""
+    from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+
+    def _on_event(event):
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            SCHEDULER_JOB_OVERRUNS.inc(job=event.job_id, reason='still_running')
+        elif event.code == EVENT_JOB_MISSED:
+            SCHEDULER_JOB_OVERRUNS.inc(job=event.job_id, reason='missed')
+
+    scheduler.add_listener(_on_event, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+
+
+def timed_job(job_id):
+    """Decorator recording a scheduled job's run time."""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            with SCHEDULER_JOB_DURATION.time(job=job_id):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorator
+
+
+def serve(address):
+    """Expose /metrics on 'host:port' from a daemon thread (for processes without Flask routes)."""
+    host, _, port = address.rpartition(':')
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), _Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"✓ Metrics exposed on http://{address}/metrics")
+    return server
@@ -0,0 +1,32 @@
+"""
+Migration script to add the account_stats table and fill it for existing accounts.
+Safe to run more than once - existing rows are recounted.
+
+Usage: python migrate_add_account_stats.py
+"""
+
+from main import create_app, db
+from models import Account, AccountStats
+import account_stats
+
+app = create_app('cli')
+
+
+def migrate():
+    with app.app_context():
+        print("Creating account_stats table...")
+        AccountStats.__table__.create(db.engine, checkfirst=True)
+
+        accounts = Account.query.all()
+        print(f"Counting stats for {len(accounts)} accounts...")
+        for account in accounts:
+            stats = account_stats.rebuild(account.id)
+            print(f"  {account.username}: {stats.data_points:,} data points, "
+                  f"{stats.robot_count} robots, {stats.sensor_count} sensors")
+
+        db.session.commit()
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,23 @@
+"""
+Migration script to add the alert_rule and alert tables used by alerts.py.
+Safe to run more than once.
+
+Usage: python migrate_add_alerts.py
+"""
+
+from main import create_app, db
+from models import Alert, AlertRule
+
+app = create_app('cli')
+
+
+def migrate():
+    with app.app_context():
+        print("Creating alert_rule and alert tables...")
+        AlertRule.__table__.create(db.engine, checkfirst=True)
+        Alert.__table__.create(db.engine, checkfirst=True)
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
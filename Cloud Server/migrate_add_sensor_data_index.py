@@ -0,0 +1,25 @@
+"""
+Migration script to add the (sensor_id, timestamp) index on sensor_data.
+Speeds up per-sensor history queries and the ETag checks of /api/sensor-data.
+Safe to run more than once.
+
+Usage: python migrate_add_sensor_data_index.py
+"""
+
+from main import create_app, db
+from models import SensorData
+
+app = create_app('cli')
+
+
+def migrate():
+    with app.app_context():
+        for index in SensorData.__table__.indexes:
+            if index.name == 'ix_sensor_data_sensor_id_timestamp':
+                print(f"Creating index {index.name} (may take a while on large tables)...")
+                index.create(db.engine, checkfirst=True)
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
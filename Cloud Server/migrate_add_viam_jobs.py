@@ -0,0 +1,22 @@
+"""
+Migration script to add the viam_job table used by jobs.py.
+Safe to run more than once.
+
+Usage: python migrate_add_viam_jobs.py
+"""
+
+from main import create_app, db
+from models import ViamJob
+
+app = create_app('cli')
+
+
+def migrate():
+    with app.app_context():
+        print("Creating viam_job table...")
+        ViamJob.__table__.create(db.engine, checkfirst=True)
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
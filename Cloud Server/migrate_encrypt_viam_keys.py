@@ -3,7 +3,9 @@ from cryptography.fernet import Fernet
 from extensions import db
 from models import UserRobot
 from dotenv import load_dotenv
-from main import app  # Import your Flask app
+from main import create_app  # Import your Flask app
+
+app = create_app('cli')
 
 load_dotenv()
 
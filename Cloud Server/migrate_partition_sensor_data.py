@@ -0,0 +1,115 @@
+"""
+Migration script to partition sensor_data by time (see partitions.py).
+
+- Postgres: rebuilds sensor_data as a native RANGE partitioned table with one
+  partition per SENSOR_DATA_PARTITION_PERIOD from the oldest reading up to
+  SENSOR_DATA_PARTITIONS_AHEAD periods ahead, plus a default partition for
+  anything outside them, and copies the readings over. The primary key
+  becomes (id, timestamp), as Postgres requires. Stop the web process and the
+  poller while it runs.
+- SQLite: rebuilds sensor_data with AUTOINCREMENT ids, so ids of archived
+  readings are never handed out again, and moves finished periods into their
+  own tables right away (the daily maintenance job keeps doing this
+  afterwards). Stop the web process and the poller while it runs.
+
+Needs SENSOR_DATA_PARTITIONING=1 (also for the processes started afterwards).
+Safe to run more than once.
+
+Usage: python migrate_partition_sensor_data.py
+"""
+
+from datetime import datetime
+from sqlalchemy import text
+from main import create_app, db
+from models import SensorData
+import partitions
+
+app = create_app('cli')
+
+
+def partition_postgres():
+    if partitions.mode() == 'timescale':
+        print("✓ sensor_data is a TimescaleDB hypertable, it is partitioned already")
+        return
+    if partitions.mode() == 'native':
+        print("sensor_data is partitioned already, creating upcoming partitions...")
+        partitions.ensure_partitions()
+        return
+
+    oldest = db.session.execute(text("SELECT min(timestamp) FROM sensor_data")).scalar() or datetime.utcnow()
+
+    print("Renaming the current table to sensor_data_unpartitioned...")
+    db.session.execute(text("ALTER TABLE sensor_data RENAME TO sensor_data_unpartitioned"))
+    db.session.execute(text("ALTER TABLE sensor_data_unpartitioned RENAME CONSTRAINT sensor_data_pkey TO sensor_data_unpartitioned_pkey"))
+    db.session.execute(text("ALTER INDEX IF EXISTS ix_sensor_data_timestamp RENAME TO ix_sensor_data_unpartitioned_timestamp"))
+    db.session.execute(text("ALTER INDEX IF EXISTS ix_sensor_data_sensor_id_timestamp RENAME TO ix_sensor_data_unpartitioned_sensor_id_timestamp"))
+    # Keep the id sequence when the old table is dropped
+    db.session.execute(text("ALTER SEQUENCE sensor_data_id_seq OWNED BY NONE"))
+
+    print("Creating the partitioned table...")
+    db.session.execute(text(
+        "CREATE TABLE sensor_data (LIKE sensor_data_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)"))
+    db.session.execute(text("ALTER TABLE sensor_data ADD PRIMARY KEY (id, timestamp)"))
+    db.session.execute(text(
+        "ALTER TABLE sensor_data ADD CONSTRAINT sensor_data_sensor_id_fkey FOREIGN KEY (sensor_id) REFERENCES sensor (id)"))
+    db.session.execute(text("CREATE INDEX ix_sensor_data_timestamp ON sensor_data (timestamp)"))
+    db.session.execute(text("CREATE INDEX ix_sensor_data_sensor_id_timestamp ON sensor_data (sensor_id, timestamp)"))
+    db.session.execute(text("ALTER SEQUENCE sensor_data_id_seq OWNED BY sensor_data.id"))
+    db.session.execute(text("CREATE TABLE sensor_data_default PARTITION OF sensor_data DEFAULT"))
+    db.session.commit()
+    partitions.reset()
+
+    start = partitions.period_start(oldest)
+    while start < partitions.period_start(datetime.utcnow()):
+        end = partitions.period_end(start)
+        partitions.create_partition(start, end)
+        start = end
+    partitions.ensure_partitions()
+    print(f"✓ Created {len(partitions.list_partitions())} partitions")
+
+    print("Copying readings (may take a while on large tables)...")
+    db.session.execute(text("INSERT INTO sensor_data SELECT * FROM sensor_data_unpartitioned"))
+    db.session.execute(text("DROP TABLE sensor_data_unpartitioned"))
+    db.session.commit()
+
+
+def autoincrement_sqlite():
+    if partitions.autoincrement_ids():
+        print("✓ sensor_data already has AUTOINCREMENT ids")
+        return
+
+    print("Rebuilding sensor_data with AUTOINCREMENT ids (may take a while on large tables)...")
+    hot = SensorData.__table__
+    columns = ', '.join(c.name for c in hot.columns)
+    db.session.execute(text("ALTER TABLE sensor_data RENAME TO sensor_data_unpartitioned"))
+    for index in hot.indexes:
+        db.session.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    hot.create(db.session.connection())
+    db.session.execute(text(
+        f"INSERT INTO sensor_data ({columns}) SELECT {columns} FROM sensor_data_unpartitioned ORDER BY id"))
+    db.session.execute(text("DROP TABLE sensor_data_unpartitioned"))
+    db.session.commit()
+
+
+def migrate():
+    with app.app_context():
+        if not app.config['SENSOR_DATA_PARTITIONING']:
+            print("✗ Set SENSOR_DATA_PARTITIONING=1 first (and keep it set for the web process and poller)")
+            return
+
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            partition_postgres()
+        elif dialect == 'sqlite':
+            autoincrement_sqlite()
+            print("Moving finished periods into their own tables...")
+            moved = partitions.archive_closed_periods()
+            print(f"✓ Moved {moved} readings into {len(partitions.list_partitions())} period tables")
+        else:
+            print(f"✗ Partitioning is not supported on {dialect}")
+            return
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,50 @@
+"""
+Migration script turning sensor_data into a TimescaleDB hypertable with one
+chunk per month (optional, Postgres with the timescaledb extension only).
+Range queries on recent data then only touch the newest chunks, and old
+months can be dropped with drop_chunks() instead of a large DELETE.
+
+TimescaleDB needs the time column in the primary key, so the key becomes
+(id, timestamp); ids stay unique because they still come from the sequence.
+Safe to run more than once.
+
+Usage: python migrate_timescaledb.py [chunk interval, default "1 month"]
+"""
+
+import sys
+from sqlalchemy import text
+from main import create_app, db
+
+app = create_app('cli')
+
+
+def migrate(chunk_interval='1 month'):
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print(f"✗ TimescaleDB needs Postgres, this database is {db.engine.dialect.name}")
+            return
+
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+            is_hypertable = conn.execute(text(
+                "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'sensor_data'"
+            )).first()
+            if is_hypertable:
+                print("✓ sensor_data is already a hypertable, nothing to do")
+                return
+
+            print("Replacing sensor_data primary key with (id, timestamp)...")
+            conn.execute(text("ALTER TABLE sensor_data DROP CONSTRAINT IF EXISTS sensor_data_pkey"))
+            conn.execute(text("ALTER TABLE sensor_data ADD PRIMARY KEY (id, timestamp)"))
+
+            print(f"Converting sensor_data to a hypertable ({chunk_interval} chunks, may take a while)...")
+            conn.execute(text(
+                "SELECT create_hypertable('sensor_data', 'timestamp', "
+                "chunk_time_interval => CAST(:interval AS INTERVAL), migrate_data => true)"
+            ), {'interval': chunk_interval})
+
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate(*sys.argv[1:2])
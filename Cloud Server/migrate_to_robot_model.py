@@ -5,10 +5,12 @@ Run this once on your server to migrate existing data.
 Usage: python migrate_to_robot_model.py
 """
 
-from main import app, db
+from main import create_app, db
 from models import Account, Robot, UserRobot
 from datetime import datetime
 
+app = create_app('cli')
+
 def migrate():
     with app.app_context():
         print("Starting migration from ViaDevice to Robot + UserRobot...")
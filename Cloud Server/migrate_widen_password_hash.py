@@ -0,0 +1,42 @@
+"""
+Migration script widening account.password_hash from 128 to 256 characters,
+so scrypt hashes (~160 characters, see passwords.py) fit. SQLite doesn't
+enforce VARCHAR lengths and needs no change.
+Safe to run more than once.
+
+Usage: python migrate_widen_password_hash.py
+"""
+
+from sqlalchemy import inspect, text
+from main import create_app, db
+
+app = create_app('cli')
+
+PASSWORD_HASH_LENGTH = 256
+
+
+def migrate():
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            print("✓ SQLite does not enforce column lengths, nothing to do")
+            return
+
+        column = next(c for c in inspect(db.engine).get_columns('account') if c['name'] == 'password_hash')
+        length = getattr(column['type'], 'length', None)
+        if length is None or length >= PASSWORD_HASH_LENGTH:
+            print(f"✓ account.password_hash already holds {length or 'any number of'} characters, nothing to do")
+            return
+
+        print(f"Widening account.password_hash from {length} to {PASSWORD_HASH_LENGTH} characters...")
+        if dialect == 'mysql':
+            statement = f"ALTER TABLE account MODIFY password_hash VARCHAR({PASSWORD_HASH_LENGTH}) NOT NULL"
+        else:
+            statement = f"ALTER TABLE account ALTER COLUMN password_hash TYPE VARCHAR({PASSWORD_HASH_LENGTH})"
+        with db.engine.begin() as conn:
+            conn.execute(text(statement))
+        print("\n✓ Migration completed successfully!")
+
+
+if __name__ == '__main__':
+    migrate()
@@ -1,7 +1,8 @@
 from datetime import datetime
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
 from cryptography.fernet import Fernet
+import passwords
+import json
 import os
 import sys
 
@@ -11,17 +12,40 @@ class Account(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=True)
-    password_hash = db.Column(db.String(128), nullable=False)
+    # 256: scrypt hashes are ~160 characters
+    password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationship to robots (through UserRobot)
     # user_robots relationship is auto-created in UserRobot model
 
+    @classmethod
+    def next_free_username(cls, base):
+        """
+        First free name of the form base, base1, base2, ... found with one
+        prefix query instead of probing the candidates one by one.
+        """
+        taken = {
+            name for (name,) in db.session.query(cls.username).filter(cls.username.startswith(base, autoescape=True))
+            if name.startswith(base)  # LIKE ignores case on SQLite, the unique constraint doesn't
+        }
+        if base not in taken:
+            return base
+
+        suffixes = {int(name[len(base):]) for name in taken if name[len(base):].isdigit()}
+        counter = 1
+        while counter in suffixes:
+            counter += 1
+        return f"{base}{counter}"
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return passwords.needs_rehash(self.password_hash)
 
     def to_dict(self, include_robots=False):
         d = {
@@ -43,7 +67,9 @@ class Sensor(db.Model):
     robot_id = db.Column(db.Integer, db.ForeignKey('robot.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # Relationship to sensor data readings
+    # Relationship to sensor data readings. With SQLite partitioning it (and its
+    # cascade) only reaches unarchived rows - use partitions.readings() and
+    # partitions.delete_readings() for all of them
     readings = db.relationship('SensorData', backref='sensor', cascade='all, delete-orphan', lazy=True)
 
     def to_dict(self):
@@ -59,6 +85,12 @@ class Sensor(db.Model):
 class SensorData(db.Model):
     """Stores individual sensor readings/data points"""
     __tablename__ = 'sensor_data'
+    __table_args__ = (
+        # Per-sensor history and newest-reading lookups (ETags, latest readings)
+        db.Index('ix_sensor_data_sensor_id_timestamp', 'sensor_id', 'timestamp'),
+        # Never reuse ids on SQLite: archived readings keep theirs (partitions.py)
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column(db.Integer, primary_key=True)
     sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -167,3 +199,109 @@ class UserRobot(db.Model):
             'last_connected': self.robot.last_connected.isoformat() if self.robot.last_connected else None,
             'added_at': self.added_at.isoformat()
         }
+
+
+class AccountStats(db.Model):
+    """Per-account dashboard numbers, kept up to date by account_stats.py"""
+    __tablename__ = 'account_stats'
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id', ondelete='CASCADE'), primary_key=True)
+    data_points = db.Column(db.BigInteger, nullable=False, default=0)
+    robot_count = db.Column(db.Integer, nullable=False, default=0)
+    sensor_count = db.Column(db.Integer, nullable=False, default=0)
+    last_ingest_at = db.Column(db.DateTime, nullable=True)
+    interactions = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'data_points': self.data_points,
+            'robot_count': self.robot_count,
+            'sensor_count': self.sensor_count,
+            'last_ingest_at': self.last_ingest_at.isoformat() if self.last_ingest_at else None,
+            'interactions': self.interactions
+        }
+
+
+class AlertRule(db.Model):
+    """A condition on one robot sensor's live readings, evaluated by alerts.py"""
+    __tablename__ = 'alert_rule'
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id', ondelete='CASCADE'), nullable=False, index=True)
+    robot_id = db.Column(db.Integer, db.ForeignKey('robot.id'), nullable=False)
+    sensor_name = db.Column(db.String(120), nullable=False)
+    condition = db.Column(db.String(20), nullable=False)  # above, below, rate_above, rate_below
+    threshold = db.Column(db.Float, nullable=False)  # value, or change per minute for rate_*
+    for_seconds = db.Column(db.Integer, nullable=False, default=0)  # must hold this long before firing
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'robot_id': self.robot_id,
+            'sensor_name': self.sensor_name,
+            'condition': self.condition,
+            'threshold': self.threshold,
+            'for_seconds': self.for_seconds,
+            'enabled': self.enabled
+        }
+
+
+class Alert(db.Model):
+    """One firing of an AlertRule; cleared_at is set once the condition stops holding"""
+    __tablename__ = 'alert'
+    __table_args__ = (
+        db.Index('ix_alert_account_id_triggered_at', 'account_id', 'triggered_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('alert_rule.id', ondelete='CASCADE'), nullable=False, index=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id', ondelete='CASCADE'), nullable=False)
+    robot_id = db.Column(db.Integer, db.ForeignKey('robot.id'), nullable=False)
+    sensor_name = db.Column(db.String(120), nullable=False)
+    value = db.Column(db.Float, nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    triggered_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    cleared_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rule_id': self.rule_id,
+            'robot_id': self.robot_id,
+            'sensor_name': self.sensor_name,
+            'value': self.value,
+            'message': self.message,
+            'triggered_at': self.triggered_at.isoformat(),
+            'cleared_at': self.cleared_at.isoformat() if self.cleared_at else None
+        }
+
+
+class ViamJob(db.Model):
+    """A user-triggered Viam job (manual fetch, alert rule reload), run by jobs.py in whichever process picks it up"""
+    __tablename__ = 'viam_job'
+    __table_args__ = (
+        db.Index('ix_viam_job_status_created_at', 'status', 'created_at'),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    job_type = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, finished, failed
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id', ondelete='CASCADE'), nullable=False, index=True)
+    robot_ids = db.Column(db.Text, nullable=False)  # JSON list
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'robot_ids': json.loads(self.robot_ids),
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error
+        }
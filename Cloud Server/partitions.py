@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Partitions Module
+Time partitioning of sensor_data, one partition per SENSOR_DATA_PARTITION_PERIOD
+(day, week or month). Partitions are tables named
+sensor_data_<start>_<end> (dates as YYYYMMDD, end exclusive).
+
+- Postgres: sensor_data is a native RANGE partitioned table (see
+  migrate_partition_sensor_data.py). The planner skips partitions outside a
+  query's timestamp range; maintain() creates upcoming partitions ahead of time.
+- SQLite: new readings land in sensor_data as before and maintain() moves every
+  finished period into its own table, once migrate_partition_sensor_data.py
+  has rebuilt sensor_data with AUTOINCREMENT ids (so ids of archived readings
+  are never handed out again) and done the first archive. readings() routes a
+  query to sensor_data plus only the period tables overlapping its range.
+  The SensorData model itself (Sensor.readings and its delete cascade) only
+  sees unarchived rows: read through readings() and delete through
+  delete_readings().
+- TimescaleDB (migrate_timescaledb.py) partitions by itself; only retention
+  (drop_chunks) is handled here.
+
+Either way retention drops whole partitions instead of deleting rows.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import Column, Index, MetaData, Table, func, select, text, union_all
+from extensions import db
+from models import Sensor, SensorData
+import account_stats
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+Partition = namedtuple('Partition', 'name start end')
+
+PERIODS = ('day', 'week', 'month')
+NAME_PATTERN = re.compile(r'^sensor_data_(\d{8})_(\d{8})$')
+# Rows moved per transaction when archiving on SQLite, so ingest isn't locked out for long
+ARCHIVE_BATCH = 20000
+
+_metadata = MetaData()
+_modes = {}  # engine url -> 'native' | 'timescale' | 'archive' | None
+
+
+# ==================== PERIODS ====================
+
+def period_start(timestamp, period=None):
+    period = period or current_app.config.get('SENSOR_DATA_PARTITION_PERIOD', 'month')
+    day = datetime(timestamp.year, timestamp.month, timestamp.day)
+    if period == 'day':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown partition period {period!r}, use one of {', '.join(PERIODS)}")
+
+
+def period_end(start, period=None):
+    period = period or current_app.config.get('SENSOR_DATA_PARTITION_PERIOD', 'month')
+    if period == 'day':
+        return start + timedelta(days=1)
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start, end):
+    return f"sensor_data_{start:%Y%m%d}_{end:%Y%m%d}"
+
+
+def _table(name):
+    """Core Table for one partition (same columns as sensor_data, no foreign key)."""
+    if name not in _metadata.tables:
+        columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+                   for c in SensorData.__table__.columns]
+        Table(name, _metadata, *columns,
+              Index(f'ix_{name}_sensor_id_timestamp', 'sensor_id', 'timestamp'))
+    return _metadata.tables[name]
+
+
+# ==================== DISCOVERY ====================
+
+def mode():
+    """How sensor_data is partitioned on the current database: 'native', 'timescale', 'archive' or None."""
+    key = str(db.engine.url)
+    if key not in _modes:
+        dialect = db.engine.dialect.name
+        if not current_app.config.get('SENSOR_DATA_PARTITIONING', False):
+            _modes[key] = None
+        elif dialect == 'sqlite':
+            _modes[key] = 'archive'
+        elif dialect == 'postgresql':
+            with db.engine.connect() as conn:
+                relkind = conn.execute(text(
+                    "SELECT relkind FROM pg_class WHERE oid = to_regclass('sensor_data')")).scalar()
+                hypertable = conn.execute(text(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).first() and conn.execute(text(
+                    "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'sensor_data'")).first()
+            _modes[key] = 'timescale' if hypertable else 'native' if relkind == 'p' else None
+        else:
+            _modes[key] = None
+    return _modes[key]
+
+
+def reset():
+    """Forget the detected mode (after a migration changed the table)."""
+    _modes.clear()
+
+
+def autoincrement_ids():
+    """SQLite: whether sensor_data never reuses ids (AUTOINCREMENT), which archiving relies on."""
+    sql = db.session.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'sensor_data'")).scalar()
+    return bool(sql) and 'AUTOINCREMENT' in sql.upper()
+
+
+def list_partitions():
+    """Partitions of sensor_data, oldest first (SQLite period tables / Postgres native partitions)."""
+    current = mode()
+    if current == 'archive':
+        names = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sensor_data_%'")).scalars()
+    elif current == 'native':
+        names = db.session.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('sensor_data')")).scalars()
+    else:
+        return []
+
+    partitions = []
+    for name in names:
+        match = NAME_PATTERN.match(name)
+        if match:
+            start, end = (datetime.strptime(group, '%Y%m%d') for group in match.groups())
+            partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+# ==================== ROUTING ====================
+
+def _sensor_filter(column, sensor_id):
+    if isinstance(sensor_id, (list, tuple, set)):
+        return column.in_(list(sensor_id))
+    return column == sensor_id
+
+
+def _bounded(statement, columns, sensor_id, since, until):
+    if sensor_id is not None:
+        statement = statement.where(_sensor_filter(columns.sensor_id, sensor_id))
+    if since is not None:
+        statement = statement.where(columns.timestamp >= since)
+    if until is not None:
+        statement = statement.where(columns.timestamp < until)
+    return statement
+
+
+def readings(sensor_id=None, since=None, until=None):
+    """
+    SensorData, or an alias of it covering only the partitions that overlap
+    [since, until), to query like the model. sensor_id may be one id or a list.
+    """
+    if mode() != 'archive':
+        return SensorData
+    overlapping = [p for p in list_partitions()
+                   if (since is None or p.end > since) and (until is None or p.start < until)]
+    if not overlapping:
+        return SensorData
+
+    tables = [SensorData.__table__] + [_table(p.name) for p in overlapping]
+    union = union_all(*[_bounded(select(*table.c), table.c, sensor_id, since, until) for table in tables])
+    return db.aliased(SensorData, union.subquery('sensor_data'), adapt_on_names=True)
+
+
+def window(sensor_id, limit, since=None, newest=False):
+    """
+    Narrow a history query that wants the oldest (or newest) `limit` readings at
+    or after `since` to the periods that hold them. Returns (since, until) for
+    readings(); on Postgres partition pruning does this by itself.
+    """
+    partitions = [p for p in list_partitions() if since is None or p.end > since] \
+        if mode() == 'archive' and limit else []
+    if not partitions:
+        return since, None
+
+    def count(table, lo=None, hi=None):
+        if since is not None:
+            lo = since if lo is None else max(lo, since)
+        statement = _bounded(select(func.count()).select_from(table), table.c, sensor_id, lo, hi)
+        return db.session.execute(statement).scalar()
+
+    hot = SensorData.__table__
+    if newest:
+        boundary = partitions[-1].end
+        total = count(hot, boundary)
+        for partition in reversed(partitions):
+            if total >= limit:
+                return max(boundary, since) if since else boundary, None
+            total += count(_table(partition.name)) + count(hot, partition.start, boundary)
+            boundary = partition.start
+        return since, None
+
+    boundary = partitions[0].start
+    total = count(hot, None, boundary)
+    for partition in partitions:
+        if total >= limit:
+            return since, boundary
+        total += count(_table(partition.name)) + count(hot, boundary, partition.end)
+        boundary = partition.end
+    return since, None
+
+
+# ==================== MAINTENANCE ====================
+
+def create_partition(start, end):
+    """Attach a native Postgres partition for [start, end). Commits."""
+    name = partition_name(start, end)
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF sensor_data "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"))
+    db.session.commit()
+    return name
+
+
+def ensure_partitions(now=None):
+    """Postgres: create partitions for the current and SENSOR_DATA_PARTITIONS_AHEAD next periods."""
+    existing = list_partitions()
+    start = period_start(now or datetime.utcnow())
+    created = []
+    for _ in range(current_app.config.get('SENSOR_DATA_PARTITIONS_AHEAD', 2) + 1):
+        end = period_end(start)
+        if not any(p.start < end and p.end > start for p in existing):
+            try:
+                created.append(create_partition(start, end))
+            except Exception as e:
+                # Usually rows for this range already sit in the default partition
+                db.session.rollback()
+                logger.error(f"Could not create partition for {start:%Y-%m-%d}: {e}")
+        start = end
+    if created:
+        logger.info(f"✓ Created sensor_data partitions: {', '.join(created)}")
+    return created
+
+
+def archive_closed_periods(now=None):
+    """
+    SQLite: move readings from finished periods out of sensor_data into their
+    period tables, ARCHIVE_BATCH rows per transaction. Does nothing until
+    migrate_partition_sensor_data.py gave sensor_data AUTOINCREMENT ids.
+    Returns the number of rows moved.
+    """
+    if not autoincrement_ids():
+        logger.warning("⚠ sensor_data partitioning is on but migrate_partition_sensor_data.py hasn't run, "
+                       "not archiving")
+        return 0
+
+    hot = SensorData.__table__
+    cutoff = period_start(now or datetime.utcnow())
+    moved = 0
+    while True:
+        oldest = db.session.execute(select(func.min(hot.c.timestamp)).where(hot.c.timestamp < cutoff)).scalar()
+        if oldest is None:
+            break
+
+        start = period_start(oldest)
+        end = period_end(start)
+        table = _table(partition_name(start, end))
+        table.create(db.session.connection(), checkfirst=True)
+
+        in_period = (hot.c.timestamp >= start, hot.c.timestamp < end)
+        ids = select(hot.c.id).where(*in_period).order_by(hot.c.id).limit(ARCHIVE_BATCH).subquery()
+        upper = db.session.execute(select(func.max(ids.c.id))).scalar()
+        batch = (*in_period, hot.c.id <= upper)
+        db.session.execute(table.insert().from_select([c.name for c in hot.c], select(*hot.c).where(*batch)))
+        count = db.session.execute(hot.delete().where(*batch)).rowcount
+        db.session.commit()
+        moved += count
+
+    if moved:
+        logger.info(f"✓ Archived {moved} readings into period tables")
+    return moved
+
+
+def _remove_from_stats(table, condition=None):
+    """Take readings that are about to be dropped off the account stats. Does not commit."""
+    statement = select(Sensor.robot_id, func.count()).select_from(table)\
+        .join(Sensor, Sensor.id == table.c.sensor_id).group_by(Sensor.robot_id)
+    if condition is not None:
+        statement = statement.where(condition)
+    for robot_id, count in db.session.execute(statement).all():
+        account_stats.record_removal(robot_id, count)
+
+
+def drop_before(cutoff):
+    """
+    Drop readings older than `cutoff`. Whole partitions are dropped, so on
+    partitioned tables the cutoff is rounded down to a partition boundary;
+    unpartitioned tables fall back to DELETE. Returns dropped partition names.
+    """
+    current = mode()
+    hot = SensorData.__table__
+    dropped = []
+
+    if current == 'timescale':
+        _remove_from_stats(hot, hot.c.timestamp < cutoff)
+        db.session.execute(text("SELECT drop_chunks('sensor_data', older_than => :cutoff)"), {'cutoff': cutoff})
+        db.session.commit()
+        return ['timescale chunks']
+
+    for partition in list_partitions():
+        if partition.end > cutoff:
+            break
+        _remove_from_stats(_table(partition.name))
+        if current == 'native':
+            db.session.execute(text(f"ALTER TABLE sensor_data DETACH PARTITION {partition.name}"))
+        db.session.execute(text(f"DROP TABLE {partition.name}"))
+        db.session.commit()
+        dropped.append(partition.name)
+
+    if current == 'native':
+        # Out-of-range rows caught by the default partition
+        if db.session.execute(text("SELECT to_regclass('sensor_data_default')")).scalar():
+            default = _table('sensor_data_default')
+            _remove_from_stats(default, default.c.timestamp < cutoff)
+            db.session.execute(default.delete().where(default.c.timestamp < cutoff))
+            db.session.commit()
+    else:
+        # Late arrivals on SQLite, or everything on an unpartitioned table
+        condition = hot.c.timestamp < cutoff
+        _remove_from_stats(hot, condition)
+        db.session.execute(hot.delete().where(condition))
+        db.session.commit()
+
+    if dropped:
+        logger.info(f"✓ Dropped sensor_data partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def delete_readings(sensor_ids):
+    """
+    Delete all readings of the given sensors, archived ones included, and take
+    them off the account stats. Call before deleting the Sensor rows. Does not commit.
+    """
+    tables = [SensorData.__table__]
+    if mode() == 'archive':
+        tables += [_table(p.name) for p in list_partitions()]
+    for table in tables:
+        condition = _sensor_filter(table.c.sensor_id, sensor_ids)
+        _remove_from_stats(table, condition)
+        db.session.execute(table.delete().where(condition))
+
+
+def maintain():
+    """Scheduled: prepare partitions for new data, then apply SENSOR_DATA_RETENTION_DAYS."""
+    current = mode()
+    if current == 'native':
+        ensure_partitions()
+    elif current == 'archive':
+        archive_closed_periods()
+
+    retention_days = current_app.config.get('SENSOR_DATA_RETENTION_DAYS', 0)
+    if retention_days:
+        drop_before(datetime.utcnow() - timedelta(days=retention_days))
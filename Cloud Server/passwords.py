@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Password Hashing Module
+Hashing a password is deliberately slow and, with scrypt, needs ~32 MB of
+memory per hash. Hashes run on a small bounded thread pool so a burst of
+logins can occupy at most PASSWORD_HASH_WORKERS cores (hashlib releases the
+GIL while hashing) and the dashboard keeps being served. Callers that cannot
+get a slot within PASSWORD_HASH_WAIT seconds get PasswordHashBusy.
+
+PASSWORD_HASH_METHOD picks the algorithm and cost as a werkzeug method string
+("scrypt:32768:8:1", "pbkdf2:sha256:600000", ...). Hashes made with another
+method are upgraded on the next successful login. Pick a cost for the target
+hardware with benchmarks/bench_password_hash.py.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashBusy(Exception):
+    """Raised when no hashing slot frees up in time."""
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+_prefixes = {}
+
+
+def _setting(key):
+    if has_app_context():
+        return current_app.config.get(key, getattr(Config, key))
+    return getattr(Config, key)
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = max(1, _setting('PASSWORD_HASH_WORKERS'))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            # Running hashes plus the ones allowed to wait in the queue
+            _slots = threading.BoundedSemaphore(workers + max(0, _setting('PASSWORD_HASH_MAX_PENDING')))
+    return _executor, _slots
+
+
+def _run(func, *args):
+    executor, slots = _get_executor()
+    if not slots.acquire(timeout=_setting('PASSWORD_HASH_WAIT')):
+        logger.warning("⚠ Password hashing queue full, rejecting request")
+        raise PasswordHashBusy()
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    """Hash a password with the configured method."""
+    return _run(generate_password_hash, password, _setting('PASSWORD_HASH_METHOD'))
+
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash (any supported method)."""
+    return _run(check_password_hash, password_hash, password)
+
+
+def _method_prefix(method):
+    # werkzeug fills in default parameters ("pbkdf2" -> "pbkdf2:sha256:1000000"),
+    # so derive the canonical prefix from a real hash once per method
+    if method not in _prefixes:
+        _prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return _prefixes[method]
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different method or cost."""
+    return password_hash.split('$', 1)[0] != _method_prefix(_setting('PASSWORD_HASH_METHOD'))
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Viam Poller Service
+Owns the Viam connection pool and the polling schedule. Runs inside the web
+process (VIAM_POLLER=embedded) or as its own process (VIAM_POLLER=external),
+in which case it writes to the database itself (through ingest_queue.py) and
+forwards live readings to the web process over the local relay (see
+live_relay.py).
+
+Usage: python poller.py
+"""
+
+from flask import Flask
+from config import Config
+from extensions import db
+import db_engine
+import ingest_queue
+import metrics
+import realtime
+import robot_status
+import atexit
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@metrics.timed_job('viam_live_fetch')
+def scheduled_viam_live_fetch(app):
+    """Fetch LIVE Viam sensor data (runs every 5 seconds) - does NOT save to database"""
+    with app.app_context():
+        from viam_integration import fetch_live_sensor_data
+        live_data = fetch_live_sensor_data()
+
+        # Share robot statuses with the web process when running out-of-process
+        realtime.share('robot_status', robot_status.snapshot())
+
+        if live_data:
+            logger.debug(f"✓ Live sensor data fetched: {len(live_data)} sensors")
+            # Emit live data to all connected clients via Socket.IO
+            realtime.emit('live_sensor_data', {
+                'success': True,
+                'readings': live_data
+            })
+
+
+@metrics.timed_job('viam_sensor_fetch_hourly')
+def scheduled_viam_fetch(app):
+    """Fetch Viam sensor data and save to database (runs every hour at xx:00)"""
+    with app.app_context():
+        from viam_integration import fetch_and_store_sensor_data
+        logger.info("🤖 Scheduled Viam sensor data fetch started (SAVING TO DATABASE)")
+        fetch_and_store_sensor_data()
+
+
+@metrics.timed_job('viam_jobs')
+def scheduled_viam_jobs(app):
+    """Start queued user-triggered Viam jobs (runs every VIAM_JOB_POLL_INTERVAL seconds)"""
+    import jobs
+    jobs.run_queued(app)
+
+
+@metrics.timed_job('sensor_data_maintenance')
+def scheduled_partition_maintenance(app):
+    """Prepare sensor_data partitions and apply retention (runs daily at 00:30)"""
+    with app.app_context():
+        import partitions
+        partitions.maintain()
+
+
+def register_viam_jobs(scheduler, app):
+    """Add the Viam polling jobs (and sensor_data maintenance) to a scheduler."""
+    from apscheduler.triggers.interval import IntervalTrigger
+    from apscheduler.triggers.cron import CronTrigger
+
+    metrics.instrument_scheduler(scheduler)
+
+    # Schedule LIVE data fetch every 5 seconds (does NOT save to database)
+    scheduler.add_job(
+        func=scheduled_viam_live_fetch,
+        args=[app],
+        trigger=IntervalTrigger(seconds=5),
+        id='viam_live_fetch',
+        name='Fetch LIVE Viam sensor data (broadcast via Socket.IO)',
+        replace_existing=True
+    )
+
+    # Schedule database-saving fetch every hour at xx:00 (0 minutes past the hour)
+    scheduler.add_job(
+        func=scheduled_viam_fetch,
+        args=[app],
+        trigger=CronTrigger(minute=0),
+        id='viam_sensor_fetch_hourly',
+        name='Fetch Viam sensor data (save to database)',
+        replace_existing=True
+    )
+
+    # Manual fetches queued by any web worker (the only runner with VIAM_POLLER=external)
+    scheduler.add_job(
+        func=scheduled_viam_jobs,
+        args=[app],
+        trigger=IntervalTrigger(seconds=app.config['VIAM_JOB_POLL_INTERVAL']),
+        id='viam_jobs',
+        name='Run queued Viam jobs (manual fetch)',
+        replace_existing=True
+    )
+
+    # sensor_data partitions and retention, daily (the first archive is migrate_partition_sensor_data.py's)
+    scheduler.add_job(
+        func=scheduled_partition_maintenance,
+        args=[app],
+        trigger=CronTrigger(hour=0, minute=30),
+        id='sensor_data_maintenance',
+        name='Maintain sensor_data partitions and retention',
+        replace_existing=True
+    )
+
+
+def create_poller_app():
+    """Minimal Flask app giving the poller database access (no routes, no Socket.IO)."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    db_engine.init_app(app)
+    ingest_queue.init_app(app)
+    with app.app_context():
+        import models  # noqa: F401
+    return app
+
+
+def main():
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from live_relay import RelayPublisher
+    from viam_integration import get_pool
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_poller_app()
+
+    publisher = RelayPublisher(app.config['VIAM_POLLER_IPC_ADDRESS'], app.config['SECRET_KEY'].encode())
+    realtime.set_publisher(publisher.publish)
+    ingest_queue.start(app)
+
+    metrics.instrument_sqlalchemy()
+    if app.config['POLLER_METRICS_ADDRESS']:
+        metrics.serve(app.config['POLLER_METRICS_ADDRESS'])
+
+    scheduler = BlockingScheduler()
+    register_viam_jobs(scheduler, app)
+    atexit.register(lambda: get_pool().close())
+
+    logger.info(f"✓ Viam poller started, relaying to {app.config['VIAM_POLLER_IPC_ADDRESS']}")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Viam poller stopped")
+
+
+if __name__ == '__main__':
+    main()
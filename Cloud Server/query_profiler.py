@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+SQL Query Profiler
+Development middleware that records, per request, how many SQL statements ran,
+how long they took and which statement shapes repeated. Requests crossing the
+configured thresholds are logged as warnings (repeated shapes are the usual
+sign of an N+1 loop), and a Server-Timing header can show the numbers in the
+browser's network panel.
+
+Enable with SQL_PROFILER=1 (see config.py for the thresholds).
+"""
+
+from collections import Counter
+from flask import g, has_request_context, request
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Normalize a SQL statement so queries differing only in values compare equal."""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_sql_profile' in g:
+        conn.info.setdefault('_profiler_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and '_sql_profile' in g):
+        return
+    started = conn.info.get('_profiler_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    profile = g._sql_profile
+    profile['count'] += 1
+    profile['seconds'] += elapsed
+    profile['shapes'][statement_shape(statement)] += 1
+
+
+def init_app(app):
+    """Install the profiler on an app when SQL_PROFILER is enabled."""
+    if not app.config.get('SQL_PROFILER'):
+        return
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    max_queries = app.config.get('SQL_PROFILER_MAX_QUERIES', 20)
+    max_db_ms = app.config.get('SQL_PROFILER_MAX_DB_MS', 100)
+    repeat_threshold = app.config.get('SQL_PROFILER_REPEAT_THRESHOLD', 5)
+    server_timing = app.config.get('SQL_PROFILER_SERVER_TIMING', True)
+
+    @app.before_request
+    def _start_sql_profile():
+        g._sql_profile = {'count': 0, 'seconds': 0.0, 'shapes': Counter()}
+
+    @app.after_request
+    def _report_sql_profile(response):
+        profile = g.pop('_sql_profile', None)
+        if profile is None:
+            return response
+
+        db_ms = profile['seconds'] * 1000
+        repeated = [(shape, n) for shape, n in profile['shapes'].most_common() if n >= repeat_threshold]
+
+        if profile['count'] > max_queries or db_ms > max_db_ms or repeated:
+            lines = [f"[SQL] {request.method} {request.path}: {profile['count']} queries, {db_ms:.1f} ms in DB"]
+            for shape, n in repeated[:5]:
+                lines.append(f"    repeated {n}x (possible N+1): {shape[:200]}")
+            logger.warning('\n'.join(lines))
+
+        if server_timing:
+            entry = f'db;dur={db_ms:.1f};desc="{profile["count"]} queries"'
+            existing = response.headers.get('Server-Timing')
+            response.headers['Server-Timing'] = f'{existing}, {entry}' if existing else entry
+        return response
+
+    logger.info("✓ SQL profiler enabled")
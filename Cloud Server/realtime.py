@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Realtime Events Module
+Single place through which server-side Socket.IO events are published, so the
+same code works inside the web process and inside the standalone poller.
+"""
+
+from extensions import socketio
+import metrics
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# When set, events are handed to this callable instead of the local Socket.IO
+# server (the poller process uses it to forward events to the web process).
+_publisher = None
+
+# When set, events are handed to this callable instead of Flask-SocketIO (the
+# ASGI server in asgi.py runs its own Socket.IO server on the event loop).
+_emitter = None
+
+
+def set_publisher(publisher):
+    """Route emitted events to publisher(event, data, room) instead of Socket.IO."""
+    global _publisher
+    _publisher = publisher
+
+
+def set_emitter(emitter):
+    """Deliver emitted events with emitter(event, data, room) instead of Flask-SocketIO."""
+    global _emitter
+    _emitter = emitter
+
+
+def account_room(account_id):
+    """Socket.IO room joined by every connection of one account."""
+    return f'account_{account_id}'
+
+
+def share(event, data):
+    """Pass process state (not meant for browsers) to the web process; no-op inside it."""
+    if _publisher is not None:
+        _publisher(event, data, None)
+
+
+def emit(event, data, room=None):
+    """Emit an event to connected browsers (or to one room)."""
+    metrics.SOCKETIO_EMIT_BYTES.observe(len(json.dumps(data, default=str)), event=event)
+    if _publisher is not None:
+        _publisher(event, data, room)
+        return
+    if _emitter is not None:
+        _emitter(event, data, room)
+        return
+    socketio.emit(event, data, to=room, namespace='/')
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Robot Configuration Module
+Batched edits of a robot's component attributes (pins) in its Viam
+configuration.
+
+Each robot's configuration is cached for ROBOT_CONFIG_TTL seconds together
+with a version (a hash of its content); the cache only serves reads (the
+configure page and its previews). Clients read the configuration and version,
+then send all their edits at once with that version. Under the robot's edit
+lock the live configuration is loaded again, and:
+- edits are diffed against it, and attributes that already have the
+  requested value are dropped
+- what is left is written back in a single save, so a page full of pin
+  changes costs one Viam call instead of one dial and reconfigure per sensor
+- a version that no longer matches (someone saved in between) raises
+  ConfigConflict instead of overwriting their change
+
+Everything runs on the Viam pool's loop; load_config/save_config are the
+pool's hooks (the Viam app API, or fake_viam.py).
+"""
+
+from viam_integration import get_pool
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# robot_id -> (config, version, loaded_at monotonic)
+_cache = {}
+_cache_lock = threading.Lock()
+# robot_id -> asyncio.Lock, so edits of one robot are applied one at a time
+_edit_locks = {}
+
+
+class ConfigConflict(Exception):
+    """The robot's configuration changed since the client's version."""
+
+    def __init__(self, config, version):
+        super().__init__("Robot configuration changed since it was loaded")
+        self.config = config
+        self.version = version
+
+
+class UnknownComponent(Exception):
+    """An edit names a component the robot's configuration doesn't have."""
+
+
+def config_version(config):
+    """Content hash of a configuration, used as its version."""
+    canonical = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def components(config):
+    """The configuration's components as [{'name', 'api', 'model', 'attributes'}]."""
+    return [{
+        'name': component.get('name'),
+        'api': component.get('api') or component.get('type'),
+        'model': component.get('model'),
+        'attributes': dict(component.get('attributes') or {})
+    } for component in config.get('components', [])]
+
+
+def diff(config, edits):
+    """
+    Changes edits ({component: {attribute: value}}, None removes an attribute)
+    would make to config, as {component: {attribute: (old, new)}}.
+    """
+    by_name = {component.get('name'): component for component in config.get('components', [])}
+    unknown = sorted(set(edits) - set(by_name))
+    if unknown:
+        raise UnknownComponent(f"Unknown component(s): {', '.join(unknown)}")
+
+    changes = {}
+    for name, attributes in edits.items():
+        current = by_name[name].get('attributes') or {}
+        changed = {key: (current.get(key), value) for key, value in attributes.items()
+                   if current.get(key) != value and not (value is None and key not in current)}
+        if changed:
+            changes[name] = changed
+    return changes
+
+
+def _apply(config, changes):
+    updated = copy.deepcopy(config)
+    for component in updated.get('components', []):
+        for key, (_, value) in changes.get(component.get('name'), {}).items():
+            attributes = component.setdefault('attributes', {})
+            if value is None:
+                attributes.pop(key, None)
+            else:
+                attributes[key] = value
+    return updated
+
+
+def _cached(robot_id, max_age):
+    with _cache_lock:
+        entry = _cache.get(robot_id)
+    if entry and time.monotonic() - entry[2] < max_age:
+        return entry[0], entry[1]
+    return None
+
+
+def _store(robot_id, config):
+    version = config_version(config)
+    with _cache_lock:
+        _cache[robot_id] = (config, version, time.monotonic())
+    return version
+
+
+def invalidate(robot_id=None):
+    """Drop one robot's cached configuration (all robots when None)."""
+    with _cache_lock:
+        if robot_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(robot_id, None)
+
+
+async def _load(robot_id, robot_address, api_key, api_key_id, max_age):
+    cached = _cached(robot_id, max_age)
+    if cached:
+        return cached
+    config = await get_pool().load_config(robot_address, api_key, api_key_id)
+    return config, _store(robot_id, config)
+
+
+async def get_async(robot_id, robot_address, api_key, api_key_id, timeout, max_age):
+    """(config, version) of a robot, from the cache when younger than max_age seconds."""
+    return await asyncio.wait_for(_load(robot_id, robot_address, api_key, api_key_id, max_age), timeout)
+
+
+async def apply_async(robot_id, robot_address, api_key, api_key_id, edits, version, timeout):
+    """
+    Apply edits ({component: {attribute: value}}) to the live configuration in
+    one save. version is the one the client read (None to skip the check; the
+    edits are still applied to the live configuration, so other components
+    keep their current values). Returns (config, version, changes); nothing is
+    saved when the edits change nothing.
+    Raises ConfigConflict, UnknownComponent, or the save's error.
+    """
+    lock = _edit_locks.setdefault(robot_id, asyncio.Lock())
+
+    async def _edit():
+        async with lock:
+            # Never the cache: the save writes back the whole configuration
+            config, current = await _load(robot_id, robot_address, api_key, api_key_id, max_age=0)
+            if version is not None and version != current:
+                raise ConfigConflict(config, current)
+
+            changes = diff(config, edits)
+            if not changes:
+                return config, current, changes
+
+            updated = _apply(config, changes)
+            try:
+                await get_pool().save_config(robot_address, api_key, api_key_id, updated)
+            except BaseException:
+                # The save may or may not have landed - read it back next time
+                invalidate(robot_id)
+                raise
+            logger.info(f"✓ Updated {', '.join(changes)} on robot {robot_id} in one reconfigure")
+            return updated, _store(robot_id, updated), changes
+
+    return await asyncio.wait_for(_edit(), timeout)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Robot Status Module
+In-memory status of every robot (online/offline, component count, last seen,
+round-trip time). The Viam poller keeps it current, so routes can show robot
+status without dialing the robot.
+"""
+
+from datetime import datetime
+import threading
+import time
+
+_statuses = {}
+_lock = threading.Lock()
+
+
+def _record(robot_id, **fields):
+    with _lock:
+        status = _statuses.setdefault(robot_id, {
+            'status': 'offline',
+            'components': 0,
+            'rtt_ms': None,
+            'last_seen': None
+        })
+        status.update(fields)
+        status['checked_at'] = time.time()
+
+
+def mark_online(robot_id, components, rtt_ms):
+    """Record a successful poll of a robot."""
+    _record(robot_id, status='online', components=components, rtt_ms=rtt_ms,
+            last_seen=datetime.utcnow().isoformat())
+
+
+def mark_offline(robot_id):
+    """Record a failed poll of a robot (keeps the last known component count)."""
+    _record(robot_id, status='offline', rtt_ms=None)
+
+
+def get(robot_id, max_age=None):
+    """Cached status of a robot, or None if unknown (or older than max_age seconds)."""
+    with _lock:
+        status = _statuses.get(robot_id)
+        if status is None:
+            return None
+        if max_age is not None and time.time() - status['checked_at'] > max_age:
+            return None
+        return dict(status)
+
+
+def snapshot(robot_ids=None):
+    """Copy of the cached statuses ({robot_id: status}), optionally for some robots only."""
+    with _lock:
+        if robot_ids is None:
+            return {robot_id: dict(status) for robot_id, status in _statuses.items()}
+        return {robot_id: dict(_statuses[robot_id]) for robot_id in robot_ids if robot_id in _statuses}
+
+
+def merge(statuses):
+    """Apply statuses published by another process (keys may arrive as strings)."""
+    with _lock:
+        for robot_id, status in statuses.items():
+            _statuses[int(robot_id)] = dict(status)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling Stats Module
+Count, average, min and max of every sensor over the last hour, day and week
+(WINDOWS), kept up to date as readings come in instead of scanning
+them on each request.
+
+Each window is split into STATISTICS_BUCKETS time buckets. A new reading only
+touches the newest bucket; a finished bucket is added to a running count and
+sum and to two monotonic deques (rising minimums, falling maximums) whose
+fronts are the window's min and max. Buckets that slide out of the window are
+subtracted again, so every update and lookup is O(1) amortized and memory per
+sensor is bounded whatever the reading rate. Window edges are as precise as
+one bucket (10 s for the hour with the defaults).
+
+Readings committed in this process are added right after their commit. A
+sensor's state is loaded from the database the first time it is asked for -
+per-bucket count/sum/min/max computed by the database, plus the raw readings
+of the last STATISTICS_SYNC_OVERLAP seconds - and then topped up every
+STATISTICS_SYNC_INTERVAL seconds with the readings other processes (poller.py,
+other workers) stored since: rows with a higher id, and every row of the
+overlap again, skipping ids already counted. The overlap catches rows that
+commit after a higher id was read (Postgres hands out ids before commit).
+A reading older than the newest one already counted (a backfill upload) makes
+the sensor load again, and every sensor reloads after
+STATISTICS_RECONCILE_INTERVAL seconds to pick up anything the top-ups missed.
+"""
+
+from collections import deque
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import Float, Integer, cast, event, extract, func, literal_column, or_, text
+from sqlalchemy.orm import Session
+from extensions import db
+from models import SensorData
+import db_engine
+import partitions
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Readings counted through record() ahead of the last database read before a
+# sensor's state is dropped (it reloads when it is next asked for)
+MAX_RECORDED = 10000
+
+# Window name -> length, in the order they are reported
+WINDOWS = {'1h': timedelta(hours=1), '24h': timedelta(hours=24), '7d': timedelta(days=7)}
+
+
+class _Bucket:
+    __slots__ = ('key', 'count', 'total', 'low', 'high')
+
+    def __init__(self, key, count, total, low, high):
+        self.key = key
+        self.count = count
+        self.total = total
+        self.low = low
+        self.high = high
+
+    def merge(self, count, total, low, high):
+        self.count += count
+        self.total += total
+        if low < self.low:
+            self.low = low
+        if high > self.high:
+            self.high = high
+
+
+class RollingWindow:
+    """Count/sum/min/max of the values of the last `seconds`, in `buckets` time buckets."""
+
+    def __init__(self, seconds, buckets=360):
+        self.seconds = seconds
+        self.width = seconds / buckets
+        self._open = None        # newest bucket, still taking readings
+        self._closed = deque()   # finished buckets inside the window, oldest first
+        self._lows = deque()     # finished buckets with rising .low - front is the minimum
+        self._highs = deque()    # finished buckets with falling .high - front is the maximum
+        self._count = 0
+        self._total = 0.0
+
+    def add(self, ts, value):
+        """Add a value at epoch seconds `ts`. Returns False if ts is before the newest bucket."""
+        return self.add_bucket(int(ts // self.width), 1, value, value, value)
+
+    def add_bucket(self, key, count, total, low, high):
+        """Add values already summed per bucket (bucket key = epoch seconds // width). False if key is before the newest bucket."""
+        bucket = self._open
+        if bucket is not None and key == bucket.key:
+            bucket.merge(count, total, low, high)
+            return True
+        if bucket is not None and key < bucket.key:
+            return False
+        if bucket is not None:
+            self._close(bucket)
+        self._open = _Bucket(key, count, total, low, high)
+        return True
+
+    def _close(self, bucket):
+        self._closed.append(bucket)
+        self._count += bucket.count
+        self._total += bucket.total
+        while self._lows and self._lows[-1].low >= bucket.low:
+            self._lows.pop()
+        self._lows.append(bucket)
+        while self._highs and self._highs[-1].high <= bucket.high:
+            self._highs.pop()
+        self._highs.append(bucket)
+
+    def _expire(self, now):
+        # A bucket stays while any part of it is inside the window
+        first_key = int((now - self.seconds) // self.width)
+        closed = self._closed
+        while closed and closed[0].key < first_key:
+            bucket = closed.popleft()
+            self._count -= bucket.count
+            self._total -= bucket.total
+            if self._lows[0] is bucket:
+                self._lows.popleft()
+            if self._highs[0] is bucket:
+                self._highs.popleft()
+        if not closed:
+            # Don't carry float error over once the window is empty
+            self._total = 0.0
+        if self._open is not None and self._open.key < first_key:
+            self._open = None
+
+    def summary(self, now):
+        """{'count', 'average', 'min', 'max'} of the window ending at epoch seconds `now`, or None when empty."""
+        self._expire(now)
+        count, total = self._count, self._total
+        lows, highs = [], []
+        if self._lows:
+            lows.append(self._lows[0].low)
+            highs.append(self._highs[0].high)
+        if self._open is not None:
+            count += self._open.count
+            total += self._open.total
+            lows.append(self._open.low)
+            highs.append(self._open.high)
+        if not count:
+            return None
+        return {'count': count, 'average': total / count, 'min': min(lows), 'max': max(highs)}
+
+
+class _SensorStats:
+    __slots__ = ('windows', 'last_id', 'floor', 'counted', 'newest', 'current', 'synced_at', 'loaded_at')
+
+    def __init__(self, buckets, floor):
+        self.windows = {name: RollingWindow(length.total_seconds(), buckets) for name, length in WINDOWS.items()}
+        self.last_id = 0        # highest id read from the database
+        self.floor = floor      # epoch seconds the last database read re-scanned from
+        self.counted = {}       # id -> epoch seconds of counted readings above last_id or at/after floor
+        self.newest = None      # epoch seconds of the newest reading counted
+        self.current = None     # its value
+        self.synced_at = self.loaded_at = time.monotonic()
+
+    def seen(self, reading_id, ts):
+        # Below last_id and before floor: read before (or missed until the next reconcile)
+        return reading_id in self.counted or (reading_id <= self.last_id and ts < self.floor)
+
+    def add(self, ts, value):
+        """Count one reading. Returns False when it is older than what was counted (state must reload)."""
+        if self.newest is not None and ts < self.newest:
+            return False
+        self.newest, self.current = ts, value
+        for window in self.windows.values():
+            window.add(ts, value)
+        return True
+
+    def apply_fetched(self, rows, floor):
+        """
+        Count readings read from the database [(id, epoch seconds, value)] - every
+        row at or after `floor` plus newer ids. Returns False to reload.
+        """
+        highest = self.last_id
+        for reading_id, ts, value in rows:
+            highest = max(highest, reading_id)
+            if self.seen(reading_id, ts):
+                continue
+            if not self.add(ts, value):
+                return False
+            self.counted[reading_id] = ts
+        self.last_id = highest
+        self.floor = floor
+        self.counted = {i: ts for i, ts in self.counted.items() if i > highest or ts >= floor}
+        return True
+
+
+_lock = threading.Lock()
+_sensors = {}  # sensor_id -> _SensorStats
+
+
+def _epoch(timestamp):
+    # Naive UTC datetimes, like everything in sensor_data
+    return (timestamp - datetime(1970, 1, 1)).total_seconds()
+
+
+# ==================== INGEST ====================
+
+def _collect_new_readings(session, flush_context):
+    # After a flush the new readings have ids; they count once the transaction commits
+    new = [(r.sensor_id, r.id, r.timestamp, r.value) for r in session.new
+           if isinstance(r, SensorData) and r.value is not None]
+    if new:
+        session.info.setdefault('rolling_stats', []).extend(new)
+
+
+def _record_committed(session):
+    pending = session.info.pop('rolling_stats', None)
+    if pending:
+        record(pending)
+
+
+def _discard_rolled_back(session):
+    session.info.pop('rolling_stats', None)
+
+
+def record(readings):
+    """Count committed readings [(sensor_id, id, timestamp, value)] for the sensors already loaded."""
+    with _lock:
+        if not _sensors:
+            return
+        for sensor_id, reading_id, timestamp, value in readings:
+            stats = _sensors.get(sensor_id)
+            ts = _epoch(timestamp)
+            if stats is None or stats.seen(reading_id, ts):
+                continue
+            stats.counted[reading_id] = ts
+            # Too far ahead of the database reads (nobody asked for a while) - reload on demand
+            if not stats.add(ts, value) or len(stats.counted) > MAX_RECORDED:
+                del _sensors[sensor_id]
+
+
+def init_app(app):
+    """Count readings added through the ORM as soon as their transaction commits."""
+    for name, listener in (('after_flush', _collect_new_readings),
+                           ('after_commit', _record_committed),
+                           ('after_rollback', _discard_rolled_back)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+# ==================== LOADING ====================
+
+def _fetch(sensor_ids, since, after_id=0, rescan_from=None):
+    """
+    Readings of `sensor_ids` at or after `since`, oldest first - with after_id,
+    only those with a higher id or at/after `rescan_from`.
+    """
+    readings = partitions.readings(sensor_ids, since)
+    query = db.session.query(readings.sensor_id, readings.id, readings.timestamp, readings.value)\
+        .filter(readings.sensor_id.in_(sensor_ids), readings.timestamp >= since, readings.value.isnot(None))
+    if after_id:
+        query = query.filter(or_(readings.id > after_id, readings.timestamp >= rescan_from))
+    return db_engine.stream(query.order_by(readings.timestamp, readings.id))
+
+
+def _bucket_key(column, width):
+    """SQL for int(epoch seconds of a naive UTC timestamp column // width)."""
+    # Whole seconds, so a bucket never comes out later than RollingWindow.add puts the same reading.
+    # The width is inlined: a bound parameter in both SELECT and GROUP BY is two expressions to Postgres.
+    width = literal_column(repr(float(width)), Float)
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return cast(cast(func.strftime('%s', column), Integer) / width, Integer)
+    if dialect == 'mysql':
+        return func.floor(func.timestampdiff(text('SECOND'), literal_column("'1970-01-01'"), column) / width)
+    return func.floor(cast(func.floor(extract('epoch', column)), Float) / width)
+
+
+def _fetch_buckets(sensor_ids, since, until, width):
+    """(sensor_id, bucket key, count, sum, min, max, highest id) of the readings in [since, until), per bucket."""
+    readings = partitions.readings(sensor_ids, since, until)
+    bucket = _bucket_key(readings.timestamp, width).label('bucket')
+    return db.session.query(readings.sensor_id, bucket, func.count(readings.value), func.sum(readings.value),
+                            func.min(readings.value), func.max(readings.value), func.max(readings.id))\
+        .filter(readings.sensor_id.in_(sensor_ids), readings.timestamp >= since, readings.timestamp < until,
+                readings.value.isnot(None))\
+        .group_by(readings.sensor_id, bucket).order_by(readings.sensor_id, bucket).all()
+
+
+def _latest(sensor_id, since, until):
+    """(timestamp, value) of a sensor's newest reading in [since, until), or None."""
+    readings = partitions.readings(sensor_id, since, until)
+    return db.session.query(readings.timestamp, readings.value)\
+        .filter(readings.sensor_id == sensor_id, readings.timestamp >= since, readings.timestamp < until,
+                readings.value.isnot(None))\
+        .order_by(readings.timestamp.desc(), readings.id.desc()).first()
+
+
+def _grouped(rows):
+    by_sensor = {}
+    for sensor_id, reading_id, timestamp, value in rows:
+        by_sensor.setdefault(sensor_id, []).append((reading_id, _epoch(timestamp), value))
+    return by_sensor
+
+
+def _overlap_start():
+    return datetime.utcnow() - timedelta(seconds=current_app.config.get('STATISTICS_SYNC_OVERLAP', 120))
+
+
+def _load(sensor_ids, since):
+    buckets = current_app.config.get('STATISTICS_BUCKETS', 360)
+    now = datetime.utcnow()
+    cutoff = _overlap_start()
+    floor = _epoch(cutoff)
+    loaded = {sensor_id: _SensorStats(buckets, floor) for sensor_id in sensor_ids}
+
+    # Everything before the overlap as per-bucket aggregates, the overlap as rows
+    aggregated = set()
+    for name, length in WINDOWS.items():
+        width = length.total_seconds() / buckets
+        for sensor_id, key, count, total, low, high, top_id in _fetch_buckets(sensor_ids, now - length, cutoff, width):
+            stats = loaded[sensor_id]
+            stats.windows[name].add_bucket(int(key), count, total, low, high)
+            stats.last_id = max(stats.last_id, top_id)
+            aggregated.add(sensor_id)
+    recent = _grouped(_fetch(sensor_ids, cutoff))
+    for sensor_id in aggregated - set(recent):
+        latest = _latest(sensor_id, since, cutoff)
+        if latest is not None:
+            loaded[sensor_id].newest, loaded[sensor_id].current = _epoch(latest[0]), latest[1]
+    for sensor_id, rows in recent.items():
+        loaded[sensor_id].apply_fetched(rows, floor)
+
+    with _lock:
+        for sensor_id, stats in loaded.items():
+            # Keep a state another request loaded (and kept up to date) meanwhile
+            _sensors.setdefault(sensor_id, stats)
+    logger.debug(f"✓ Loaded rolling stats for {len(sensor_ids)} sensor(s)")
+
+
+def _catch_up(sensor_ids, since):
+    with _lock:
+        watermark = min(_sensors[s].last_id for s in sensor_ids if s in _sensors)
+    rescan_from = _overlap_start()
+    by_sensor = _grouped(_fetch(sensor_ids, since, watermark, rescan_from))
+    floor = _epoch(rescan_from)
+    now = time.monotonic()
+    with _lock:
+        for sensor_id in sensor_ids:
+            stats = _sensors.get(sensor_id)
+            if stats is None:
+                continue
+            if stats.apply_fetched(by_sensor.get(sensor_id, ()), floor):
+                stats.synced_at = now
+            else:
+                del _sensors[sensor_id]
+
+
+def _sync(sensor_ids):
+    since = datetime.utcnow() - max(WINDOWS.values())
+    interval = current_app.config.get('STATISTICS_SYNC_INTERVAL', 5)
+    reconcile = current_app.config.get('STATISTICS_RECONCILE_INTERVAL', 600)
+    now = time.monotonic()
+    with _lock:
+        for sensor_id in sensor_ids:
+            if sensor_id in _sensors and now - _sensors[sensor_id].loaded_at >= reconcile:
+                del _sensors[sensor_id]
+        stale = [s for s in sensor_ids if s in _sensors and now - _sensors[s].synced_at >= interval]
+    if stale:
+        _catch_up(stale, since)
+    with _lock:
+        missing = [s for s in sensor_ids if s not in _sensors]
+    if missing:
+        _load(missing, since)
+
+
+# ==================== LOOKUP ====================
+
+def summaries(sensor_ids):
+    """
+    {sensor_id: {'current', 'timestamp', 'windows': {name: {'count', 'average', 'min', 'max'} or None}}}
+    for the given sensors; sensors without readings in the longest window get current None.
+    """
+    sensor_ids = list(sensor_ids)
+    if not sensor_ids:
+        return {}
+    _sync(sensor_ids)
+
+    now = _epoch(datetime.utcnow())
+    result = {}
+    with _lock:
+        for sensor_id in sensor_ids:
+            stats = _sensors.get(sensor_id)
+            if stats is None:
+                # Dropped by a backfill between sync and now - it loads on the next call
+                continue
+            result[sensor_id] = {
+                'current': stats.current,
+                'timestamp': datetime.utcfromtimestamp(stats.newest).isoformat() if stats.newest is not None else None,
+                'windows': {name: window.summary(now) for name, window in stats.windows.items()}
+            }
+    return result
+
+
+def forget(sensor_id=None):
+    """Drop a sensor's state (all when None), e.g. after its readings were deleted."""
+    with _lock:
+        if sensor_id is None:
+            _sensors.clear()
+        else:
+            _sensors.pop(sensor_id, None)
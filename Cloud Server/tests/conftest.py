@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Test setup: a throwaway SQLite database and ingest queue, and simulated Viam
+robots (fake_viam.py) that fail some of the time. The environment has to be
+in place before config.py is imported.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+WORKDIR = tempfile.mkdtemp(prefix='mybuddy-tests-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(WORKDIR, 'test.db')
+os.environ['INGEST_QUEUE_PATH'] = os.path.join(WORKDIR, 'ingest_queue.db')
+os.environ['VIAM_FAKE'] = 'seed=7,failure_rate=0.2,latency_ms=2,jitter_ms=1,dial_latency_ms=5'
+os.environ.setdefault('FERNET_KEY', 'UHMj6HOl1t_HXYqbKZXcMv2kmnP5boYmC5yrkgjP--g=')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROBOT_COUNT = 12
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import create_app
+    return create_app('cli')
+
+
+@pytest.fixture
+def robots(app):
+    """An account with ROBOT_COUNT simulated robots on an empty database; yields their ids."""
+    from extensions import db
+    from models import Account, Robot, UserRobot
+    import ingest_queue
+
+    with app.app_context():
+        # Leftovers of an earlier test belong to robots that are about to go
+        ingest_queue.get_queue().drain()
+        db.drop_all()
+        db.create_all()
+
+        account = Account(username='tester', email='tester@example.com', password_hash='-')
+        db.session.add(account)
+        db.session.flush()
+        robot_ids = []
+        for i in range(ROBOT_COUNT):
+            robot = Robot(robot_name=f'robot-{i}', viam_robot_address=f'robot-{i}.test.viam.cloud')
+            db.session.add(robot)
+            db.session.flush()
+            db.session.add(UserRobot.create_encrypted(account.id, robot.id, f'key-{i}', f'key-id-{i}'))
+            robot_ids.append(robot.id)
+        db.session.commit()
+        yield robot_ids
+
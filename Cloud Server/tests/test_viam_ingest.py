@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Fetch-and-store against the simulated Viam fleet: readings go through the
+ingest queue into the database exactly once, also when robots fail, when
+a writer dies after committing a batch and when one queued fetch can't be
+stored.
+"""
+
+from datetime import datetime
+import json
+import time
+
+from extensions import db
+from models import SensorData
+import ingest_queue
+import jobs
+from viam_integration import fetch_and_store_robots
+
+
+def _wait_for_empty_queue(timeout=10):
+    """flush() stores what it can claim; the background writer may hold the rest for a moment."""
+    queue = ingest_queue.get_queue()
+    deadline = time.monotonic() + timeout
+    while queue.depth() and time.monotonic() < deadline:
+        queue.drain()
+        time.sleep(0.05)
+    return queue.depth()
+
+
+def test_fetch_and_flush_stores_every_queued_reading(app, robots):
+    with app.app_context():
+        results = fetch_and_store_robots()
+        ingest_queue.flush()
+        assert _wait_for_empty_queue() == 0
+
+        assert set(results) == set(robots)
+        for outcome in results.values():
+            if outcome['error']:
+                assert outcome['readings_queued'] == 0
+        queued = sum(outcome['readings_queued'] for outcome in results.values())
+        assert queued > 0
+        assert SensorData.query.count() == queued
+
+
+def test_entries_of_a_dead_writer_are_not_stored_twice(app, robots):
+    from viam_integration import store_queued_readings
+    import db_engine
+
+    with app.app_context():
+        queue = ingest_queue.get_queue()
+        connection = queue._connect()
+        for robot_id in robots[:3]:
+            # Straight into the file, so the background writer isn't woken
+            connection.execute(
+                'INSERT INTO pending_readings (robot_id, timestamp, readings, enqueued_at) VALUES (?, ?, ?, ?)',
+                (robot_id, '2026-01-01T12:00:00', json.dumps({'DHT22 Temperature': 21.5, 'VEML7700 Light': 300.0}),
+                 time.time()))
+
+        # A writer claims the batch and commits it, then dies before deleting it
+        token, rows = queue._claim()
+        entries = [(robot_id, json.loads(readings), datetime.fromisoformat(timestamp), attempts > 1)
+                   for _, robot_id, timestamp, readings, attempts, _ in rows]
+        assert db_engine.write(store_queued_readings, entries) == 6
+        connection.execute('UPDATE pending_readings SET claimed_until = 0 WHERE claimed_by = ?', (token,))
+
+        ingest_queue.flush()
+        assert _wait_for_empty_queue() == 0
+        assert SensorData.query.count() == 6
+
+
+def test_a_fetch_the_database_rejects_is_dead_lettered_without_blocking_the_rest(app, robots, monkeypatch):
+    with app.app_context():
+        queue = ingest_queue.get_queue()
+        monkeypatch.setattr(queue, 'max_attempts', 2)
+        connection = queue._connect()
+        for robot_id, value in ((robots[0], 21.5), (robots[1], {'not': 'a number'}), (robots[2], 22.0)):
+            connection.execute(
+                'INSERT INTO pending_readings (robot_id, timestamp, readings, enqueued_at) VALUES (?, ?, ?, ?)',
+                (robot_id, '2026-01-01T12:00:00', json.dumps({'DHT22 Temperature': value}), time.time()))
+
+        queue.drain()
+        assert SensorData.query.count() == 2
+        assert queue.depth() == 1
+
+        # Retried once its claim runs out, then given up on
+        connection.execute('UPDATE pending_readings SET claimed_until = 0')
+        queue.drain()
+        assert queue.depth() == 0
+        assert queue.dead_letters() == 1
+        assert SensorData.query.count() == 2
+        connection.execute('DELETE FROM dead_readings')
+
+
+def test_manual_fetch_job_finishes_with_queued_counts(app, robots):
+    from models import Account
+
+    with app.app_context():
+        account_id = Account.query.one().id
+        job = jobs.submit_viam_fetch(app, account_id, robots)
+        job_id = job.id
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            db.session.rollback()
+            job = jobs.get_job(job_id, account_id)
+            if job.status in ('finished', 'failed'):
+                break
+            time.sleep(0.1)
+
+        assert job.status == 'finished'
+        result = json.loads(job.result)
+        assert result['readings_queued'] == sum(r['readings_queued'] for r in result['robots'].values())
+        assert jobs.get_job(job_id, account_id + 1) is None
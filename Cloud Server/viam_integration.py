@@ -4,17 +4,26 @@ Viam Integration Module
 Handles fetching sensor data from Viam robot and storing in database.
 """
 
-from datetime import datetime
-from extensions import db, socketio
+from datetime import datetime, timedelta
+from flask import current_app
+from config import Config
+from extensions import db
 from models import SensorData, Sensor, Robot
+import account_cache
+import alerts
+import account_stats
+import ingest_queue
+import metrics
+import partitions
+import robot_status
+import asyncio
+import concurrent.futures
+import threading
+import time
 import logging
 import traceback
-import nest_asyncio
 from cryptography.fernet import InvalidToken
 
-# Apply nest_asyncio to allow nested event loops
-nest_asyncio.apply()
-
 logger = logging.getLogger(__name__)
 
 # Sensor mapping: Viam component name → sensor name & reading key
@@ -47,164 +56,410 @@ VIAM_SENSORS = [
 ]
 
 
-async def _fetch_viam_data_async(robot_id, api_key, api_key_id, robot_address):
-    """Async function to fetch data from Viam robot."""
+async def _dial_robot(robot_address, api_key, api_key_id):
+    """Connect to a real robot with the Viam SDK."""
     from viam.robot.client import RobotClient
-    from viam.components.sensor import Sensor as ViamSensor
-    
-    logger.info(f"[{datetime.now()}] Fetching sensor data from Viam...")
-    
-    # Connect to Viam robot
     opts = RobotClient.Options.with_api_key(
         api_key=api_key,
         api_key_id=api_key_id
     )
-    robot = await RobotClient.at_address(robot_address, opts)
-    
-    # List all available components for debugging
-    logger.info(f"Available components in robot:")
-    for resource in robot.resource_names:
-        logger.info(f"  - {resource}")
-    
-    timestamp = datetime.utcnow()
-    readings_saved = 0
-    
+    return await RobotClient.at_address(robot_address, opts)
+
+
+def _sensor_from_robot(robot_client, viam_name):
+    """Look up a sensor component with the Viam SDK."""
+    from viam.components.sensor import Sensor as ViamSensor
+    return ViamSensor.from_robot(robot_client, viam_name)
+
+
+# Robot address -> (part id, part name) in the Viam app, found once per address
+_robot_parts = {}
+
+
+async def _find_robot_part(app_client, robot_address):
+    """The Viam app's robot part for an address like '<robot>-main.<location id>.viam.cloud'."""
+    if robot_address in _robot_parts:
+        return _robot_parts[robot_address]
+    location_id = robot_address.split('.')[1] if robot_address.count('.') >= 2 else None
+    for robot in await app_client.list_robots(location_id=location_id):
+        for part in await app_client.get_robot_parts(robot.id):
+            if part.fqdn == robot_address:
+                _robot_parts[robot_address] = (part.id, part.name)
+                return _robot_parts[robot_address]
+    raise LookupError(f"No robot part found in Viam for {robot_address}")
+
+
+async def _viam_app_client(api_key, api_key_id):
+    from viam.app.viam_client import ViamClient
+    from viam.rpc.dial import DialOptions
+    return await ViamClient.create_from_dial_options(DialOptions.with_api_key(api_key, api_key_id))
+
+
+async def _load_robot_config(robot_address, api_key, api_key_id):
+    """Fetch a robot's configuration (dict) from the Viam app."""
+    client = await _viam_app_client(api_key, api_key_id)
     try:
-        # Fetch data from each sensor
-        for sensor_config in VIAM_SENSORS:
-            try:
-                # Get or create sensor in database
-                sensor = Sensor.query.filter_by(
-                    robot_id=robot_id,
-                    name=sensor_config['sensor_name']
-                ).first()
-                
-                if not sensor:
-                    # Create sensor if it doesn't exist
-                    sensor = Sensor(
-                        robot_id=robot_id,
-                        name=sensor_config['sensor_name'],
-                        sensor_type='viam'
-                    )
-                    db.session.add(sensor)
-                    db.session.flush()
-                
-                try:
-                    # Get the sensor component from Viam
-                    logger.info(f"  Attempting to get sensor component: {sensor_config['viam_name']}")
-                    viam_sensor = ViamSensor.from_robot(robot, sensor_config['viam_name'])
-                    logger.info(f"  Got sensor object: {type(viam_sensor)}")
-                    
-                    sensor_readings = await viam_sensor.get_readings()
-                    logger.info(f"  DEBUG {sensor_config['sensor_name']}: Raw readings = {sensor_readings}")
-                    
-                    # Extract the specific reading
-                    reading_key = sensor_config['reading_key']
-                    if reading_key in sensor_readings:
-                        value = sensor_readings[reading_key]
-                        
-                        # Convert boolean to float for storage
-                        if isinstance(value, bool):
-                            value = 1.0 if value else 0.0
-                        else:
-                            value = float(value)
-                        
-                        # Store in database
-                        data_point = SensorData(
-                            sensor_id=sensor.id,
-                            timestamp=timestamp,
-                            value=value,
-                            unit=sensor_config['unit']
-                        )
-                        db.session.add(data_point)
-                        readings_saved += 1
-                        
-                        logger.info(f"  ✓ {sensor_config['sensor_name']}: {value} {sensor_config['unit']}")
-                    else:
-                        logger.warning(f"  ⚠ {sensor_config['sensor_name']}: Key '{reading_key}' not found in {list(sensor_readings.keys())}")
-                        
-                except Exception as sensor_error:
-                    # Check if it's a component not found error
-                    if "not found" in str(sensor_error).lower() or "component" in str(sensor_error).lower():
-                        logger.error(f"  ✗ {sensor_config['sensor_name']}: Component '{sensor_config['viam_name']}' not found in robot")
-                        logger.error(f"    This usually means the module isn't loaded or component isn't configured")
-                    else:
-                        logger.error(f"  ✗ {sensor_config['sensor_name']}: Sensor error - {sensor_error}")
-                    raise sensor_error
-                    
-            except Exception as e:
-                logger.error(f"  ✗ {sensor_config['sensor_name']}: {type(e).__name__}: {e}")
-                # Don't log full traceback for expected component errors
-                if "not found" not in str(e).lower():
-                    import traceback
-                    logger.error(f"  ✗ {sensor_config['sensor_name']} Full traceback: {traceback.format_exc()}")
-        
-        # Commit all readings
-        db.session.commit()
-        logger.info(f"✓ Stored {readings_saved}/{len(VIAM_SENSORS)} sensor readings")
-        
+        part_id, _ = await _find_robot_part(client.app_client, robot_address)
+        part = await client.app_client.get_robot_part(part_id)
+        return dict(part.robot_config or {})
     finally:
-        await robot.close()
-    
-    return readings_saved
+        client.close()
 
 
-async def _fetch_viam_data_async_live(robot_id, api_key, api_key_id, robot_address):
-    """Async function to fetch LIVE data from Viam robot (without saving to database)."""
-    from viam.robot.client import RobotClient
-    from viam.components.sensor import Sensor as ViamSensor
-    
-    logger.debug(f"[LIVE] Fetching sensor data from Viam...")
-    
-    # Connect to Viam robot
-    opts = RobotClient.Options.with_api_key(
-        api_key=api_key,
-        api_key_id=api_key_id
-    )
-    robot = await RobotClient.at_address(robot_address, opts)
-    
-    timestamp = datetime.utcnow()
-    live_readings = {}
-    
+async def _save_robot_config(robot_address, api_key, api_key_id, config):
+    """Replace a robot's configuration in the Viam app (the robot picks it up and reconfigures)."""
+    client = await _viam_app_client(api_key, api_key_id)
     try:
-        # Fetch data from each sensor
-        for sensor_config in VIAM_SENSORS:
+        part_id, part_name = await _find_robot_part(client.app_client, robot_address)
+        await client.app_client.update_robot_part(part_id, part_name, config)
+    finally:
+        client.close()
+
+
+class ViamConnectionPool:
+    """
+    Keeps one RobotClient per robot open on a dedicated event loop thread, so
+    polls reuse the connection instead of dialing the robot every time.
+
+    dial, sensor_from_robot, load_config and save_config default to the Viam
+    SDK; fake_viam.py provides stand-ins with the same shape for benchmarks.
+    """
+
+    def __init__(self, dial=None, sensor_from_robot=None, load_config=None, save_config=None):
+        self.dial = dial or _dial_robot
+        self.sensor_from_robot = sensor_from_robot or _sensor_from_robot
+        self.load_config = load_config or _load_robot_config
+        self.save_config = save_config or _save_robot_config
+        self._loop = None
+        self._owns_loop = True
+        self._clients = {}
+        self._dial_locks = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._owns_loop = True
+                threading.Thread(target=self._loop.run_forever, name='viam-pool', daemon=True).start()
+        return self._loop
+
+    def use_loop(self, loop):
+        """Run on an existing event loop (the ASGI server's, see asgi.py) instead of a thread of its own."""
+        with self._lock:
+            if self._loop is not None and self._loop is not loop:
+                raise RuntimeError("Viam pool is already running on another loop")
+            self._loop = loop
+            self._owns_loop = False
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool's loop from any thread and wait for its result."""
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("ViamConnectionPool.run() would block its own loop - await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def get_client(self, robot_address, api_key, api_key_id, robot_id=None):
+        """Return the open client for a robot, dialing it on first use (robot_id labels the dial metric)."""
+        key = (robot_address, api_key_id)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        lock = self._dial_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(key)
+            if client is None:
+                started = time.perf_counter()
+                try:
+                    client = await self.dial(robot_address, api_key, api_key_id)
+                except BaseException:
+                    metrics.VIAM_DIAL_DURATION.observe(time.perf_counter() - started, robot=robot_id, outcome='error')
+                    raise
+                metrics.VIAM_DIAL_DURATION.observe(time.perf_counter() - started, robot=robot_id, outcome='ok')
+                self._clients[key] = client
+                logger.info(f"Connected to Viam robot {robot_address}")
+        return client
+
+    async def discard(self, robot_address, api_key_id):
+        """Close and forget a robot's client so the next poll dials again."""
+        client = self._clients.pop((robot_address, api_key_id), None)
+        if client is not None:
             try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Error closing client for {robot_address}: {e}")
+
+    async def aclose(self):
+        """Close every open client from the pool's own loop and detach from it."""
+        for robot_address, api_key_id in list(self._clients):
+            await self.discard(robot_address, api_key_id)
+        if not self._owns_loop:
+            self._loop = None
+
+    def close(self):
+        """Close every open client and stop the loop thread."""
+        if self._loop is None:
+            return
+
+        try:
+            self.run(self.aclose(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Failed to close Viam connections cleanly: {e}")
+        if self._loop is not None and self._owns_loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+# How stale Robot.last_connected may get while a robot stays online
+ROBOT_ROW_REFRESH = timedelta(minutes=10)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Process-wide Viam connection pool.
+    With VIAM_FAKE set, robots are simulated by fake_viam.FakeViamFleet.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if Config.VIAM_FAKE:
+                from fake_viam import FakeViamFleet
+                fleet = FakeViamFleet.from_spec(Config.VIAM_FAKE)
+                logger.warning(f"Using simulated Viam robots ({Config.VIAM_FAKE})")
+                _pool = ViamConnectionPool(dial=fleet.dial, sensor_from_robot=fleet.sensor_from_robot,
+                                           load_config=fleet.load_config, save_config=fleet.save_config)
+            else:
+                _pool = ViamConnectionPool()
+        return _pool
+
+
+def set_pool(pool):
+    """Replace the process-wide pool (benchmarks install one backed by fake robots)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool is not pool:
+            _pool.close()
+        _pool = pool
+
+
+async def _read_sensors_async(robot_client, robot_id, log_prefix=''):
+    """
+    Read every VIAM_SENSORS value from a connected robot.
+    Returns {sensor_name: value}; sensors that fail are logged and left out.
+    Components shared by several sensors (DHT22) are only read once.
+    """
+    pool = get_pool()
+    component_readings = {}
+    values = {}
+
+    for sensor_config in VIAM_SENSORS:
+        viam_name = sensor_config['viam_name']
+        try:
+            if viam_name not in component_readings:
+                started = time.perf_counter()
                 try:
-                    viam_sensor = ViamSensor.from_robot(robot, sensor_config['viam_name'])
-                    sensor_readings = await viam_sensor.get_readings()
-                    
-                    reading_key = sensor_config['reading_key']
-                    if reading_key in sensor_readings:
-                        value = sensor_readings[reading_key]
-                        
-                        # Convert boolean to float for display
-                        if isinstance(value, bool):
-                            value = 1.0 if value else 0.0
-                        else:
-                            value = float(value)
-                        
-                        # Store in live_readings dict (NOT in database)
-                        live_readings[sensor_config['sensor_name']] = {
-                            'value': value,
-                            'unit': sensor_config['unit'],
-                            'timestamp': timestamp.isoformat()
-                        }
-                        
-                        logger.debug(f"  [LIVE] {sensor_config['sensor_name']}: {value} {sensor_config['unit']}")
-                    else:
-                        logger.debug(f"  [LIVE] {sensor_config['sensor_name']}: Key '{reading_key}' not found")
-                        
+                    viam_sensor = pool.sensor_from_robot(robot_client, viam_name)
+                    component_readings[viam_name] = await viam_sensor.get_readings()
                 except Exception as sensor_error:
-                    logger.debug(f"  [LIVE] {sensor_config['sensor_name']}: {type(sensor_error).__name__}")
-                    
-            except Exception as e:
-                logger.debug(f"  [LIVE] {sensor_config['sensor_name']}: {e}")
-        
-    finally:
-        await robot.close()
-    
-    return live_readings
+                    component_readings[viam_name] = sensor_error
+                    metrics.VIAM_READINGS_DURATION.observe(
+                        time.perf_counter() - started, robot=robot_id, component=viam_name, outcome='error')
+                    raise
+                metrics.VIAM_READINGS_DURATION.observe(
+                    time.perf_counter() - started, robot=robot_id, component=viam_name, outcome='ok')
+
+            sensor_readings = component_readings[viam_name]
+            if isinstance(sensor_readings, Exception):
+                raise sensor_readings
+
+            reading_key = sensor_config['reading_key']
+            if reading_key not in sensor_readings:
+                logger.debug(f"  {log_prefix}{sensor_config['sensor_name']}: Key '{reading_key}' not found in {list(sensor_readings.keys())}")
+                continue
+
+            value = sensor_readings[reading_key]
+            # Convert boolean to float for storage/display
+            if isinstance(value, bool):
+                value = 1.0 if value else 0.0
+            else:
+                value = float(value)
+            values[sensor_config['sensor_name']] = value
+
+        except Exception as e:
+            if "not found" in str(e).lower():
+                logger.debug(f"  {log_prefix}{sensor_config['sensor_name']}: Component '{viam_name}' not found in robot")
+            else:
+                logger.debug(f"  {log_prefix}{sensor_config['sensor_name']}: {type(e).__name__}: {e}")
+
+    return values
+
+
+async def _poll_robot_async(robot_id, robot_address, api_key, api_key_id, log_prefix=''):
+    """
+    Read all sensors of one robot through the pool and record its status.
+    Redials next time if nothing came back.
+    """
+    pool = get_pool()
+    started = time.perf_counter()
+    try:
+        client = await pool.get_client(robot_address, api_key, api_key_id, robot_id)
+        values = await _read_sensors_async(client, robot_id, log_prefix)
+    except BaseException:
+        robot_status.mark_offline(robot_id)
+        raise
+
+    if not values:
+        # Nothing answered - most likely a dead connection, dial fresh next poll
+        robot_status.mark_offline(robot_id)
+        await pool.discard(robot_address, api_key_id)
+    else:
+        robot_status.mark_online(
+            robot_id,
+            components=len(client.resource_names),
+            rtt_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+    return values
+
+
+def _poll_robots(robots, log_prefix=''):
+    """
+    Poll several robots concurrently on the pool's loop, each with its own timeout.
+    Credentials are decrypted here, in the calling thread.
+    Returns {robot_id: values dict or Exception}.
+    """
+    targets = []
+    results = {}
+
+    for robot in robots:
+        # Get a user's credentials for this robot
+        user_robot = robot.user_robots[0] if robot.user_robots else None
+        if not user_robot:
+            logger.debug(f"{log_prefix}Robot {robot.robot_name} has no users connected")
+            continue
+        try:
+            targets.append((robot.id, robot.viam_robot_address,
+                            user_robot.get_viam_api_key(), user_robot.get_viam_api_key_id()))
+        except InvalidToken as e:
+            results[robot.id] = e
+
+    if not targets:
+        return results
+
+    timeout = current_app.config.get('VIAM_POLL_TIMEOUT', 15)
+
+    async def _poll_all():
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(_poll_robot_async(robot_id, address, key, key_id, log_prefix), timeout)
+              for robot_id, address, key, key_id in targets),
+            return_exceptions=True
+        )
+        return dict(zip((robot_id for robot_id, *_ in targets), outcomes))
+
+    results.update(get_pool().run(_poll_all()))
+    return results
+
+
+def _sync_robot_rows(robots):
+    """
+    Copy cached online/offline status onto Robot rows when it changed, so the
+    database stays a reasonable fallback without a write on every poll.
+    """
+    changed = False
+    for robot in robots:
+        cached = robot_status.get(robot.id)
+        if cached is None:
+            continue
+        if cached['status'] != robot.status:
+            robot.status = cached['status']
+            changed = True
+        if cached['status'] == 'online' and (
+                robot.last_connected is None
+                or datetime.utcnow() - robot.last_connected > ROBOT_ROW_REFRESH):
+            robot.last_connected = datetime.utcnow()
+            changed = True
+    if changed:
+        db.session.commit()
+
+
+def _store_readings(robot_id, values, timestamp, sensors=None, skip_existing=False):
+    """
+    Save one robot's sensor values (creating missing Sensor rows) and count them in account stats. Returns rows added.
+    sensors caches Sensor rows by (robot_id, name) across calls in one transaction; skip_existing
+    leaves out readings that are already stored.
+    """
+    readings_saved = 0
+    new_sensors = False
+    if sensors is None:
+        sensors = {}
+    for sensor_config in VIAM_SENSORS:
+        if sensor_config['sensor_name'] not in values:
+            continue
+
+        # Get or create sensor in database
+        key = (robot_id, sensor_config['sensor_name'])
+        sensor = sensors.get(key) or Sensor.query.filter_by(
+            robot_id=robot_id,
+            name=sensor_config['sensor_name']
+        ).first()
+
+        if not sensor:
+            # Create sensor if it doesn't exist
+            sensor = Sensor(
+                robot_id=robot_id,
+                name=sensor_config['sensor_name'],
+                sensor_type='viam'
+            )
+            db.session.add(sensor)
+            db.session.flush()
+            new_sensors = True
+        sensors[key] = sensor
+
+        if skip_existing:
+            # Archived periods too: a retried fetch may be older than the last archive
+            stored = partitions.readings(sensor.id, timestamp, timestamp + timedelta(microseconds=1))
+            if db.session.query(stored.id).filter(stored.sensor_id == sensor.id, stored.timestamp == timestamp).first():
+                continue
+
+        value = values[sensor_config['sensor_name']]
+        db.session.add(SensorData(
+            sensor_id=sensor.id,
+            timestamp=timestamp,
+            value=value,
+            unit=sensor_config['unit']
+        ))
+        readings_saved += 1
+        logger.info(f"  ✓ {sensor_config['sensor_name']}: {value} {sensor_config['unit']}")
+
+    if new_sensors:
+        account_stats.refresh_robot(robot_id)
+        account_cache.invalidate_robot(robot_id)
+    account_stats.record_ingest(robot_id, readings_saved)
+    return readings_saved
+
+
+def store_queued_readings(entries):
+    """
+    Save fetches from the ingest queue, [(robot_id, values, timestamp, retried)],
+    in the current transaction. Retried entries skip readings already stored.
+    Returns rows added.
+    """
+    sensors = {}
+    return sum(_store_readings(robot_id, values, timestamp, sensors, skip_existing=retried)
+               for robot_id, values, timestamp, retried in entries)
 
 
 def fetch_live_sensor_data():
@@ -214,49 +469,39 @@ def fetch_live_sensor_data():
     Called by scheduler every 5 seconds.
     """
     try:
-        import asyncio
-        
         # Get all robots that have been connected by users
         robots = Robot.query.all()
-        
+
         if not robots:
             logger.debug("[LIVE] No robots connected yet.")
             return {}
-        
+
+        robot_names = {robot.id: robot.robot_name for robot in robots}
+        units = {s['sensor_name']: s['unit'] for s in VIAM_SENSORS}
+        now = datetime.utcnow()
+        timestamp = now.isoformat()
         all_live_readings = {}
-        
-        # Fetch data for each robot
-        for robot in robots:
-            try:
-                # Get a user's credentials for this robot
-                user_robot = robot.user_robots[0] if robot.user_robots else None
-                
-                if not user_robot:
-                    logger.debug(f"[LIVE] Robot {robot.robot_name} has no users connected")
-                    continue
-                
-                # Run the async function
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    readings = loop.run_until_complete(_fetch_viam_data_async_live(
-                        robot_id=robot.id,
-                        api_key=user_robot.get_viam_api_key(),
-                        api_key_id=user_robot.get_viam_api_key_id(),
-                        robot_address=robot.viam_robot_address
-                    ))
-                    all_live_readings.update(readings)
-                finally:
-                    loop.close()
-            
-            except InvalidToken:
-                logger.debug(f"[LIVE] Failed to decrypt credentials for robot: {robot.robot_name}")
-                
-            except Exception as e:
-                logger.debug(f"[LIVE] Failed to fetch data for {robot.robot_name}: {e}")
-        
+
+        for robot_id, result in _poll_robots(robots, log_prefix='[LIVE] ').items():
+            if isinstance(result, InvalidToken):
+                logger.debug(f"[LIVE] Failed to decrypt credentials for robot: {robot_names[robot_id]}")
+                continue
+            if isinstance(result, Exception):
+                logger.debug(f"[LIVE] Failed to fetch data for {robot_names[robot_id]}: {result!r}")
+                continue
+
+            for sensor_name, value in result.items():
+                all_live_readings[sensor_name] = {
+                    'value': value,
+                    'unit': units[sensor_name],
+                    'timestamp': timestamp,
+                    'robot_id': robot_id
+                }
+            alerts.evaluate(robot_id, result, now)
+
+        _sync_robot_rows(robots)
         return all_live_readings
-        
+
     except ImportError:
         logger.error("[LIVE] viam-sdk not installed. Install with: pip install viam-sdk")
         return {}
@@ -265,6 +510,62 @@ def fetch_live_sensor_data():
         return {}
 
 
+def fetch_and_store_robots(robot_ids=None):
+    """
+    Fetch sensor data from Viam and SAVE it for the given robots (all robots when None).
+    Readings go to the durable ingest queue (ingest_queue.py), which writes them to
+    the database in the background.
+    Returns {robot_id: {'robot_name': str, 'readings_queued': int, 'error': str or None}}.
+    """
+    query = Robot.query
+    if robot_ids is not None:
+        query = query.filter(Robot.id.in_(robot_ids))
+    robots = query.all()
+
+    if not robots:
+        logger.info("No robots connected yet.")
+        return {}
+
+    robot_names = {robot.id: robot.robot_name for robot in robots}
+    logger.info(f"[{datetime.now()}] Fetching sensor data from Viam for {len(robots)} robot(s)...")
+    results = _poll_robots(robots)
+    timestamp = datetime.utcnow()
+    outcome = {}
+
+    # Queue each robot's readings; the queue's writer stores them in large batches
+    for robot_id, robot_name in robot_names.items():
+        result = results.get(robot_id)
+        outcome[robot_id] = {'robot_name': robot_name, 'readings_queued': 0, 'error': None}
+
+        if result is None:
+            outcome[robot_id]['error'] = 'Robot has no users connected'
+            logger.warning(f"Robot {robot_name} has no users connected")
+            continue
+        if isinstance(result, InvalidToken):
+            outcome[robot_id]['error'] = 'Failed to decrypt credentials'
+            logger.error(f"Failed to decrypt credentials for robot: {robot_name}")
+            logger.error("Encryption key mismatch. Please re-enter robot credentials in the web interface.")
+            continue
+        if isinstance(result, Exception):
+            outcome[robot_id]['error'] = f'{type(result).__name__}: {result}'
+            logger.error(f"Failed to fetch data for {robot_name}: {result!r}")
+            continue
+
+        try:
+            ingest_queue.append(robot_id, result, timestamp)
+            outcome[robot_id]['readings_queued'] = len(result)
+            logger.info(f"✓ Queued {len(result)}/{len(VIAM_SENSORS)} sensor readings for {robot_name}")
+        except Exception as e:
+            outcome[robot_id]['error'] = 'Failed to queue readings'
+            logger.error(f"Failed to queue data for {robot_name}: {e}")
+            logger.error(traceback.format_exc())
+
+    # update_sensor_data is emitted by the ingest queue once the readings are stored
+    _sync_robot_rows(robots)
+
+    return outcome
+
+
 def fetch_and_store_sensor_data():
     """
     Fetch sensor data from Viam for all connected user robots.
@@ -272,58 +573,9 @@ def fetch_and_store_sensor_data():
     Data is SAVED to database for graphs.
     """
     try:
-        import asyncio
-        
-        # Get all robots that have been connected by users
-        robots = Robot.query.all()
-        
-        if not robots:
-            logger.info("No robots connected yet.")
-            return False
-        
-        total_readings = 0
-        
-        # Fetch data for each robot
-        for robot in robots:
-            try:
-                # Get a user's credentials for this robot to test connection
-                user_robot = robot.user_robots[0] if robot.user_robots else None
-                
-                if not user_robot:
-                    logger.warning(f"Robot {robot.robot_name} has no users connected")
-                    continue
-                
-                logger.info(f"Fetching data for robot: {robot.robot_name}")
-                
-                # Run the async function
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    readings = loop.run_until_complete(_fetch_viam_data_async(
-                        robot_id=robot.id,
-                        api_key=user_robot.get_viam_api_key(),
-                        api_key_id=user_robot.get_viam_api_key_id(),
-                        robot_address=robot.viam_robot_address
-                    ))
-                    total_readings += readings
-                finally:
-                    loop.close()
-            
-            except InvalidToken:
-                logger.error(f"Failed to decrypt credentials for robot: {robot.robot_name}")
-                logger.error("Encryption key mismatch. Please re-enter robot credentials in the web interface.")
-                
-            except Exception as e:
-                logger.error(f"Failed to fetch data for {robot.robot_name}: {e}")
-                logger.error(traceback.format_exc())
-                db.session.rollback()
-        
-        if total_readings > 0:
-            logger.info("Emitting update_sensor_data event")
-            socketio.emit('update_sensor_data', {'message': 'New sensor data available'})
-        
-        return total_readings > 0
-        
+        results = fetch_and_store_robots()
+        return any(r['readings_queued'] for r in results.values())
+
     except ImportError:
         logger.error("viam-sdk not installed. Install with: pip install viam-sdk")
         return False
@@ -333,125 +585,94 @@ def fetch_and_store_sensor_data():
         return False
 
 
-async def _test_viam_connection_async(api_key, api_key_id, robot_address):
-    """Async test connection to Viam robot."""
-    from viam.robot.client import RobotClient
-    from viam.components.sensor import Sensor as ViamSensor
-    
-    print(f"Testing connection to {robot_address}...")
-    
-    opts = RobotClient.Options.with_api_key(
-        api_key=api_key,
-        api_key_id=api_key_id
-    )
-    robot = await RobotClient.at_address(robot_address, opts)
-    
+# Diagnostics results per robot: {robot_id: (expires_at, result)}
+_diagnostics_cache = {}
+_diagnostics_lock = threading.Lock()
+
+
+def _jsonable(value):
+    """Keep readings JSON-serializable (SDK values can be protobuf types)."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+async def _diagnose_robot_async(robot_id, robot_address, api_key, api_key_id):
+    """Connect through the pool and read every configured component, timing each step."""
+    pool = get_pool()
+    diagnostics = {
+        'address': robot_address,
+        'connected': False,
+        'connect_ms': None,
+        'resources': [],
+        'components': [],
+        'error': None
+    }
+
+    started = time.perf_counter()
     try:
-        print(f"✓ Connected successfully!")
-        print(f"\nAvailable components:")
-        
-        # List all components
-        resources = robot.resource_names
-        for resource in resources:
-            print(f"  - {resource}")
-        
-        # Test DHT22 sensor if available
-        print(f"\nTesting sensors:")
-        try:
-            dht = ViamSensor.from_robot(robot, "dht22_sensor")
-            readings = await dht.get_readings()
-            print(f"✓ DHT22: {readings}")
-        except Exception as e:
-            print(f"⚠ DHT22: {e}")
-        
-        # Test VEML7700 if available
-        try:
-            veml = ViamSensor.from_robot(robot, "VEML7700")
-            readings = await veml.get_readings()
-            print(f"✓ VEML7700: {readings}")
-        except Exception as e:
-            print(f"⚠ VEML7700: {e}")
-        
-        # Test MH-SR602 if available
+        client = await pool.get_client(robot_address, api_key, api_key_id, robot_id)
+    except Exception as e:
+        diagnostics['error'] = f'{type(e).__name__}: {e}'
+        return diagnostics
+    diagnostics['connected'] = True
+    diagnostics['connect_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    diagnostics['resources'] = [str(resource) for resource in client.resource_names]
+
+    for viam_name in dict.fromkeys(s['viam_name'] for s in VIAM_SENSORS):
+        component = {'name': viam_name, 'ok': False, 'elapsed_ms': None, 'readings': None, 'error': None}
+        started = time.perf_counter()
         try:
-            motion = ViamSensor.from_robot(robot, "MH-SR602")
-            readings = await motion.get_readings()
-            print(f"✓ MH-SR602: {readings}")
+            viam_sensor = pool.sensor_from_robot(client, viam_name)
+            readings = await viam_sensor.get_readings()
+            component['ok'] = True
+            component['readings'] = {key: _jsonable(value) for key, value in readings.items()}
         except Exception as e:
-            print(f"⚠ MH-SR602: {e}")
-        
-    finally:
-        await robot.close()
-    
-    return True
+            component['error'] = f'{type(e).__name__}: {e}'
+        component['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        diagnostics['components'].append(component)
 
+    if not any(component['ok'] for component in diagnostics['components']):
+        await pool.discard(robot_address, api_key_id)
 
-def test_viam_connection(api_key, api_key_id, robot_address):
-    """Test connection to Viam robot (call this manually to verify setup)"""
-    try:
-        import asyncio
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(_test_viam_connection_async(api_key, api_key_id, robot_address))
-            return True
-        finally:
-            loop.close()
-        
-    except Exception as e:
-        print(f"✗ Connection failed: {e}")
-        return False
+    return diagnostics
 
 
-async def _get_robot_info_async(api_key, api_key_id, robot_address):
-    """Async function to get robot/device information."""
-    from viam.robot.client import RobotClient
-    
-    opts = RobotClient.Options.with_api_key(
-        api_key=api_key,
-        api_key_id=api_key_id
-    )
-    robot = await RobotClient.at_address(robot_address, opts)
-    
+async def diagnose_robot_async(robot_id, api_key, api_key_id, robot_address, timeout, max_age):
+    """
+    Structured connection test for one robot; runs on the Viam pool's loop.
+    Results are cached per robot for max_age seconds (VIAM_DIAGNOSTICS_TTL).
+    Returns (diagnostics dict, cached flag).
+    """
+    now = time.monotonic()
+    with _diagnostics_lock:
+        cached = _diagnostics_cache.get(robot_id)
+        if cached and cached[0] > now:
+            return cached[1], True
+
     try:
-        # Get basic robot info
-        robot_info = {
-            'name': robot_address.split('.')[0],
+        diagnostics = await asyncio.wait_for(_diagnose_robot_async(robot_id, robot_address, api_key, api_key_id), timeout)
+    except asyncio.TimeoutError:
+        diagnostics = {
             'address': robot_address,
-            'status': 'Online',
-            'components': len(robot.resource_names),
-            'last_seen': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
+            'connected': False,
+            'connect_ms': None,
+            'resources': [],
+            'components': [],
+            'error': f'Timed out after {timeout}s'
         }
-        
-        return robot_info
-        
-    finally:
-        await robot.close()
+    diagnostics['checked_at'] = datetime.utcnow().isoformat()
 
+    with _diagnostics_lock:
+        _diagnostics_cache[robot_id] = (time.monotonic() + max_age, diagnostics)
+    return diagnostics, False
 
-def get_robot_info(api_key, api_key_id, robot_address):
-    """
-    Get information about the connected Viam robot/Raspberry Pi.
-    Returns dict with name, address, status, etc.
-    """
+
+async def refresh_robot_status_async(robot_id, api_key, api_key_id, robot_address, timeout):
+    """Poll one robot now (bounded by timeout) to refresh its cached status; runs on the Viam pool's loop."""
     try:
-        import asyncio
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(_get_robot_info_async(api_key, api_key_id, robot_address))
-        finally:
-            loop.close()
-        
+        await asyncio.wait_for(_poll_robot_async(robot_id, robot_address, api_key, api_key_id), timeout)
     except Exception as e:
-        logger.error(f"Failed to get robot info: {e}")
-        robot_name = robot_address.split('.')[0] if robot_address else 'Unknown'
-        return {
-            'name': robot_name,
-            'address': robot_address,
-            'status': 'Offline',
-            'components': 0,
-            'last_seen': 'Never'
-        }
+        logger.debug(f"Status refresh failed for {robot_address}: {e!r}")
+    return robot_status.get(robot_id)
+
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Viam Views Module
+Routes that talk to robots are written as generators that yield a Viam
+coroutine wherever they have to wait for a robot and get its result back:
+
+    @app.route('/api/viam/test')
+    @login_required
+    @viam_view
+    def test_viam():
+        ...                                   # database work
+        diagnostics, cached = yield viam_integration.diagnose_robot_async(...)
+        ...                                   # more database work
+        return jsonify(...)
+
+Under WSGI (main.py, wsgi.py) the view runs in its request thread as before
+and each coroutine runs on the Viam pool's loop while the thread waits. Under
+ASGI (asgi.py) the thread is handed back while the robot answers: the
+database parts run in a worker thread and the coroutines are awaited on the
+server's event loop, which the pool shares. Either way the database
+connection is released while waiting on the robot, so slow robots don't hold
+on to pool connections.
+"""
+
+from functools import wraps
+from werkzeug.exceptions import HTTPException
+from extensions import db
+import asyncio
+import contextvars
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Endpoints served natively on the event loop in ASGI mode
+ENDPOINTS = set()
+
+_async_mode = contextvars.ContextVar('viam_views_async', default=False)
+
+
+def _release_connection():
+    # Ends the read transaction (objects reload on next access)
+    db.session.rollback()
+
+
+class _Suspended:
+    """A viam_view paused on a Viam coroutine (`pending`)."""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.pending = None
+
+    def advance(self, method, value):
+        """Resume the view with method(value); returns self if it waits again, else the view's return value."""
+        try:
+            self.pending = method(value)
+        except StopIteration as done:
+            return done.value
+        _release_connection()
+        return self
+
+
+def viam_view(view):
+    """Mark a generator view as yielding Viam coroutines (see module docstring)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        steps = view(*args, **kwargs)
+        if not inspect.isgenerator(steps):
+            return steps
+        suspended = _Suspended(steps).advance(steps.send, None)
+        if _async_mode.get() or not isinstance(suspended, _Suspended):
+            return suspended
+        return _run_sync(suspended)
+
+    ENDPOINTS.add(view.__name__)
+    return wrapper
+
+
+def _run_sync(suspended):
+    from viam_integration import get_pool
+    pool = get_pool()
+    while isinstance(suspended, _Suspended):
+        try:
+            result = pool.run(suspended.pending)
+        except Exception as e:
+            suspended = suspended.advance(suspended.steps.throw, e)
+        else:
+            suspended = suspended.advance(suspended.steps.send, result)
+    return suspended
+
+
+# ==================== ASGI ====================
+
+def _handle_error(app, e):
+    # Error handlers (404s, ...) give a response; anything unhandled becomes a 500 in _finish
+    try:
+        return app.handle_user_exception(e)
+    except Exception as unhandled:
+        return unhandled
+
+
+def _begin(app, environ):
+    request_context = app.request_context(environ)
+    request_context.push()
+    _async_mode.set(True)
+    try:
+        rv = app.preprocess_request()
+        if rv is None:
+            rv = app.dispatch_request()
+    except Exception as e:
+        rv = _handle_error(app, e)
+    return request_context, rv
+
+
+def _resume(app, suspended, method, value):
+    try:
+        return suspended.advance(method, value)
+    except Exception as e:
+        return _handle_error(app, e)
+
+
+def _finish(app, request_context, rv):
+    error = rv if isinstance(rv, Exception) and not isinstance(rv, HTTPException) else None
+    try:
+        if error is None:
+            try:
+                return app.finalize_request(rv)
+            except Exception as e:
+                error = e
+        return app.handle_exception(error)
+    finally:
+        request_context.pop(error)
+
+
+async def dispatch(app, environ, run_sync):
+    """
+    Serve a viam_view request on the running event loop. run_sync(fn, *args)
+    must run fn in a worker thread; all calls for one request share a
+    contextvars context (the Flask request context lives there).
+    Returns the Flask Response.
+    """
+    context = contextvars.copy_context()
+
+    def call(fn, *args):
+        return run_sync(context.run, fn, *args)
+
+    request_context, rv = await call(_begin, app, environ)
+    try:
+        while isinstance(rv, _Suspended):
+            try:
+                result = await rv.pending
+            except Exception as e:
+                rv = await call(_resume, app, rv, rv.steps.throw, e)
+            else:
+                rv = await call(_resume, app, rv, rv.steps.send, result)
+    except asyncio.CancelledError:
+        # Client went away - still run the teardown (database session, ...)
+        await call(request_context.pop)
+        raise
+    return await call(_finish, app, request_context, rv)
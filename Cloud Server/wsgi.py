@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+WSGI entry point for production servers, e.g.
+    gunicorn --workers 1 --threads 100 --bind 127.0.0.1:8000 wsgi:app
+Starts Viam polling (see VIAM_POLLER) - run a single worker, or set
+VIAM_POLLER=external and run poller.py next to any number of workers.
+With Postgres, set WEB_WORKERS / WEB_THREADS to the same numbers so each
+worker's connection pool gets its share (see config.py).
+"""
+
+from main import create_app
+
+app = create_app('web')
@@ -1,7 +1,10 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from datetime import datetime, timedelta
+from sensor_store import SensorRingBuffer
 import random
 import json
+import os
+import workload
 
 app = Flask(__name__,
             static_url_path='/static',
@@ -10,6 +13,9 @@ app = Flask(__name__,
 
 app.config['SECRET_KEY'] = 'dev-key-for-local-testing-only'
 
+# Readings kept in memory (sensor_store.py) - raise it to simulate high sample rates
+app.config['SENSOR_BUFFER_SIZE'] = int(os.environ.get('SENSOR_BUFFER_SIZE', '1000'))
+
 # Dummy user data
 USERS = {
     'woudeelen@gmail.com': {
@@ -134,25 +140,14 @@ ROBOT_CONFIGS = {
     }
 }
 
-# Generate dummy sensor data
-def generate_sensor_data(hours=24):
-    data = []
-    now = datetime.now()
-    for i in range(hours * 12):  # Every 5 minutes
-        timestamp = now - timedelta(minutes=i*5)
-        temp = round(random.uniform(18, 28), 1)
-        hum = round(random.uniform(30, 70), 1)
-        data.append({
-            'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'temperature': temp,
-            'humidity': hum,
-            'light': round(random.uniform(100, 1000), 0),
-            'motion': random.choice([True, False]),
-            'feels_like': round(temp + (hum / 100) * 2, 1)
-        })
-    return list(reversed(data))
+# Simulated sensor history: SENSOR_HISTORY_HOURS of readings every
+# SENSOR_SAMPLE_SECONDS (workload.py), as much of it as the buffer holds
+app.config['SENSOR_SAMPLE_SECONDS'] = float(os.environ.get('SENSOR_SAMPLE_SECONDS', '300'))
+app.config['SENSOR_HISTORY_HOURS'] = float(os.environ.get('SENSOR_HISTORY_HOURS', '24'))
 
-SENSOR_DATA = generate_sensor_data()
+SENSOR_DATA = SensorRingBuffer(app.config['SENSOR_BUFFER_SIZE'])
+workload.fill_store(SENSOR_DATA, workload.WorkloadGenerator(
+    rate=1 / app.config['SENSOR_SAMPLE_SECONDS'], duration=app.config['SENSOR_HISTORY_HOURS'] * 3600))
 
 # Activity log
 ACTIVITY_LOG = [
@@ -173,7 +168,7 @@ def home():
     
     user = USERS.get(session['user'])
     robot_config = ROBOT_CONFIGS.get(session['user'], {})
-    latest_data = SENSOR_DATA[-1] if SENSOR_DATA else None
+    latest_data = SENSOR_DATA.latest()
     
     return render_template('home.html', 
                          user=user, 
@@ -289,6 +284,8 @@ def data():
     # Get enabled sensors
     sensors = []
     charts = []
+    window = SENSOR_DATA.window(100)
+    timestamps = window.tolist('timestamp')
     
     if robot_config and 'sensors' in robot_config:
         for sensor_name, sensor_config in robot_config['sensors'].items():
@@ -300,22 +297,19 @@ def data():
                 })
                 
                 # Prepare chart data
-                chart_data = []
-                for reading in SENSOR_DATA[-100:]:
-                    if sensor_name in reading:
-                        unit = ''
-                        if sensor_name == 'temperature':
-                            unit = '°C'
-                        elif sensor_name == 'humidity':
-                            unit = '%'
-                        elif sensor_name == 'light':
-                            unit = 'lux'
-                        
-                        chart_data.append({
-                            'timestamp': reading['timestamp'],
-                            'value': reading[sensor_name],
-                            'unit': unit
-                        })
+                unit = ''
+                if sensor_name == 'temperature':
+                    unit = '°C'
+                elif sensor_name == 'humidity':
+                    unit = '%'
+                elif sensor_name == 'light':
+                    unit = 'lux'
+                
+                chart_data = [{
+                    'timestamp': timestamp,
+                    'value': value,
+                    'unit': unit
+                } for timestamp, value in zip(timestamps, window.tolist(sensor_name))]
                 
                 charts.append({
                     'name': sensor_name.capitalize(),
@@ -328,21 +322,21 @@ def data():
                          current_user=user,
                          sensors=sensors,
                          charts=charts,
-                         sensor_data=SENSOR_DATA[-100:])
+                         sensor_data=window.records())
 
 
 @app.route('/api/sensor-data')
 def api_sensor_data():
     """API endpoint for chart data"""
     limit = request.args.get('limit', 100, type=int)
-    data = SENSOR_DATA[-limit:]
+    data = SENSOR_DATA.window(limit)
     
     return jsonify({
-        'timestamps': [d['timestamp'] for d in data],
-        'temperature': [d['temperature'] for d in data],
-        'humidity': [d['humidity'] for d in data],
-        'light': [d['light'] for d in data],
-        'motion': [d['motion'] for d in data]
+        'timestamps': data.tolist('timestamp'),
+        'temperature': data.tolist('temperature'),
+        'humidity': data.tolist('humidity'),
+        'light': data.tolist('light'),
+        'motion': data.tolist('motion')
     })
 
 @app.route('/configure', methods=['GET', 'POST'])
@@ -415,9 +409,9 @@ def api_live_sensor():
         'light': round(random.uniform(100, 1000), 0),
         'motion': random.choice([True, False])
     }
+    latest['feels_like'] = round(latest['temperature'] + (latest['humidity'] / 100) * 2, 1)
+    # O(1) - the ring buffer overwrites the oldest reading once it is full
     SENSOR_DATA.append(latest)
-    if len(SENSOR_DATA) > 1000:
-        SENSOR_DATA.pop(0)
     return jsonify(latest)
 
 @app.route('/api/robot-status')
@@ -443,38 +437,20 @@ def api_export_data():
     return jsonify({
         'user': session['user'],
         'export_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'data': SENSOR_DATA[-1000:]  # Last 1000 readings
+        'data': SENSOR_DATA.window(1000).records()  # Last 1000 readings
     })
 
 @app.route('/api/statistics')
 def api_statistics():
     """Get statistical summary of sensor data"""
-    recent_data = SENSOR_DATA[-100:]
-    
-    temps = [d['temperature'] for d in recent_data]
-    hums = [d['humidity'] for d in recent_data]
-    lights = [d['light'] for d in recent_data]
+    recent_data = SENSOR_DATA.window(100)
     
+    # Computed straight over the buffer's memory, no per-field lists
     return jsonify({
-        'temperature': {
-            'current': temps[-1] if temps else 0,
-            'average': round(sum(temps) / len(temps), 1) if temps else 0,
-            'min': min(temps) if temps else 0,
-            'max': max(temps) if temps else 0
-        },
-        'humidity': {
-            'current': hums[-1] if hums else 0,
-            'average': round(sum(hums) / len(hums), 1) if hums else 0,
-            'min': min(hums) if hums else 0,
-            'max': max(hums) if hums else 0
-        },
-        'light': {
-            'current': lights[-1] if lights else 0,
-            'average': round(sum(lights) / len(lights), 1) if lights else 0,
-            'min': min(lights) if lights else 0,
-            'max': max(lights) if lights else 0
-        },
-        'motion_events': sum(1 for d in recent_data if d.get('motion', False))
+        'temperature': recent_data.summary('temperature'),
+        'humidity': recent_data.summary('humidity'),
+        'light': recent_data.summary('light'),
+        'motion_events': sum(recent_data.values('motion'))
     })
 
 
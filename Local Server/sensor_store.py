@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Sensor Store Module
+Fixed-size columnar ring buffer for the dev server's sensor readings.
+
+Every field has its own preallocated array (epoch seconds for timestamps,
+floats for values, bytes for motion) and a head index marks the next slot,
+so appending a reading is O(1) and never moves the others - the oldest one
+is simply overwritten once the buffer is full. window(n) returns the newest
+n readings as memoryviews over the arrays (two segments when the window
+wraps around the end), without copying; values are only copied when they
+are turned into lists or dicts for a response.
+"""
+
+from array import array
+from datetime import datetime
+import threading
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Field name -> array typecode
+FIELDS = {
+    'timestamp': 'd',
+    'temperature': 'd',
+    'humidity': 'd',
+    'light': 'd',
+    'motion': 'B',
+    'feels_like': 'd'
+}
+
+
+def _to_epoch(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def format_timestamp(epoch):
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+
+class RingWindow:
+    """The newest readings of a SensorRingBuffer at the time window() was called."""
+
+    def __init__(self, columns, segments):
+        self._columns = columns
+        self._segments = segments  # [(start, stop)] in oldest-first order
+
+    def __len__(self):
+        return sum(stop - start for start, stop in self._segments)
+
+    def views(self, field):
+        """Zero-copy memoryviews of one field, oldest first (one or two of them)."""
+        column = memoryview(self._columns[field])
+        return [column[start:stop] for start, stop in self._segments]
+
+    def values(self, field):
+        """Iterate one field without copying the window."""
+        for view in self.views(field):
+            yield from view
+
+    def tolist(self, field):
+        result = []
+        for view in self.views(field):
+            result.extend(view.tolist())
+        if field == 'timestamp':
+            return [format_timestamp(t) for t in result]
+        if field == 'motion':
+            return [bool(m) for m in result]
+        return result
+
+    def last(self, field, default=None):
+        if not self._segments:
+            return default
+        value = self._columns[field][self._segments[-1][1] - 1]
+        return bool(value) if field == 'motion' else value
+
+    def summary(self, field):
+        """{'current', 'average', 'min', 'max'} of a numeric field (zeros when empty), like /api/statistics."""
+        count = len(self)
+        if not count:
+            return {'current': 0, 'average': 0, 'min': 0, 'max': 0}
+        return {
+            'current': self.last(field),
+            'average': round(sum(self.values(field)) / count, 1),
+            'min': min(self.values(field)),
+            'max': max(self.values(field))
+        }
+
+    def records(self):
+        """The readings as dicts (timestamps formatted), oldest first."""
+        columns = {field: self.tolist(field) for field in self._columns}
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+class SensorRingBuffer:
+    """Holds the newest `capacity` readings; append() overwrites the oldest when full."""
+
+    def __init__(self, capacity=1000, fields=FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._columns = {name: array(code, bytes(array(code).itemsize * capacity)) for name, code in fields.items()}
+        self._head = 0   # slot the next reading goes into
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def append(self, reading):
+        """Store one reading dict ('timestamp' as datetime, epoch or TIMESTAMP_FORMAT string)."""
+        with self._lock:
+            head = self._head
+            for name, column in self._columns.items():
+                value = reading.get(name, 0)
+                column[head] = _to_epoch(value) if name == 'timestamp' else value
+            self._head = (head + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, readings):
+        for reading in readings:
+            self.append(reading)
+
+    def extend_columns(self, columns):
+        """
+        Store many readings given as {field: sequence} (timestamps in epoch
+        seconds, e.g. numpy arrays from workload.py). Only the newest
+        `capacity` of them are copied in, in at most two slice writes per field.
+        """
+        count = len(columns['timestamp'])
+        keep = min(count, self.capacity)
+        with self._lock:
+            head = self._head
+            first = min(keep, self.capacity - head)
+            for name, column in self._columns.items():
+                source = columns.get(name)
+                values = array(column.typecode, bytes(column.itemsize * keep)) if source is None else \
+                    array(column.typecode, source[count - keep:] if column.typecode == 'd'
+                          else (int(v) for v in source[count - keep:]))
+                column[head:head + first] = values[:first]
+                column[:keep - first] = values[first:]
+            self._head = (head + keep) % self.capacity
+            self._size = min(self._size + keep, self.capacity)
+
+    def window(self, n=None):
+        """View of the newest n readings (all when None), oldest first."""
+        with self._lock:
+            count = self._size if n is None else max(0, min(n, self._size))
+            start = (self._head - count) % self.capacity
+            if count == 0:
+                segments = []
+            elif start + count <= self.capacity:
+                segments = [(start, start + count)]
+            else:
+                segments = [(start, self.capacity), (0, self._head)]
+        return RingWindow(self._columns, segments)
+
+    def latest(self):
+        """The newest reading as a dict, or None when empty."""
+        records = self.window(1).records()
+        return records[0] if records else None
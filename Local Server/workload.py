@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Workload Module
+Synthetic sensor readings for the dev server and for benchmarks, generated a
+column at a time with numpy so millions of points take seconds.
+
+Each robot gets temperature, humidity, light and motion that follow the time
+of day (warm afternoons, daylight plus evening lamps, more movement while
+people are up), a slow "weather" drift over days, sensor noise, and motion in
+bursts rather than independent coin flips. Output is streamed in chunks into:
+- the dev server's ring buffer (fill_store), or
+- a Cloud Server through POST /api/sensor-data/upload (upload).
+
+Usage:
+    python workload.py --rate 1 --hours 24 --robots 4
+        (generate only and report the speed)
+    python workload.py --rate 0.2 --hours 168 --upload http://127.0.0.1:5000 --sensor-ids 1,2,3,4
+        (sensor ids in order robot 1 temperature, humidity, light, motion, robot 2 ...)
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+import argparse
+import json
+import time
+import urllib.request
+
+import numpy as np
+
+# unit: for uploads; base/daily: mean and day-night swing; peak_hour: when the
+# swing is highest; weather: swing of the multi-day drift; noise: std dev per sample
+SensorProfile = namedtuple('SensorProfile', 'unit base daily peak_hour weather noise low high decimals')
+
+SENSORS = {
+    'temperature': SensorProfile('°C', 22.0, 3.0, 15, 1.5, 0.15, -10, 45, 1),
+    'humidity': SensorProfile('%', 50.0, -8.0, 15, -6.0, 0.8, 15, 95, 1),
+    'light': SensorProfile('lux', 0.0, 800.0, 13, 0.25, 0.03, 0, 2000, 0),
+    'motion': SensorProfile('bool', 0.0, 0.0, 0, 0.0, 0.0, 0, 1, 0),
+}
+
+# Motion bursts started per hour while people are up (07:00-23:00) and at night,
+# and their mean length in seconds
+MOTION_BURSTS_DAY = 6.0
+MOTION_BURSTS_NIGHT = 0.5
+MOTION_BURST_SECONDS = 45.0
+
+# Evening lamps (lux) between 18:00 and 23:00
+LAMP_LUX = 250.0
+
+DAY = 86400.0
+
+
+class _RobotState:
+    """Per-robot randomness that has to carry over from one chunk to the next."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.offset = rng.normal(0, 1)                     # this robot's room runs warmer or colder
+        self.periods = rng.uniform(2, 7, 3) * DAY          # weather components of 2-7 days
+        self.phases = rng.uniform(0, 2 * np.pi, 3)
+        self.weights = rng.dirichlet(np.ones(3))
+        self.motion_left = 0                               # samples of a burst still to come
+
+
+class WorkloadGenerator:
+    """
+    Readings at `rate` per second for `duration` seconds from `start` (epoch
+    seconds, default: ending now) for `robots` robots. chunks() yields
+    (robot, columns) with columns {'timestamp': epoch seconds, sensor: values}
+    as numpy arrays of up to `chunk_size` samples, in time order per robot.
+    """
+
+    def __init__(self, rate=1 / 300, duration=DAY, robots=1, sensors=None, start=None, seed=None,
+                 chunk_size=200000):
+        if rate <= 0 or duration <= 0 or robots < 1:
+            raise ValueError("rate, duration and robots must be positive")
+        self.rate = rate
+        self.samples = int(duration * rate)
+        self.robots = robots
+        self.sensors = list(sensors or SENSORS)
+        unknown = set(self.sensors) - set(SENSORS)
+        if unknown:
+            raise ValueError(f"Unknown sensors: {', '.join(sorted(unknown))}")
+        self.start = time.time() - duration if start is None else start
+        self.chunk_size = chunk_size
+        # Hour of day in local time, like a robot in someone's house
+        self.utc_offset = datetime.now().astimezone().utcoffset().total_seconds()
+        seeds = np.random.SeedSequence(seed).spawn(robots)
+        self._states = [_RobotState(np.random.default_rng(s)) for s in seeds]
+
+    def __len__(self):
+        """Readings in total (samples x sensors x robots)."""
+        return self.samples * len(self.sensors) * self.robots
+
+    def chunks(self):
+        for first in range(0, self.samples, self.chunk_size):
+            index = np.arange(first, min(first + self.chunk_size, self.samples))
+            t = self.start + index / self.rate
+            for robot, state in enumerate(self._states):
+                yield robot, self._columns(state, t)
+
+    def _columns(self, state, t):
+        rng = state.rng
+        hour = ((t + self.utc_offset) % DAY) / 3600
+        weather = sum(w * np.sin(2 * np.pi * t / p + ph)
+                      for w, p, ph in zip(state.weights, state.periods, state.phases))
+        columns = {'timestamp': t}
+
+        for name in self.sensors:
+            profile = SENSORS[name]
+            if name == 'motion':
+                values = self._motion(state, hour, t.size)
+            elif name == 'light':
+                daylight = np.clip(np.sin(np.pi * (hour - 6.5) / 13), 0, None) ** 1.5
+                clouds = 1 - profile.weather * (1 - weather) / 2
+                lamps = np.where((hour >= 18) & (hour < 23), LAMP_LUX, 0.0)
+                values = (profile.daily * daylight * clouds + lamps) * (1 + rng.normal(0, profile.noise, t.size))
+            else:
+                daily = np.cos(2 * np.pi * (hour - profile.peak_hour) / 24)
+                values = (profile.base + state.offset * np.sign(profile.daily) + profile.daily * daily
+                          + profile.weather * weather + rng.normal(0, profile.noise, t.size))
+            columns[name] = np.round(np.clip(values, profile.low, profile.high), profile.decimals)
+        return columns
+
+    def _motion(self, state, hour, n):
+        # Bursts start as a Poisson process that is busier by day; each covers
+        # ceil(length / sample interval) samples and may run into the next chunk
+        dt = 1 / self.rate
+        per_hour = np.where((hour >= 7) & (hour < 23), MOTION_BURSTS_DAY, MOTION_BURSTS_NIGHT)
+        starts = np.nonzero(state.rng.poisson(per_hour / 3600 * dt))[0]
+        lengths = np.maximum(np.ceil(state.rng.exponential(MOTION_BURST_SECONDS, starts.size) / dt), 1).astype(np.int64)
+        ends = starts + lengths
+
+        delta = np.zeros(n + 1, dtype=np.int64)
+        np.add.at(delta, starts, 1)
+        np.add.at(delta, np.minimum(ends, n), -1)
+        active = np.cumsum(delta[:n]) > 0
+        active[:min(state.motion_left, n)] = True
+
+        state.motion_left = max(state.motion_left - n, int(ends.max()) - n if ends.size else 0, 0)
+        return active.astype(np.float64)
+
+
+# ==================== SINKS ====================
+
+def fill_store(store, generator, robot=0):
+    """Stream one robot's readings into a sensor_store.SensorRingBuffer. Returns readings added."""
+    added = 0
+    for index, columns in generator.chunks():
+        if index != robot:
+            continue
+        if 'temperature' in columns and 'humidity' in columns:
+            columns['feels_like'] = np.round(columns['temperature'] + columns['humidity'] / 100 * 2, 1)
+        store.extend_columns(columns)
+        added += columns['timestamp'].size
+    return added
+
+
+def _post_json(url, payload, timeout=60):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def upload(generator, base_url, sensor_ids, batch_size=5000):
+    """
+    POST every reading to a Cloud Server's /api/sensor-data/upload, batch_size
+    readings per request. sensor_ids lists the Cloud Server sensor per robot and
+    sensor, in generator order. Returns readings uploaded.
+    """
+    per_robot = len(generator.sensors)
+    if len(sensor_ids) != per_robot * generator.robots:
+        raise ValueError(f"Need {per_robot * generator.robots} sensor ids ({generator.robots} robots x "
+                         f"{per_robot} sensors), got {len(sensor_ids)}")
+
+    url = base_url.rstrip('/') + '/api/sensor-data/upload'
+    uploaded = 0
+    for robot, columns in generator.chunks():
+        # ISO timestamps (UTC) for the whole chunk in one go
+        stamps = (columns['timestamp'] * 1e6).astype('datetime64[us]').astype(str)
+        for k, name in enumerate(generator.sensors):
+            unit = SENSORS[name].unit
+            values = columns[name].tolist()
+            for first in range(0, len(values), batch_size):
+                data = [{'timestamp': ts, 'value': v, 'unit': unit}
+                        for ts, v in zip(stamps[first:first + batch_size].tolist(), values[first:first + batch_size])]
+                _post_json(url, {'sensor_id': sensor_ids[robot * per_robot + k], 'data': data})
+                uploaded += len(data)
+    return uploaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=1 / 300, help='samples per second per sensor (default: every 5 min)')
+    parser.add_argument('--hours', type=float, default=24, help='hours of data, ending now')
+    parser.add_argument('--robots', type=int, default=1)
+    parser.add_argument('--sensors', default=','.join(SENSORS), help='comma separated subset of ' + ', '.join(SENSORS))
+    parser.add_argument('--seed', type=int, help='for repeatable data')
+    parser.add_argument('--upload', metavar='BASE_URL', help='Cloud Server to upload to')
+    parser.add_argument('--sensor-ids', default='', help='Cloud Server sensor ids for --upload, see above')
+    parser.add_argument('--batch-size', type=int, default=5000, help='readings per upload request')
+    args = parser.parse_args()
+
+    generator = WorkloadGenerator(rate=args.rate, duration=args.hours * 3600, robots=args.robots,
+                                  sensors=args.sensors.split(','), seed=args.seed)
+    print(f"Generating {len(generator):,} readings ({args.robots} robots x {len(generator.sensors)} sensors x "
+          f"{generator.samples:,} samples, from {datetime.now() - timedelta(hours=args.hours):%Y-%m-%d %H:%M})...")
+
+    started = time.perf_counter()
+    if args.upload:
+        sensor_ids = [int(s) for s in args.sensor_ids.split(',') if s]
+        count = upload(generator, args.upload, sensor_ids, args.batch_size)
+        verb = 'Uploaded'
+    else:
+        count = sum(columns['timestamp'].size * len(generator.sensors) for _, columns in generator.chunks())
+        verb = 'Generated'
+    elapsed = time.perf_counter() - started
+    print(f"✓ {verb} {count:,} readings in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} readings/s)")
+
+
+if __name__ == '__main__':
+    main()